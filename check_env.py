@@ -58,6 +58,28 @@ def check_camera():
     
     return False
 
+def check_device_profile():
+    print("\n--- 检查设备标定 ---")
+    try:
+        from config import Config
+        from vision.calibration import load_profile
+    except Exception as e:
+        print(f"⚠️  无法检查设备标定: {e}")
+        return False
+    if not os.path.exists(Config.YOLO_MODEL_PATH):
+        print(f"ℹ️  未找到检测模型 {Config.YOLO_MODEL_PATH}，跳过")
+        return False
+    profile = load_profile(Config.DEVICE_PROFILE_PATH, Config.YOLO_MODEL_PATH)
+    if profile is None:
+        print(f"⚠️  没有可用的设备标定文件 ({Config.DEVICE_PROFILE_PATH})，将使用 Config 中的默认推理参数")
+        print("   -> 运行 python tools/calibrate.py 为本机选择输入尺寸 / 后端 / 线程数")
+        return False
+    print(
+        f"✅ 设备标定: {profile['input_size']}px / {profile['backend']} / {profile['threads']} 线程，"
+        f"p95 {profile['p95_ms']} ms ({profile['created_at']})"
+    )
+    return True
+
 def main():
     print("=== 开始系统环境自检 ===\n")
     
@@ -96,6 +118,8 @@ def main():
 
     check_camera()
 
+    check_device_profile()
+
     print("\n" + "="*30)
     if all_pass:
         print("🎉 环境检查通过！你可以运行系统了：")
@@ -17,6 +17,17 @@ class Config:
     
     # 摄像头ID
     CAMERA_ID = 0
+    # V4L2 MJPEG 直通：保留摄像头输出的 JPEG，无叠加层时直接用于 /video_feed，只在需要像素时解码
+    CAMERA_MJPEG_PASSTHROUGH = True  # 摄像头不支持 MJPG 时自动回退为解码模式
+    # 视频流叠加层：检测结果更新时栅格化一次，标签位图按 (标签, 置信度分桶) 缓存
+    OVERLAY_CONF_BUCKET = 0.05  # 画面上显示的置信度按此步长取整
+    OVERLAY_LABEL_CACHE_ENTRIES = 256
+    # 直通模式下解码缩放 (1/2/4/8，利用 JPEG DCT 缩放)。大于 1 时检测框坐标与带叠加层的视频帧都是缩小后的尺寸，
+    # 而无叠加层时转发的是原尺寸 JPEG，视频流会在两种尺寸间跳变；只在不需要观看视频流时调大
+    CAMERA_DECODE_SCALE = 1
+    # 采集模式："demand" 持续 grab() 清空驱动缓冲，仅在有消费者请求新帧时 retrieve() 解码；"continuous" 每帧 read()
+    CAMERA_CAPTURE_MODE = "demand"
+    CAMERA_DEMAND_WAIT_SECONDS = 0.15  # 按需模式下消费者等待下一帧解码的上限，约为两个采集周期
 
     # YOLO 视觉检测配置 (ONNX + OpenCV DNN)
     USE_YOLO = True
@@ -28,12 +39,114 @@ class Config:
     YOLO_INFER_INTERVAL_SECONDS = 0.5
     YOLO_FIRE_LABELS = ["fire", "flame"]
     YOLO_FIRE_MIN_CONF = 0.2
+    YOLO_DNN_BACKEND = "opencv"  # opencv / openvino / vulkan / cuda，取决于 OpenCV 编译选项
+    YOLO_DNN_THREADS = 0         # 0 表示使用 OpenCV 默认线程数
+
+    # 设备标定 (tools/calibrate.py)：标定文件存在且与当前模型匹配时，覆盖上面的输入尺寸 / 后端 / 线程数
+    DEVICE_PROFILE_PATH = os.getenv("DEVICE_PROFILE_PATH", "device_profile.json")
+    CALIBRATION_INPUT_SIZES = [224, 256, 288, 320, 384, 416]
+    CALIBRATION_TARGET_P95_MS = 400
+
+    # 多目标跟踪：每 N 帧做一次完整推理，中间帧由跟踪器沿用检测框
+    VISION_TRACKING_ENABLED = True   # 关闭时每 YOLO_INFER_INTERVAL_SECONDS 推理一次
+    VISION_TRACK_FPS = 10
+    VISION_DETECT_EVERY_N = 5
+    VISION_TRACK_IOU = 0.3
+    VISION_TRACK_MAX_MISSES = 2      # 连续多少次推理未匹配即删除轨迹
+    VISION_TRACK_CONFIRM_HITS = 2    # 被推理确认多少次才算确认的轨迹 (只影响叠加层；火情确认见 RISK_RULES 的 vote)
+    VISION_OPTICAL_FLOW = False      # 中间帧用稀疏 LK 光流估计位移 (否则匀速外推)
+
+    # 检测级联：第一级廉价初筛 (HSV 火焰色 + 闪烁，或小型 ONNX 分类器)，通过后才跑完整 YOLO
+    VISION_CASCADE_ENABLED = True
+    VISION_CASCADE_REFRESH_SECONDS = 10   # 初筛未通过时也定期完整推理一次 (覆盖无明火的烟雾等)
+    VISION_SCREEN_SIZE = (80, 60)
+    VISION_SCREEN_MIN_FRACTION = 0.002    # 火焰色像素占比下限
+    VISION_SCREEN_MIN_FLICKER = 3.0       # 火焰色区域内相邻两次亮度变化的均值下限，0 表示不检查闪烁
+    VISION_SCREEN_MODEL_PATH = os.getenv("VISION_SCREEN_MODEL_PATH", "")  # 配置后改用 ONNX 二分类初筛
+    VISION_SCREEN_INPUT_SIZE = 64
+    VISION_SCREEN_THRESHOLD = 0.3
+    
+    # 部署架构："single" 单进程 (Web 与硬件同进程，只能 1 个 worker)；
+    # "split" 由 daemon.py 独占硬件与融合，经 Unix socket + 共享内存发布，Web 可开 WEB_WORKERS 个 worker
+    ARCH_MODE = os.getenv("ARCH_MODE", "single")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+    IPC_SOCKET_PATH = os.getenv("IPC_SOCKET_PATH", "/tmp/firedetect.sock")
+    IPC_SHM_NAME = "firedetect_frames"
+    IPC_FRAME_SLOTS = 4
+    IPC_FRAME_MAX_BYTES = 512 * 1024
+    IPC_FRAME_FPS = 10
+    IPC_FRAME_IDLE_SECONDS = 2   # 超过该时长没有 worker 读取视频帧时暂停渲染
+    IPC_TIMEOUT_SECONDS = 3
+    IPC_RING_REATTACH_SECONDS = 2  # worker 读到的帧序号超过该时长不变时检查守护进程是否已重启
+
+    # 全网汇聚 (hub)：配置 HUB_URL 后本机按批推送遥测与事件 (delta 编码 + zlib 压缩)
+    HUB_URL = os.getenv("HUB_URL", "")
+    SITE_ID = os.getenv("SITE_ID", "")           # 为空时使用主机名
+    TELEMETRY_SAMPLE_SECONDS = 2
+    TELEMETRY_FLUSH_SECONDS = 10
+    TELEMETRY_DANGER_FLUSH_SECONDS = 1           # Danger 状态下提前推送
+    TELEMETRY_MAX_PENDING_BATCHES = 30           # hub 不可达时保留的批次上限
+    HUB_HISTORY_RECORDS = 120                    # hub 为每个站点保留的记录数
+    HUB_STALE_SECONDS = 60                       # 超过该时长未收到批次视为离线
+    HUB_MAX_SITES = 1000                         # 站点表上限，满时淘汰最久未上报的离线站点
+    HUB_MAX_BODY_BYTES = 1024 * 1024             # 单个批次 (解压后) 的大小上限
+
+    # 负载 / 温度自适应：CPU、SoC 温度或阶段延迟超过高水位即降档，全部低于低水位持续 RELAX 秒后恢复
+    GOVERNOR_ENABLED = True
+    GOVERNOR_INTERVAL_SECONDS = 2
+    GOVERNOR_THERMAL_ROOT = os.getenv("GOVERNOR_THERMAL_ROOT", "/sys/class/thermal")  # 可指向模拟目录
+    GOVERNOR_TEMP_HIGH = 75.0   # 树莓派 4B 约 80℃ 开始降频
+    GOVERNOR_TEMP_LOW = 68.0
+    GOVERNOR_CPU_HIGH = 0.90
+    GOVERNOR_CPU_LOW = 0.70
+    GOVERNOR_TARGET_LATENCY_MS = {"detect": 400}  # 告警相关阶段的目标延迟 (EWMA)
+    GOVERNOR_RELAX_SECONDS = 10
+    GOVERNOR_DANGER_LEVEL = 0   # Danger 时推理参数使用的档位 (0 = 满速)，视频流降到最低档
+    # 档位：视频流帧率 / 画质、视觉循环周期倍数、YOLO 输入尺寸 (None 表示 YOLO_INPUT_SIZE；模型不支持动态尺寸时自动停用)
+    GOVERNOR_LEVELS = [
+        {"stream_fps": 10, "stream_quality": 50, "vision_period_scale": 1.0, "input_size": None},
+        {"stream_fps": 6, "stream_quality": 45, "vision_period_scale": 1.5, "input_size": None},
+        {"stream_fps": 4, "stream_quality": 40, "vision_period_scale": 2.0, "input_size": 256},
+        {"stream_fps": 2, "stream_quality": 35, "vision_period_scale": 3.0, "input_size": 224},
+    ]
+
+    # 流水线追踪 (帧采集 -> 推理 -> 判定 -> 发布 -> LLM 完成)
+    TRACE_ENABLED = True
+    TRACE_DUMP_PATH = os.getenv("TRACE_DUMP_PATH", "")  # 非空时逐帧追加 JSON Lines，便于离线分析
+    
+    # 采样分析诊断接口 (/api/debug/profile)，默认关闭
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
     
     # 阈值设置
     TEMP_THRESHOLD = 50.0  # 摄氏度
     HUMIDITY_THRESHOLD = 20.0 # 仅作为辅助条件，不再单独触发可疑
     HUMIDITY_WARNING_TEMP_MIN = 35.0
     SMOKE_DETECTED_VALUE = 0 # 0通常代表检测到烟雾（低电平触发），视具体模块而定，这里假设低电平触发
+
+    # 风险规则 (core/rules.py 编译一次，融合监控与大模型兜底共用)
+    # when: [(信号, 运算符, 阈值或 Config 属性名, 迟滞幅度)]，全部满足才命中
+    # dwell_seconds: 条件需持续多久才生效；release_seconds: 条件消失多久才解除 (缺省 RISK_RELEASE_SECONDS)
+    # vote: (k, n) 最近 n 次视觉推理结果中至少 k 次为真 (每次推理一票)
+    RISK_RULES = [
+        {"name": "vision_fire", "level": "Danger", "when": [("vision_fire", "true")], "vote": (2, 3)},
+        {"name": "smoke_digital", "level": "Danger", "when": [("smoke", "true")], "dwell_seconds": 2},
+        {
+            "name": "mq2_analog",
+            "level": "Danger",
+            "when": [("mq2", ">", "SMOKE_THRESHOLD_ANALOG", 1000)],
+            "dwell_seconds": 2,
+            "requires": "USE_ADC",
+        },
+        {"name": "high_temperature", "level": "Warning", "when": [("temperature", ">", "TEMP_THRESHOLD", 1.0)], "dwell_seconds": 2},
+        {
+            "name": "hot_and_dry",
+            "level": "Warning",
+            "when": [("humidity", "<", "HUMIDITY_THRESHOLD", 2.0), ("temperature", ">=", "HUMIDITY_WARNING_TEMP_MIN", 1.0)],
+            "dwell_seconds": 2,
+        },
+    ]
+    RISK_RELEASE_SECONDS = 6
+    RISK_SIGNAL_MAX_AGE_SECONDS = 30  # 传感器读数为 None 时沿用上次有效值的最长时间
     
     # 大模型配置
     # 模式: "cloud" (使用OpenAI/DeepSeek等云服务) 或 "local" (使用本地Ollama)
@@ -52,11 +165,53 @@ class Config:
     LLM_MODEL_LOCAL = "moondream" # 仅在 LLM_USE_IMAGE=True 时使用
     LLM_MODEL_LOCAL_TEXT = os.getenv("LLM_MODEL_LOCAL_TEXT", "qwen2.5:0.5b")
     LLM_TIMEOUT_SECONDS = 60
+    LLM_HTTP_MAX_CONNECTIONS = 4     # 常驻连接池上限
+    LLM_HTTP_MAX_KEEPALIVE = 2
+    LLM_HTTP_KEEPALIVE_SECONDS = 120
     LLM_IMAGE_MAX_SIDE = 384
     LLM_IMAGE_JPEG_QUALITY = 55
+    LLM_IMAGE_CROP = True               # 有检测框时只上传检测区域 (多个区域拼图)
+    LLM_IMAGE_CROP_PAD = 0.25           # 区域按框宽高外扩的比例，保留周边上下文
+    LLM_IMAGE_MAX_REGIONS = 4
+    LLM_IMAGE_REUSE_STREAM_JPEG = True  # 无需裁剪且尺寸不超过 LLM_IMAGE_MAX_SIDE 时复用视频流已编码的同一帧 JPEG
     LLM_USE_IMAGE = False
     LLM_MAX_TOKENS = 48
     LLM_TEMPERATURE = 0.0
     LLM_TOP_P = 0.2
     LLM_NUM_CTX = 384
     LLM_FORCE_CHINESE = True
+    LLM_PROMPT_VARIANT = "compact"  # compact: 缓存的 system 前缀 + 精简上下文；verbose: 旧版单条完整提示词
+    LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")  # Ollama 模型常驻时长，常驻期间可复用前缀 KV cache
+    LLM_WARMUP_ENABLED = True             # 启动时后台预加载模型 (仅本地模式)
+    LLM_WARMUP_TIMEOUT_SECONDS = 180      # 首次加载可能很慢，单独给足超时
+    LLM_WARMUP_RETRY_SECONDS = 30
+    LLM_KEEPALIVE_INTERVAL_SECONDS = 600  # 保活间隔，应小于 LLM_KEEP_ALIVE
+    LLM_STREAM = True  # 流式输出，边生成边把 description 推送到前端 (/api/events)
+
+    # LLM 任务调度：按风险等级的令牌桶预算 (容量, 每 refill_seconds 秒补充一个)，取代固定 60 秒冷却
+    LLM_BUDGETS = {
+        "Danger": {"capacity": 2, "refill_seconds": 30},
+        "Warning": {"capacity": 1, "refill_seconds": 60},
+        "periodic": {"capacity": 1, "refill_seconds": 600},
+    }
+    LLM_PERIODIC_INTERVAL_SECONDS = 0  # Normal 状态下的周期性分析间隔，0 表示关闭
+    LLM_RESULT_MAX_AGE_SECONDS = 90    # 数据快照超过该时长的分析结果将被丢弃
+
+    # LLM 熔断器：后端宕机或变慢时直接使用规则兜底，不再每次等满 LLM_TIMEOUT_SECONDS
+    LLM_BREAKER_ENABLED = True
+    LLM_BREAKER_WINDOW = 10              # 统计最近 N 次调用
+    LLM_BREAKER_FAILURE_RATIO = 0.5      # 失败比例达到该值即熔断
+    LLM_BREAKER_MIN_CALLS = 2
+    LLM_BREAKER_SLOW_CALL_SECONDS = 20   # 超过该耗时的调用计为失败
+    LLM_BREAKER_PROBE_INTERVAL_SECONDS = 15
+    LLM_BREAKER_PROBE_TIMEOUT_SECONDS = 3
+
+    # LLM 结果缓存：持续告警时上下文几乎不变，量化后命中缓存可直接复用上次结果
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_MAX_ENTRIES = 64
+    LLM_CACHE_MAX_BYTES = 256 * 1024
+    LLM_CACHE_TTL_SECONDS = 300
+    LLM_CACHE_TEMP_STEP = 1.0      # 温度按 1℃ 分桶
+    LLM_CACHE_HUMIDITY_STEP = 2.0  # 湿度按 2% 分桶
+    LLM_CACHE_MQ2_STEP = 500       # MQ-2 模拟值分桶
+    LLM_CACHE_CONF_STEP = 0.1      # 检测置信度按 0.1 分桶
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import threading
+
+
+class EventBroker:
+    """线程安全的事件广播，用于把状态更新推送给 SSE 客户端
+
+    发布方可以在任意线程 (监控线程、LLM 事件循环) 调用 publish；
+    每个订阅者持有自己事件循环上的有界队列，队列满时丢弃最旧的事件，
+    慢客户端不会拖慢发布方。
+    """
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = int(queue_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        sub = (loop, queue)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: str, data: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_drop_oldest, queue, payload)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                self.unsubscribe((loop, queue))
+
+
+def _put_drop_oldest(queue, payload: str):
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(payload)
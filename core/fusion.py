@@ -1,12 +1,52 @@
+import asyncio
+from collections import deque
 import time
 import logging
 import threading
 import json
+import cv2
 from hardware.sensors import SensorManager
 from hardware.camera import CameraDriver
+from core.events import EventBroker
+from core.governor import build_governor
 from core.llm_analyzer import FireLLMAnalyzer
+from core.llm_scheduler import AUTO_PRIORITIES, build_budgets, priority_for_trigger
+from core.llm_service import LLMAnalysisService
+from core.metrics import (
+    FUSION_LOCK_WAIT_SECONDS,
+    MONITOR_ITERATION_SECONDS,
+    VISION_FRAMES_DETECTED,
+    VISION_FRAMES_SCREENED_OUT,
+    VISION_FRAMES_TRACKED,
+    InstrumentedLock,
+)
+from core.rules import RiskEngine, RuleSet
+from core.telemetry import ANALYSIS_PLACEHOLDER, TelemetryPusher
+from core.tracing import PipelineTracer
+from vision.calibration import load_profile
+from vision.cascade import DetectionCascade, build_screen
+from vision.tracker import MultiObjectTracker
 from config import Config
 
+_DEFAULT_RULES = None
+
+
+def evaluate_rule_risk(temperature, humidity, smoke_detected, vision_fire_detected, mq2_value=None):
+    """无状态规则判定 (Config.RISK_RULES)，返回 Normal / Warning / Danger"""
+    global _DEFAULT_RULES
+    if _DEFAULT_RULES is None:
+        _DEFAULT_RULES = RuleSet()
+    return _DEFAULT_RULES.evaluate(
+        {
+            "temperature": temperature,
+            "humidity": humidity,
+            "smoke": smoke_detected,
+            "mq2": mq2_value,
+            "vision_fire": vision_fire_detected,
+        }
+    )
+
+
 class SystemState:
     def __init__(self):
         self.temperature = None
@@ -16,21 +56,37 @@ class SystemState:
         self.last_update = 0
         self.fire_risk_level = "Normal" # Normal, Warning, Danger
         self.llm_analysis_result = ""
+        self.llm_partial_description = ""
         self.latest_frame = None
+        self.latest_frame_seq = None
         self.vision_detections = None
         self.vision_fire_detected = None
         self.vision_last_time = 0
+        self.vision_result_seq = 0
+        # 叠加层版本：检测框的可见内容 (DetectionBatch.overlay_key) 变化时才递增
+        self.vision_overlay_version = 0
 
 class DataFusionSystem:
     def __init__(self):
         self.sensors = SensorManager()
         self.camera = CameraDriver()
         self.llm = FireLLMAnalyzer()
+        self.llm_service = LLMAnalysisService(self.llm)
+        # 视频流与视觉大模型共用的 JPEG 编码结果
+        self.encoded_frames = self.llm.images.encoded_frames
+        self.encoded_frames.source = self.camera.get_encoded
+        # 增量规则判定，与 FireLLMAnalyzer 共用同一份编译后的规则
+        self.risk_engine = RiskEngine(self.llm.rules)
+        self.events = EventBroker()
+        self.llm_budgets = build_budgets(getattr(Config, "LLM_BUDGETS", {}))
+        self.stale_results_dropped = 0
         self.state = SystemState()
         self.running = False
-        self._lock = threading.Lock()
+        self._lock = InstrumentedLock(FUSION_LOCK_WAIT_SECONDS)
         self._analysis_lock = threading.Lock()
         self._analysis_in_progress = False
+        # 最近一次真实的分析结论 (不含 "分析中..." 占位)，取消 / 丢弃结果时据此恢复
+        self._last_final_result = ""
         self.last_analysis_time = 0
         self.last_analysis_error = ""
         self.last_analysis_trigger = ""
@@ -38,6 +94,46 @@ class DataFusionSystem:
         self.last_analysis_duration_ms = 0
         self.detector = None
         self.last_vision_time = 0
+        self._consumed_vision_seq = 0
+        self._vision_meta = None  # (帧序号, 采集时刻, 推理开始, 推理结束)
+        self._overlay_key = None
+        # 每次推理的火焰判定，由监控线程逐个投给 vision_fire 规则 (监控周期内可能有多次推理)
+        self._vision_votes = deque(maxlen=32)
+        self._vision_tracks = 0  # 跟踪器只在视觉线程内读写，这里发布轨迹数快照
+        self.tracker = MultiObjectTracker(
+            iou_threshold=getattr(Config, "VISION_TRACK_IOU", 0.3),
+            max_misses=getattr(Config, "VISION_TRACK_MAX_MISSES", 2),
+            confirm_hits=getattr(Config, "VISION_TRACK_CONFIRM_HITS", 2),
+            use_optical_flow=getattr(Config, "VISION_OPTICAL_FLOW", False),
+        )
+        # 配置了 HUB_URL 时向汇聚中心推送遥测
+        self.telemetry = None
+        if getattr(Config, "HUB_URL", ""):
+            self.telemetry = TelemetryPusher(
+                self.get_raw_state,
+                Config.HUB_URL,
+                site_id=getattr(Config, "SITE_ID", ""),
+                sample_seconds=getattr(Config, "TELEMETRY_SAMPLE_SECONDS", 2),
+                flush_seconds=getattr(Config, "TELEMETRY_FLUSH_SECONDS", 10),
+                danger_flush_seconds=getattr(Config, "TELEMETRY_DANGER_FLUSH_SECONDS", 1),
+                max_pending=getattr(Config, "TELEMETRY_MAX_PENDING_BATCHES", 30),
+            )
+        self.tracer = PipelineTracer(
+            enabled=getattr(Config, "TRACE_ENABLED", True),
+            dump_path=getattr(Config, "TRACE_DUMP_PATH", ""),
+        )
+
+        # 设备标定文件 (tools/calibrate.py) 覆盖手工配置的输入尺寸、DNN 后端与线程数
+        self.device_profile = load_profile(getattr(Config, "DEVICE_PROFILE_PATH", ""), Config.YOLO_MODEL_PATH)
+        profile = self.device_profile or {}
+        input_size = int(profile.get("input_size") or Config.YOLO_INPUT_SIZE)
+        threads = int(profile.get("threads") or getattr(Config, "YOLO_DNN_THREADS", 0) or 0)
+        if threads > 0:
+            cv2.setNumThreads(threads)
+        if self.device_profile:
+            logging.info(
+                f"已加载设备标定: {input_size}px / {profile.get('backend')} / {threads} 线程 (p95 {profile.get('p95_ms')} ms)"
+            )
 
         try:
             from vision.yolo_onnx import YoloOnnxDetector
@@ -46,29 +142,70 @@ class DataFusionSystem:
                 detector = YoloOnnxDetector(
                     model_path=Config.YOLO_MODEL_PATH,
                     class_names=list(Config.YOLO_CLASSES),
-                    input_size=Config.YOLO_INPUT_SIZE,
+                    input_size=input_size,
                     conf_threshold=Config.YOLO_CONF_THRESHOLD,
                     iou_threshold=Config.YOLO_IOU_THRESHOLD,
+                    backend=profile.get("backend") or getattr(Config, "YOLO_DNN_BACKEND", "opencv"),
                 )
                 self.detector = detector if detector.is_ready() else None
         except Exception:
             self.detector = None
+
+        self.governor = (
+            build_governor(Config, base_input_size=input_size) if getattr(Config, "GOVERNOR_ENABLED", True) else None
+        )
+
+        # 两级级联：廉价初筛通过 (或周期性刷新) 才运行完整 YOLO
+        self.cascade = None
+        if self.detector and getattr(Config, "VISION_CASCADE_ENABLED", True):
+            try:
+                self.cascade = DetectionCascade(
+                    build_screen(Config),
+                    self.detector,
+                    refresh_seconds=getattr(Config, "VISION_CASCADE_REFRESH_SECONDS", 10),
+                )
+            except Exception as e:
+                logging.error(f"视觉初筛初始化失败，改为每次完整推理: {e}")
         
     def start(self):
         self.running = True
         self.camera.start()
+        self.llm_service.start()
+        if getattr(Config, "LLM_WARMUP_ENABLED", True):
+            # 后台预加载模型，避免开机后的第一次告警承担模型加载时间
+            self.llm_service.spawn(self.llm.keep_warm())
         # 启动后台监控线程
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self.monitor_thread = threading.Thread(target=self._monitor_loop, name="fusion-monitor", daemon=True)
         self.monitor_thread.start()
+        if self.detector:
+            self.vision_thread = threading.Thread(target=self._vision_loop, name="fusion-vision", daemon=True)
+            self.vision_thread.start()
+        if self.telemetry is not None:
+            self.telemetry.start()
+        if self.governor is not None:
+            self.governor.start()
         logging.info("多模态数据融合监控系统已启动")
 
     def stop(self):
         self.running = False
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.governor is not None:
+            self.governor.stop()
         self.camera.release()
+        self.llm_service.stop()
         self.sensors.cleanup()
         logging.info("系统已停止")
 
     def get_state(self):
+        """API 使用的状态快照，检测结果在这里序列化为 JSON 列表"""
+        state = self.get_raw_state()
+        detections = state["vision_detections"]
+        state["vision_detections"] = detections.to_list() if detections is not None else None
+        return state
+
+    def get_raw_state(self):
+        """与 get_state() 字段相同，vision_detections 保持为 DetectionBatch"""
         with self._lock:
             if Config.LLM_MODE == "local":
                 effective_model = (
@@ -87,7 +224,9 @@ class DataFusionSystem:
                 "vision_fire_detected": self.state.vision_fire_detected,
                 "vision_detections": self.state.vision_detections,
                 "risk_level": self.state.fire_risk_level,
+                "risk_reasons": self.risk_engine.active_rules(),
                 "llm_analysis": self.state.llm_analysis_result,
+                "llm_partial": self.state.llm_partial_description,
                 "llm_mode": Config.LLM_MODE,
                 "llm_model": getattr(self.llm, "model", ""),
                 "llm_model_effective": effective_model,
@@ -101,21 +240,84 @@ class DataFusionSystem:
                 "timestamp": self.state.last_update
             }
 
+    def get_llm_scheduler_stats(self):
+        stats = self.llm_service.stats()
+        stats["stale_results_dropped"] = self.stale_results_dropped
+        stats["budgets"] = {
+            name: {"tokens": round(b.tokens(), 2), "capacity": b.capacity, "refill_seconds": b.refill_seconds}
+            for name, b in self.llm_budgets.items()
+        }
+        return stats
+
+    def get_vision_stats(self):
+        with self._lock:
+            tracks = self._vision_tracks
+        return {
+            "detector_ready": self.detector is not None,
+            "input_size": self.detector.input_size if self.detector is not None else None,
+            "backend": self.detector.backend if self.detector is not None else None,
+            "device_profile": (
+                {k: self.device_profile.get(k) for k in ("created_at", "input_size", "backend", "threads", "p95_ms", "meets_target")}
+                if self.device_profile
+                else None
+            ),
+            "tracking": bool(getattr(Config, "VISION_TRACKING_ENABLED", True)),
+            "tracks": tracks,
+            "cascade": self.cascade.stats() if self.cascade is not None else None,
+            "capture": self.camera.get_capture_stats(),
+        }
+
+    def get_governor_stats(self):
+        if self.governor is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.governor.stats()}
+
+    def stream_settings(self):
+        """(帧率, JPEG 画质)，由负载调节决定"""
+        if self.governor is None:
+            return 10, None
+        knobs = self.governor.knobs()
+        return knobs["stream_fps"], knobs["stream_quality"]
+
+    def get_telemetry_stats(self):
+        if self.telemetry is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.telemetry.stats()}
+
+    def get_trace_stats(self):
+        return self.tracer.snapshot()
+
     def get_latest_detections(self):
         with self._lock:
             return self.state.vision_detections
 
+    def get_overlay_detections(self):
+        """(检测结果, 叠加层版本)，供视频流按版本复用栅格化的叠加层"""
+        with self._lock:
+            return self.state.vision_detections, self.state.vision_overlay_version
+
+    def _publish_detections(self, batch):
+        """需持有 self._lock，只在视觉线程调用。发布检测结果与轨迹数，框内容变化时递增叠加层版本"""
+        key = batch.overlay_key() if batch else None
+        if key != self._overlay_key:
+            self._overlay_key = key
+            self.state.vision_overlay_version += 1
+        self.state.vision_detections = batch
+        self._vision_tracks = len(self.tracker.tracks)
+
     def get_latest_frame(self):
         with self._lock:
             return self.state.latest_frame
 
     def _monitor_loop(self):
         while self.running:
+            iteration_started = time.perf_counter()
             # 1. 获取数据
             temp, hum = self.sensors.read_dht22()
             smoke = self.sensors.read_mq2()
             mq2_val = self.sensors.get_mq2_value() # 获取模拟值
-            frame = self.camera.get_frame()
+            frame, frame_seq, capture_ts = self.camera.get_frame_with_meta()
+            trace = self.tracer.begin(frame_seq, capture_ts)
 
             # 更新当前状态
             with self._lock:
@@ -124,114 +326,232 @@ class DataFusionSystem:
                 self.state.smoke_detected = smoke
                 self.state.mq2_value = mq2_val
                 self.state.latest_frame = frame
+                self.state.latest_frame_seq = frame_seq
                 self.state.last_update = time.time()
 
-            now = time.time()
-            if (
-                self.detector
-                and frame is not None
-                and (now - self.last_vision_time) >= Config.YOLO_INFER_INTERVAL_SECONDS
-            ):
-                self.last_vision_time = now
-                try:
-                    detections = self.detector.detect(frame)
-                except Exception:
-                    detections = None
+            signals = {"temperature": temp, "humidity": hum, "smoke": smoke, "mq2": mq2_val}
 
-                with self._lock:
-                    if detections is None:
-                        self.state.vision_detections = None
-                        self.state.vision_fire_detected = None
-                    else:
-                        self.state.vision_detections = [
-                            {
-                                "class_id": d.class_id,
-                                "label": d.label,
-                                "confidence": d.confidence,
-                                "x1": d.x1,
-                                "y1": d.y1,
-                                "x2": d.x2,
-                                "y2": d.y2,
-                            }
-                            for d in detections
-                        ]
-                        fire_labels = set([s.lower() for s in getattr(Config, "YOLO_FIRE_LABELS", ["fire", "flame"])])
-                        fire_min_conf = float(getattr(Config, "YOLO_FIRE_MIN_CONF", 0.2))
-                        self.state.vision_fire_detected = any(
-                            (str(d.get("label", "")).lower() in fire_labels)
-                            and float(d.get("confidence", 0)) >= fire_min_conf
-                            for d in self.state.vision_detections
-                        )
-                        self.state.vision_last_time = now
+            # 视觉结果由 fusion-vision 线程产生：上次以来的每次推理结果各投一票 (最后一票随本次信号一起)，
+            # 有新的推理结果时以被推理的那一帧作为本次追踪的起点
+            with self._lock:
+                vision_seq = self.state.vision_result_seq
+                vision_votes = list(self._vision_votes)
+                self._vision_votes.clear()
+                vision_meta = self._vision_meta
+            for vote in vision_votes[:-1]:
+                self.risk_engine.update({"vision_fire": vote})
+            # 没有新的推理结果时传 None：RiskEngine 据此在 max_sample_age 后让视觉规则过期
+            signals["vision_fire"] = vision_votes[-1] if vision_votes else None
+            if vision_seq != self._consumed_vision_seq:
+                self._consumed_vision_seq = vision_seq
+                if vision_meta is not None:
+                    v_frame_seq, v_capture_ts, infer_start, infer_end = vision_meta
+                    trace = self.tracer.begin(v_frame_seq, v_capture_ts)
+                    if infer_start is not None:
+                        self.tracer.mark(trace, "infer_start", infer_start)
+                        self.tracer.mark(trace, "infer_end", infer_end)
 
             # 2. 规则引擎初步判定 (边缘计算层)
-            risk = "Normal"
-            if self.state.vision_fire_detected is True:
-                risk = "Danger"
-            elif self.state.smoke_detected is True:
-                risk = "Danger"
-            elif self.state.temperature is not None and self.state.temperature > Config.TEMP_THRESHOLD:
-                risk = "Warning"
-            elif (
-                self.state.humidity is not None
-                and self.state.temperature is not None
-                and self.state.humidity < Config.HUMIDITY_THRESHOLD
-                and self.state.temperature >= getattr(Config, "HUMIDITY_WARNING_TEMP_MIN", 35.0)
-            ):
-                risk = "Warning"
+            risk = self.risk_engine.update(signals)
+            self.tracer.mark(trace, "decision")
             
             # 3. 触发大模型赋能 (如果判定为高风险 或 用户手动请求 - 这里演示自动触发逻辑)
             # 为了防止频繁调用耗尽Token，我们设置一个冷却机制
             
             current_risk = risk
+
+            with self._lock:
+                previous_risk = self.state.fire_risk_level
+                self.state.fire_risk_level = current_risk
+            if self.governor is not None:
+                # Danger 时推理参数恢复满速，视频流让出 CPU
+                self.governor.set_risk(current_risk)
+            self.tracer.mark(trace, "published")
+            self.tracer.finish(trace, current_risk)
             
-            # 只有当状态发生变化（例如从Normal变成Danger），或者距离上次分析超过一定时间（如60秒）时，才调用LLM
-            # 这里简单实现：增加一个 last_analysis_time 变量
-            now = time.time()
-            if current_risk in ["Warning", "Danger"] and (now - self.last_analysis_time > 60):
-                self.trigger_llm_analysis(trigger=f"auto:{current_risk}")
+            # 每个风险等级各有一个令牌桶预算；在途任务会合并同级或更低级的触发，此时不消耗令牌
+            if current_risk in ["Warning", "Danger"]:
+                self._maybe_trigger_llm(f"auto:{current_risk}", current_risk)
             elif current_risk == "Normal":
+                if previous_risk != "Normal":
+                    # 风险解除：取消仍在进行的告警分析，其结果已无意义
+                    cancelled = self.llm_service.cancel(AUTO_PRIORITIES)
+                    with self._lock:
+                        if cancelled or not self._analysis_in_progress:
+                            self._last_final_result = "系统运行正常"
+                            self.state.llm_analysis_result = self._last_final_result
+                            self.state.llm_partial_description = ""
+                periodic = float(getattr(Config, "LLM_PERIODIC_INTERVAL_SECONDS", 0) or 0)
+                if periodic > 0 and time.time() - self.last_analysis_time >= periodic:
+                    self._maybe_trigger_llm("periodic", "periodic")
+
+            MONITOR_ITERATION_SECONDS.observe(time.perf_counter() - iteration_started)
+            time.sleep(2) # 采样间隔
+
+    def _vision_loop(self):
+        """视觉线程：每 N 帧 (或轨迹丢失时) 做一次完整推理，其余帧由跟踪器沿用检测框
+
+        关闭跟踪时退化为每 YOLO_INFER_INTERVAL_SECONDS 推理一次、直接发布检测结果。
+        """
+        tracking = bool(getattr(Config, "VISION_TRACKING_ENABLED", True))
+        if tracking:
+            period = 1.0 / max(0.1, float(getattr(Config, "VISION_TRACK_FPS", 10)))
+            detect_every = max(1, int(getattr(Config, "VISION_DETECT_EVERY_N", 5)))
+        else:
+            period = float(Config.YOLO_INFER_INTERVAL_SECONDS)
+            detect_every = 1
+        fire_labels = set([s.lower() for s in getattr(Config, "YOLO_FIRE_LABELS", ["fire", "flame"])])
+        fire_min_conf = float(getattr(Config, "YOLO_FIRE_MIN_CONF", 0.2))
+        last_seq = None
+        since_detect = detect_every
+        base_period = period
+        base_input_size = self.detector.input_size
+
+        while self.running:
+            started = time.monotonic()
+            if self.governor is not None:
+                knobs = self.governor.knobs()
+                period = base_period * float(knobs["vision_period_scale"] or 1.0)
+            frame, frame_seq, capture_ts = self.camera.get_frame_with_meta()
+            if frame is None or frame_seq == last_seq:
+                time.sleep(period)
+                continue
+            last_seq = frame_seq
+
+            if since_detect >= detect_every or self.tracker.lost():
+                since_detect = 1
+                if self.governor is not None:
+                    self.detector.input_size = int(knobs["input_size"])
+                if self.cascade is not None:
+                    # 仍有轨迹时必须用完整推理更新；否则先过初筛
+                    detections, ran_full = self.cascade.run(frame, force=bool(self.tracker.tracks))
+                else:
+                    try:
+                        detections = self.detector.detect(frame)
+                    except Exception:
+                        detections = None
+                    ran_full = True
+                (VISION_FRAMES_DETECTED if ran_full else VISION_FRAMES_SCREENED_OUT).inc()
+                if self.governor is not None and ran_full:
+                    if detections is None and self.detector.input_size != base_input_size:
+                        # 固定输入尺寸的模型无法缩小输入，恢复原尺寸
+                        self.detector.input_size = base_input_size
+                        self.governor.disable_input_scaling()
+                    else:
+                        self.governor.observe("detect", self.detector.last_infer_end - self.detector.last_infer_start)
+                # 火焰判定取本次推理的原始结果：时间上的确认只由 vision_fire 规则的 vote 负责，
+                # 不再叠加跟踪器的 confirm_hits
+                if detections is None:
+                    self.tracker.reset()
+                    batch, fire = None, None
+                else:
+                    fire = detections.any_label(fire_labels, fire_min_conf)
+                    if tracking:
+                        self.tracker.update(detections, frame)
+                        batch = self.tracker.as_batch()
+                    else:
+                        batch = detections
+                with self._lock:
+                    self._publish_detections(batch)
+                    self.state.vision_fire_detected = fire
+                    if fire is not None:
+                        self._vision_votes.append(fire)
+                    if batch is not None:
+                        self.state.vision_last_time = time.time()
+                    self.state.vision_result_seq += 1
+                    self._vision_meta = (
+                        frame_seq,
+                        capture_ts,
+                        self.detector.last_infer_start if ran_full else None,
+                        self.detector.last_infer_end if ran_full else None,
+                    )
+                self.last_vision_time = time.time()
+            else:
+                since_detect += 1
+                self.tracker.predict(frame)
+                VISION_FRAMES_TRACKED.inc()
+                batch = self.tracker.as_batch()
                 with self._lock:
-                    if self.state.fire_risk_level != "Normal" and not self._analysis_in_progress:
-                        self.state.llm_analysis_result = "系统运行正常"
+                    self._publish_detections(batch)
 
+            time.sleep(max(0.0, period - (time.monotonic() - started)))
 
-            with self._lock:
-                self.state.fire_risk_level = current_risk
+    def _maybe_trigger_llm(self, trigger: str, budget_name: str):
+        if self.llm_service.would_coalesce(priority_for_trigger(trigger)):
+            return False
+        bucket = self.llm_budgets.get(budget_name)
+        if bucket is not None and not bucket.try_acquire():
+            return False
+        self.request_llm_analysis(trigger=trigger)
+        return True
 
-            time.sleep(2) # 采样间隔
+    def request_llm_analysis(self, trigger: str = "manual"):
+        """按优先级 (Danger > Warning > manual > periodic) 发起大模型分析
 
-    def trigger_llm_analysis(self, trigger: str = "manual"):
+        在途任务优先级不低于本次时合并到在途任务，否则抢占在途任务。
+        返回 (concurrent.futures.Future, coalesced)，Future 的结果为分析文本
+        (被取消或结果过期时为 None)。
+        """
         with self._analysis_lock:
-            if self._analysis_in_progress:
-                return False
-            self._analysis_in_progress = True
-            self.last_analysis_trigger = trigger
-            self.last_analysis_request_id += 1
-            request_id = self.last_analysis_request_id
-            self.last_analysis_error = ""
-            self.last_analysis_time = time.time()
+            return self.llm_service.submit(
+                lambda job: self._begin_llm_analysis(trigger), priority_for_trigger(trigger), trigger
+            )
 
+    def trigger_llm_analysis(self, trigger: str = "manual"):
+        """返回是否发起了新请求 (False 表示合并到了在途请求)"""
+        _, coalesced = self.request_llm_analysis(trigger)
+        return not coalesced
+
+    def _begin_llm_analysis(self, trigger: str):
+        self._analysis_in_progress = True
+        self.last_analysis_trigger = trigger
+        self.last_analysis_request_id += 1
+        request_id = self.last_analysis_request_id
+        self.last_analysis_error = ""
+        self.last_analysis_time = time.time()
+
+        self.tracer.attach_llm(request_id)
         with self._lock:
-            self.state.llm_analysis_result = "分析中..."
+            self.state.llm_analysis_result = ANALYSIS_PLACEHOLDER
+            self.state.llm_partial_description = ""
+        return self._run_llm_analysis(request_id)
 
-        t = threading.Thread(target=self._run_llm_analysis, args=(request_id,), daemon=True)
-        t.start()
-        return True
+    def _set_analysis_error(self, request_id: int, error: str):
+        """被抢占的旧任务不能覆盖新任务的错误状态"""
+        if request_id == self.last_analysis_request_id:
+            self.last_analysis_error = error
+
+    def _restore_last_result(self, request_id: int):
+        """分析被取消或结果被丢弃时恢复最近一次真实结论 (不会恢复成 "分析中..." 占位)；被抢占时由新任务接管"""
+        with self._lock:
+            if request_id == self.last_analysis_request_id:
+                self.state.llm_analysis_result = self._last_final_result
+                self.state.llm_partial_description = ""
+
+    def _on_llm_partial(self, request_id: int, description: str):
+        if request_id != self.last_analysis_request_id:
+            return
+        with self._lock:
+            self.state.llm_partial_description = description
+        self.events.publish("llm_partial", {"request_id": request_id, "description": description})
 
-    def _run_llm_analysis(self, request_id: int):
+    async def _run_llm_analysis(self, request_id: int):
         started = time.time()
+        analysis = None
         try:
             with self._lock:
+                snapshot_time = self.state.last_update
                 temperature = self.state.temperature
                 humidity = self.state.humidity
                 smoke_detected = self.state.smoke_detected
                 frame = self.state.latest_frame
+                frame_seq = self.state.latest_frame_seq
+                rule_risk = self.state.fire_risk_level
                 mq2_value = self.state.mq2_value
                 vision_fire_detected = self.state.vision_fire_detected
                 vision_detections = self.state.vision_detections
 
-            analysis = self.llm.analyze(
+            analysis = await self.llm.analyze(
                 temperature,
                 humidity,
                 smoke_detected,
@@ -239,13 +559,36 @@ class DataFusionSystem:
                 mq2_value=mq2_value,
                 vision_fire_detected=vision_fire_detected,
                 vision_detections=vision_detections,
+                on_partial=lambda desc: self._on_llm_partial(request_id, desc),
+                frame_seq=frame_seq,
+                rule_risk=rule_risk,
             )
+            max_age = float(getattr(Config, "LLM_RESULT_MAX_AGE_SECONDS", 90))
+            snapshot_age = time.time() - snapshot_time if snapshot_time else 0.0
+            if max_age > 0 and snapshot_age > max_age:
+                # 数据快照已过期，结果不再代表现场情况，丢弃
+                self.stale_results_dropped += 1
+                self._set_analysis_error(request_id, f"结果已丢弃：数据快照已过期 {snapshot_age:.0f}s")
+                self._restore_last_result(request_id)
+                return None
             with self._lock:
+                self._last_final_result = analysis
                 self.state.llm_analysis_result = analysis
-            self.last_analysis_error = ""
+                self.state.llm_partial_description = ""
+            self.tracer.complete_llm(request_id)
+            self.events.publish("llm_result", {"request_id": request_id, "analysis": analysis})
+            self._set_analysis_error(request_id, "")
+        except asyncio.CancelledError:
+            self._set_analysis_error(request_id, "已取消")
+            self._restore_last_result(request_id)
+            raise
         except Exception as e:
-            self.last_analysis_error = str(e)
+            self._set_analysis_error(request_id, str(e))
+            self._restore_last_result(request_id)
         finally:
-            self.last_analysis_duration_ms = int((time.time() - started) * 1000)
             with self._analysis_lock:
-                self._analysis_in_progress = False
+                # 被抢占时新任务已经接管了这些状态
+                if request_id == self.last_analysis_request_id:
+                    self.last_analysis_duration_ms = int((time.time() - started) * 1000)
+                    self._analysis_in_progress = False
+        return analysis
@@ -0,0 +1,260 @@
+"""负载 / 温度自适应调节
+
+无风扇的树莓派在 YOLO + MJPEG 持续负载下会降频，届时所有环节一起变慢。Governor 周期性读取
+CPU 占用、SoC 温度 (/sys/class/thermal，可替换为任意数据源) 与各阶段延迟 (EWMA)，在
+Config.GOVERNOR_LEVELS 定义的档位之间升降：
+
+- 任一指标超过高水位即降一档 (减小视频流帧率 / 画质、拉长推理间隔、缩小输入尺寸)；
+- 全部指标低于低水位并持续 relax_seconds 才恢复一档，避免来回振荡；
+- Danger 状态下告警相关的推理参数始终使用 danger_level 档 (默认满速)，
+  视频流等非关键负载直接降到最低档，为推理让出 CPU。
+"""
+import glob
+import logging
+import os
+import threading
+import time
+
+from core.metrics import GOVERNOR_CPU_LOAD, GOVERNOR_LEVEL, GOVERNOR_SOC_TEMPERATURE
+
+DEFAULT_LEVELS = [
+    {"stream_fps": 10, "stream_quality": 50, "vision_period_scale": 1.0, "input_size": None},
+    {"stream_fps": 6, "stream_quality": 45, "vision_period_scale": 1.5, "input_size": None},
+    {"stream_fps": 4, "stream_quality": 40, "vision_period_scale": 2.0, "input_size": 256},
+    {"stream_fps": 2, "stream_quality": 35, "vision_period_scale": 3.0, "input_size": 224},
+]
+
+# 告警相关的参数 (Danger 时优先保证) 与可以让步的参数
+CRITICAL_KNOBS = ("vision_period_scale", "input_size")
+DEFERRABLE_KNOBS = ("stream_fps", "stream_quality")
+
+
+class ThermalSource:
+    """读取 root 下所有 thermal_zone*/temp (毫摄氏度)，返回最高温度；不可用时返回 None"""
+
+    def __init__(self, root: str = "/sys/class/thermal"):
+        self.root = root
+
+    def __call__(self):
+        temps = []
+        for path in glob.glob(os.path.join(self.root, "thermal_zone*", "temp")):
+            try:
+                with open(path) as f:
+                    temps.append(int(f.read().strip()) / 1000.0)
+            except (OSError, ValueError):
+                continue
+        return max(temps) if temps else None
+
+
+class CpuLoadSource:
+    """/proc/stat 两次采样之间的整机 CPU 占用 (0~1)；没有 /proc 时退化为 loadavg / 核数"""
+
+    def __init__(self, path: str = "/proc/stat"):
+        self.path = path
+        self._last = None
+
+    def _read(self):
+        with open(self.path) as f:
+            fields = [int(x) for x in f.readline().split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+        return sum(fields), idle
+
+    def __call__(self):
+        try:
+            total, idle = self._read()
+        except (OSError, ValueError, IndexError):
+            try:
+                return min(1.0, os.getloadavg()[0] / float(os.cpu_count() or 1))
+            except OSError:
+                return None
+        last, self._last = self._last, (total, idle)
+        if last is None or total <= last[0]:
+            return None
+        return 1.0 - (idle - last[1]) / float(total - last[0])
+
+
+class Governor:
+    def __init__(
+        self,
+        levels=None,
+        thermal_source=None,
+        cpu_source=None,
+        interval_seconds: float = 2.0,
+        temp_high: float = 75.0,
+        temp_low: float = 68.0,
+        cpu_high: float = 0.90,
+        cpu_low: float = 0.70,
+        target_latency_ms: dict = None,
+        relax_seconds: float = 10.0,
+        danger_level: int = 0,
+        base_input_size: int = 320,
+        ewma_alpha: float = 0.3,
+    ):
+        self.levels = [dict(level) for level in (levels or DEFAULT_LEVELS)]
+        self.thermal_source = thermal_source or ThermalSource()
+        self.cpu_source = cpu_source or CpuLoadSource()
+        self.interval_seconds = float(interval_seconds)
+        self.temp_high = float(temp_high)
+        self.temp_low = float(temp_low)
+        self.cpu_high = float(cpu_high)
+        self.cpu_low = float(cpu_low)
+        self.target_latency_ms = dict(target_latency_ms or {"detect": 400.0})
+        self.relax_seconds = float(relax_seconds)
+        self.danger_level = max(0, min(int(danger_level), len(self.levels) - 1))
+        self.base_input_size = int(base_input_size)
+        self.ewma_alpha = float(ewma_alpha)
+        self.input_scaling = True
+        self.level = 0
+        self.risk = "Normal"
+        self.temperature = None
+        self.cpu_load = None
+        self.latency_ms = {}
+        self.reasons = []
+        self.transitions = 0
+        self._calm_since = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._knobs = self._compose()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="governor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                logging.error(f"负载调节失败: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    def observe(self, stage: str, seconds: float):
+        """记录一次阶段耗时 (EWMA)"""
+        ms = seconds * 1000.0
+        with self._lock:
+            prev = self.latency_ms.get(stage)
+            self.latency_ms[stage] = ms if prev is None else prev + self.ewma_alpha * (ms - prev)
+
+    def set_risk(self, risk: str):
+        with self._lock:
+            if risk == self.risk:
+                return
+            self.risk = risk
+            self._knobs = self._compose()
+
+    def disable_input_scaling(self):
+        """模型输入尺寸固定 (导出时未开启动态尺寸) 时调用，之后不再改变输入尺寸"""
+        with self._lock:
+            if self.input_scaling:
+                logging.warning("检测模型不支持改变输入尺寸，负载调节不再缩小输入")
+            self.input_scaling = False
+            self._knobs = self._compose()
+
+    def step(self, now: float = None) -> int:
+        """采样一次指标并调整档位，返回当前档位"""
+        now = time.monotonic() if now is None else now
+        temperature = self.thermal_source()
+        cpu = self.cpu_source()
+        with self._lock:
+            self.temperature = temperature
+            if cpu is not None:
+                self.cpu_load = cpu
+            hot = []
+            if temperature is not None and temperature >= self.temp_high:
+                hot.append("temperature")
+            if self.cpu_load is not None and self.cpu_load >= self.cpu_high:
+                hot.append("cpu")
+            calm = (temperature is None or temperature < self.temp_low) and (
+                self.cpu_load is None or self.cpu_load < self.cpu_low
+            )
+            for stage, target in self.target_latency_ms.items():
+                value = self.latency_ms.get(stage)
+                if value is None:
+                    continue
+                if value > target:
+                    hot.append(f"latency:{stage}")
+                if value > target * 0.7:
+                    calm = False
+            self.reasons = hot
+
+            level = self.level
+            if hot:
+                self._calm_since = None
+                level = min(level + 1, len(self.levels) - 1)
+            elif calm and level > 0:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= self.relax_seconds:
+                    level -= 1
+                    self._calm_since = now
+            else:
+                self._calm_since = None
+            if level != self.level:
+                self.transitions += 1
+                logging.info(f"负载调节: 档位 {self.level} -> {level} ({', '.join(hot) or 'recovered'})")
+                self.level = level
+                self._knobs = self._compose()
+
+        GOVERNOR_LEVEL.set(self.level)
+        if temperature is not None:
+            GOVERNOR_SOC_TEMPERATURE.set(temperature)
+        if self.cpu_load is not None:
+            GOVERNOR_CPU_LOAD.set(self.cpu_load)
+        return self.level
+
+    def _compose(self) -> dict:
+        """需持有 self._lock。Danger 时关键参数取 danger_level 档，可让步参数取最低档"""
+        if self.risk == "Danger":
+            critical = self.levels[min(self.level, self.danger_level)]
+            deferrable = self.levels[-1]
+        else:
+            critical = deferrable = self.levels[self.level]
+        knobs = {k: deferrable.get(k) for k in DEFERRABLE_KNOBS}
+        knobs.update({k: critical.get(k) for k in CRITICAL_KNOBS})
+        if not self.input_scaling or not knobs.get("input_size"):
+            knobs["input_size"] = self.base_input_size
+        else:
+            knobs["input_size"] = min(int(knobs["input_size"]), self.base_input_size)
+        return knobs
+
+    def knobs(self) -> dict:
+        with self._lock:
+            return self._knobs
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "level": self.level,
+                "levels": len(self.levels),
+                "risk": self.risk,
+                "knobs": dict(self._knobs),
+                "soc_temperature": self.temperature,
+                "cpu_load": None if self.cpu_load is None else round(self.cpu_load, 3),
+                "latency_ms": {k: round(v, 1) for k, v in self.latency_ms.items()},
+                "target_latency_ms": dict(self.target_latency_ms),
+                "pressure": list(self.reasons),
+                "input_scaling": self.input_scaling,
+                "transitions": self.transitions,
+            }
+
+
+def build_governor(config, base_input_size: int = None) -> Governor:
+    return Governor(
+        levels=getattr(config, "GOVERNOR_LEVELS", None),
+        thermal_source=ThermalSource(getattr(config, "GOVERNOR_THERMAL_ROOT", "/sys/class/thermal")),
+        interval_seconds=getattr(config, "GOVERNOR_INTERVAL_SECONDS", 2),
+        temp_high=getattr(config, "GOVERNOR_TEMP_HIGH", 75.0),
+        temp_low=getattr(config, "GOVERNOR_TEMP_LOW", 68.0),
+        cpu_high=getattr(config, "GOVERNOR_CPU_HIGH", 0.90),
+        cpu_low=getattr(config, "GOVERNOR_CPU_LOW", 0.70),
+        target_latency_ms=getattr(config, "GOVERNOR_TARGET_LATENCY_MS", None),
+        relax_seconds=getattr(config, "GOVERNOR_RELAX_SECONDS", 10),
+        danger_level=getattr(config, "GOVERNOR_DANGER_LEVEL", 0),
+        base_input_size=base_input_size or getattr(config, "YOLO_INPUT_SIZE", 320),
+    )
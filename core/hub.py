@@ -0,0 +1,165 @@
+"""汇聚中心 (hub) 的内存索引
+
+边缘节点 (core/telemetry.py) 推送的批次在这里解码并建立索引：
+
+- 每个站点保存最新状态、最近 history 条记录与批次序号 (按启动号 + 序号去重，容忍边缘重试)；
+- 按风险等级维护站点集合，"当前哪些站点处于 Danger" 之类的全网查询不需要遍历全部站点；
+- 全网事件 (风险等级变化、大模型结论) 保存在有界环形队列中；
+- 站点表有上限，满时淘汰最久未上报的离线站点。
+"""
+import threading
+import time
+from collections import deque
+
+from core.rules import LEVELS
+from core.telemetry import delta_decode
+
+MAX_SITE_NAME = 128
+MAX_BOOT_ID = 64
+
+
+class FleetFull(RuntimeError):
+    """站点表已满且没有可淘汰的离线站点"""
+
+
+class SiteRecord:
+    __slots__ = ("site", "latest", "history", "boot", "last_seq", "last_seen", "batches", "duplicates", "wire_bytes")
+
+    def __init__(self, site: str, history: int):
+        self.site = site
+        self.latest = {}
+        self.history = deque(maxlen=history)
+        self.boot = ""
+        self.last_seq = 0
+        self.last_seen = 0.0
+        self.batches = 0
+        self.duplicates = 0
+        self.wire_bytes = 0
+
+    def to_dict(self, now: float, stale_seconds: float) -> dict:
+        return {
+            "site": self.site,
+            "latest": self.latest,
+            "last_seen": self.last_seen,
+            "online": now - self.last_seen <= stale_seconds,
+            "batches": self.batches,
+            "wire_bytes": self.wire_bytes,
+        }
+
+
+class FleetIndex:
+    def __init__(self, history: int = 120, max_events: int = 1000, stale_seconds: float = 60.0, max_sites: int = 1000):
+        self.history = int(history)
+        self.stale_seconds = float(stale_seconds)
+        self.max_sites = max(1, int(max_sites))
+        self._sites = {}
+        self._by_risk = {level: set() for level in LEVELS}
+        self._events = deque(maxlen=int(max_events))
+        self._lock = threading.Lock()
+        self.counts = {"batches": 0, "duplicates": 0, "records": 0, "events": 0, "wire_bytes": 0, "sites_evicted": 0, "sites_rejected": 0}
+
+    def ingest(self, batch: dict, wire_bytes: int = 0) -> int:
+        """解码并索引一个批次，返回新增记录数；重复或过期的批次返回 0
+
+        站点表已满时淘汰最久未上报的离线站点，没有离线站点可淘汰时抛出 FleetFull。
+        """
+        site = str(batch.get("site") or "")
+        if not site:
+            raise ValueError("批次缺少 site")
+        if len(site) > MAX_SITE_NAME:
+            raise ValueError("site 过长")
+        boot = str(batch.get("boot") or "")
+        if len(boot) > MAX_BOOT_ID:
+            raise ValueError("boot 过长")
+        seq = int(batch.get("seq") or 0)
+        records = delta_decode(batch.get("records") or [])
+        events = [dict(event) for event in batch.get("events") or []]
+        now = time.time()
+        with self._lock:
+            rec = self._sites.get(site)
+            if rec is None:
+                if len(self._sites) >= self.max_sites:
+                    self._evict_offline(now)
+                rec = self._sites[site] = SiteRecord(site, self.history)
+            rec.last_seen = now
+            # 边缘每次启动生成新的启动号，序号从 1 重新开始；同一启动号内序号不增的批次是重试
+            if boot != rec.boot:
+                rec.boot = boot
+                rec.last_seq = 0
+            if seq and seq <= rec.last_seq:
+                rec.duplicates += 1
+                self.counts["duplicates"] += 1
+                return 0
+            rec.last_seq = seq
+            rec.batches += 1
+            rec.wire_bytes += wire_bytes
+            self.counts["batches"] += 1
+            self.counts["wire_bytes"] += wire_bytes
+            self.counts["records"] += len(records)
+            if records:
+                rec.history.extend(records)
+                self._set_latest(rec, records[-1])
+            for event in events:
+                self._events.append({**event, "site": site})
+                self.counts["events"] += 1
+            return len(records)
+
+    def _evict_offline(self, now: float):
+        """需持有 self._lock"""
+        oldest = min(self._sites.values(), key=lambda r: r.last_seen)
+        if now - oldest.last_seen <= self.stale_seconds:
+            self.counts["sites_rejected"] += 1
+            raise FleetFull(f"站点数已达上限 {self.max_sites}")
+        del self._sites[oldest.site]
+        for names in self._by_risk.values():
+            names.discard(oldest.site)
+        self.counts["sites_evicted"] += 1
+
+    def _set_latest(self, rec: SiteRecord, latest: dict):
+        old_risk = rec.latest.get("risk")
+        new_risk = latest.get("risk") or "Normal"
+        if old_risk != new_risk:
+            if old_risk in self._by_risk:
+                self._by_risk[old_risk].discard(rec.site)
+            self._by_risk.setdefault(new_risk, set()).add(rec.site)
+        rec.latest = latest
+
+    def sites(self, risk: str = None, online: bool = None) -> list:
+        now = time.time()
+        with self._lock:
+            names = self._by_risk.get(risk, set()) if risk else self._sites.keys()
+            out = [self._sites[name].to_dict(now, self.stale_seconds) for name in sorted(names)]
+        if online is not None:
+            out = [s for s in out if s["online"] == online]
+        return out
+
+    def site(self, name: str, history: int = 0):
+        now = time.time()
+        with self._lock:
+            rec = self._sites.get(name)
+            if rec is None:
+                return None
+            out = rec.to_dict(now, self.stale_seconds)
+            if history:
+                out["history"] = list(rec.history)[-int(history):]
+            out["duplicates"] = rec.duplicates
+        return out
+
+    def events(self, limit: int = 50, site: str = None) -> list:
+        with self._lock:
+            events = list(self._events)
+        if site:
+            events = [e for e in events if e.get("site") == site]
+        limit = min(max(1, int(limit)), self._events.maxlen)
+        return events[-limit:]
+
+    def summary(self) -> dict:
+        now = time.time()
+        with self._lock:
+            online = sum(1 for r in self._sites.values() if now - r.last_seen <= self.stale_seconds)
+            return {
+                "sites": len(self._sites),
+                "online": online,
+                "by_risk": {level: len(names) for level, names in self._by_risk.items()},
+                **self.counts,
+            }
@@ -0,0 +1,269 @@
+"""守护进程与 Web worker 之间的本机 IPC
+
+拆分部署时只有一个守护进程 (daemon.py) 持有 GPIO / I2C / 摄像头 / 检测器，
+任意数量的 uvicorn worker 通过这里读取数据，不接触硬件：
+
+- SharedFrameRing: 共享内存中的 JPEG 环形缓冲，守护进程写入视频流帧，worker 直接拷贝最新一帧；
+  每个槽位带写入代数 (偶数为稳定、奇数为写入中)，读者在拷贝前后比较代数，无需跨进程锁；
+  头部带写入方实例号，帧序号长时间不变时读者按名称重新附加并比较实例号，跟上重启后的守护进程；
+- IPCServer / ipc_request / ipc_subscribe: Unix socket 上按行分隔的 JSON 请求与应答，
+  用于状态快照、统计信息、手动分析与 SSE 事件转发。
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# 头部: magic, 槽位数, 槽位容量, 最新槽位, 最新帧序号, 读者心跳 (time.monotonic，系统范围单调时钟)
+_HEADER = struct.Struct("<IIIIQd")
+_HEADER_META = struct.Struct("<IIIIQ")  # 写入方只更新心跳之前的字段，避免覆盖读者心跳
+_HEARTBEAT_OFFSET = _HEADER_META.size
+# 写入方实例号：每次创建共享内存时随机生成，读者据此发现守护进程已重启
+_INSTANCE = struct.Struct("<Q")
+_INSTANCE_OFFSET = _HEADER.size
+_HEADER_SIZE = 64
+# 槽位头: 写入代数, 帧序号, 长度
+_SLOT = struct.Struct("<QQI")
+_SLOT_HEADER_SIZE = 24
+_MAGIC = 0x46495245  # "FIRE"
+_NO_SLOT = 0xFFFFFFFF
+
+
+class SharedFrameRing:
+    """共享内存 JPEG 环形缓冲；create=True 为写入方 (守护进程)，否则按名称附加为读者"""
+
+    def __init__(self, name: str, slots: int = 4, slot_bytes: int = 512 * 1024, create: bool = False):
+        self.name = name
+        self.owner = bool(create)
+        if create:
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            size = _HEADER_SIZE + slots * (_SLOT_HEADER_SIZE + slot_bytes)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.slots = int(slots)
+            self.slot_bytes = int(slot_bytes)
+            self.instance = int.from_bytes(os.urandom(8), "little")
+            _HEADER.pack_into(self.shm.buf, 0, _MAGIC, self.slots, self.slot_bytes, _NO_SLOT, 0, 0.0)
+            _INSTANCE.pack_into(self.shm.buf, _INSTANCE_OFFSET, self.instance)
+            for i in range(self.slots):
+                _SLOT.pack_into(self.shm.buf, self._slot_offset(i), 0, 0, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # 3.13 之前读者附加也会被 resource_tracker 登记，进程退出时会误删共享内存
+            try:
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            except Exception:
+                pass
+            magic, self.slots, self.slot_bytes, _, _, _ = _HEADER.unpack_from(self.shm.buf, 0)
+            if magic != _MAGIC:
+                self.shm.close()
+                raise ValueError(f"共享内存 {name} 不是帧缓冲")
+            self.instance = _INSTANCE.unpack_from(self.shm.buf, _INSTANCE_OFFSET)[0]
+        self._seq = 0
+        self._read_seq = None
+        self._read_progress = time.monotonic()
+        self.frames_written = 0
+        self.frames_oversize = 0
+        self.read_retries = 0
+
+    def _slot_offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * (_SLOT_HEADER_SIZE + self.slot_bytes)
+
+    def write(self, payload: bytes) -> bool:
+        if len(payload) > self.slot_bytes:
+            self.frames_oversize += 1
+            return False
+        buf = self.shm.buf
+        latest = _HEADER_META.unpack_from(buf, 0)[3]
+        index = 0 if latest == _NO_SLOT else (latest + 1) % self.slots
+        offset = self._slot_offset(index)
+        gen = _SLOT.unpack_from(buf, offset)[0]
+        self._seq += 1
+        _SLOT.pack_into(buf, offset, gen + 1, self._seq, len(payload))
+        start = offset + _SLOT_HEADER_SIZE
+        buf[start:start + len(payload)] = payload
+        _SLOT.pack_into(buf, offset, gen + 2, self._seq, len(payload))
+        _HEADER_META.pack_into(buf, 0, _MAGIC, self.slots, self.slot_bytes, index, self._seq)
+        self.frames_written += 1
+        return True
+
+    def read_latest(self):
+        """返回 (jpeg bytes, 帧序号)，尚无帧时返回 (None, None)；同时刷新读者心跳"""
+        buf = self.shm.buf
+        struct.pack_into("<d", buf, _HEARTBEAT_OFFSET, time.monotonic())
+        for _ in range(3):
+            latest = _HEADER_META.unpack_from(buf, 0)[3]
+            if latest == _NO_SLOT:
+                return None, None
+            offset = self._slot_offset(latest)
+            gen, seq, length = _SLOT.unpack_from(buf, offset)
+            if gen % 2 == 0:
+                start = offset + _SLOT_HEADER_SIZE
+                payload = bytes(buf[start:start + length])
+                if _SLOT.unpack_from(buf, offset)[0] == gen:
+                    if seq != self._read_seq:
+                        self._read_seq = seq
+                        self._read_progress = time.monotonic()
+                    return payload, seq
+            self.read_retries += 1
+        return None, None
+
+    def stalled_seconds(self) -> float:
+        """读者视角：距最新帧序号上次变化的时长 (守护进程重启后旧的共享内存不再被写入)"""
+        return time.monotonic() - self._read_progress
+
+    def reader_idle_seconds(self) -> float:
+        heartbeat = _HEADER.unpack_from(self.shm.buf, 0)[5]
+        return float("inf") if heartbeat <= 0 else time.monotonic() - heartbeat
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "instance": f"{self.instance:016x}",
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "frames_written": self.frames_written,
+            "frames_oversize": self.frames_oversize,
+            "reader_idle_seconds": round(min(self.reader_idle_seconds(), 1e6), 2),
+        }
+
+    def close(self):
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class IPCServer:
+    """Unix socket 服务：每行一个 JSON 请求 {"op": ..., "args": {...}}，应答一行 JSON
+
+    handlers 为 op -> 协程函数 (kwargs)；op == "subscribe" 时连接保持打开，
+    由 subscribe(writer) 持续写出事件行直到对端断开。
+    """
+
+    def __init__(self, path: str, handlers: dict, subscribe=None):
+        self.path = path
+        self.handlers = dict(handlers)
+        self.subscribe = subscribe
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.requests = 0
+        self.errors = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ipc-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = self.loop.run_until_complete(asyncio.start_unix_server(self._handle, path=self.path))
+        os.chmod(self.path, 0o660)
+        logging.info(f"IPC 服务已监听 {self.path}")
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self._server.close()
+            self.loop.run_until_complete(self._server.wait_closed())
+            self.loop.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                try:
+                    request = json.loads(line)
+                    op = request.get("op")
+                    if op == "subscribe" and self.subscribe is not None:
+                        await self.subscribe(writer)
+                        break
+                    handler = self.handlers.get(op)
+                    if handler is None:
+                        raise KeyError(f"未知的 IPC 操作: {op}")
+                    response = {"ok": True, "result": await handler(**(request.get("args") or {}))}
+                except Exception as e:
+                    self.errors += 1
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {"path": self.path, "requests": self.requests, "errors": self.errors}
+
+
+class IPCError(RuntimeError):
+    pass
+
+
+async def ipc_request(path: str, op: str, timeout: float = 3.0, **args):
+    """发送一次请求并返回 result；守护进程不可达或返回错误时抛出 IPCError"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(path), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise IPCError(f"无法连接守护进程 {path}: {e}") from e
+    try:
+        writer.write(json.dumps({"op": op, "args": args}).encode("utf-8") + b"\n")
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise IPCError(f"IPC 请求 {op} 失败: {e}") from e
+    finally:
+        writer.close()
+    if not line:
+        raise IPCError(f"IPC 请求 {op} 无应答")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise IPCError(response.get("error") or f"IPC 请求 {op} 失败")
+    return response.get("result")
+
+
+async def ipc_subscribe(path: str, timeout: float = 3.0):
+    """订阅守护进程事件，逐条产出 SSE payload 字符串；连接断开时结束"""
+    reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(path), timeout)
+    try:
+        writer.write(b'{"op": "subscribe"}\n')
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield json.loads(line)["payload"]
+    finally:
+        writer.close()
@@ -1,31 +1,158 @@
-import base64
+import asyncio
 import logging
 import json
 import re
-from openai import OpenAI
+import time
+import httpx
+from openai import AsyncOpenAI
 from config import Config
-import cv2
+from core.llm_breaker import OPEN, STATE_VALUES, CircuitBreaker, CircuitOpenError
+from core.llm_cache import LLMResultCache, canonical_context_key
+from core.llm_image import LLMImagePreparer
+from core.llm_prompt import build_summary_messages
+from core.rules import RuleSet
+from vision.detections import DetectionBatch
+from core.metrics import (
+    LLM_BREAKER_REJECTED,
+    LLM_BREAKER_STATE,
+    LLM_CACHE_HITS,
+    LLM_CACHE_MISSES,
+    LLM_CALL_SECONDS,
+    LLM_CALLS_ERROR,
+    LLM_CALLS_OK,
+    LLM_CALLS_TIMEOUT,
+    LLM_FIRST_TOKEN_SECONDS,
+)
+
+def _is_timeout(e: Exception) -> bool:
+    if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return True
+    msg = str(e).lower()
+    return "timed out" in msg or "timeout" in msg
+
+
+_JSON_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+def partial_json_string_field(text: str, key: str):
+    """从可能尚未闭合的 JSON 文本中取出字符串字段当前已生成的部分"""
+    m = re.search(r'"%s"\s*:\s*"' % re.escape(key), text)
+    if not m:
+        return None
+    out = []
+    i = m.end()
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            break
+        if ch == "\\":
+            if i + 1 >= n:
+                break
+            nxt = text[i + 1]
+            if nxt == "u":
+                digits = text[i + 2:i + 6]
+                if len(digits) < 4:
+                    break
+                try:
+                    out.append(chr(int(digits, 16)))
+                except ValueError:
+                    break
+                i += 6
+                continue
+            out.append(_JSON_ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
 
 class FireLLMAnalyzer:
     def __init__(self):
+        # 持久化的 HTTP 连接池 (keep-alive)，所有请求复用同一组连接；
+        # 只应在 LLMAnalysisService 的事件循环中使用
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(getattr(Config, "LLM_HTTP_MAX_CONNECTIONS", 4)),
+                max_keepalive_connections=int(getattr(Config, "LLM_HTTP_MAX_KEEPALIVE", 2)),
+                keepalive_expiry=float(getattr(Config, "LLM_HTTP_KEEPALIVE_SECONDS", 120)),
+            ),
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+        )
         # 根据配置决定使用本地还是云端
         if Config.LLM_MODE == "local":
-            self.client = OpenAI(
+            self.client = AsyncOpenAI(
                 api_key="ollama", # Ollama 不需要真实Key，但库需要占位符
-                base_url=Config.LLM_LOCAL_URL
+                base_url=Config.LLM_LOCAL_URL,
+                http_client=self.http_client,
             )
             self.model = ""
             logging.info(f"LLM分析器已初始化 (本地模式: {self.model})")
         else:
-            self.client = OpenAI(
+            self.client = AsyncOpenAI(
                 api_key=Config.LLM_API_KEY,
-                base_url=Config.LLM_BASE_URL
+                base_url=Config.LLM_BASE_URL,
+                http_client=self.http_client,
             )
             self.model = ""
             logging.info(f"LLM分析器已初始化 (云端模式: {self.model})")
 
+        self.cache = LLMResultCache(
+            max_entries=getattr(Config, "LLM_CACHE_MAX_ENTRIES", 64),
+            max_bytes=getattr(Config, "LLM_CACHE_MAX_BYTES", 256 * 1024),
+            ttl_seconds=getattr(Config, "LLM_CACHE_TTL_SECONDS", 300),
+        )
+
+        self.images = LLMImagePreparer()
+        # 与融合监控共用的编译后规则
+        self.rules = RuleSet()
+
+        self.breaker = CircuitBreaker(
+            window=getattr(Config, "LLM_BREAKER_WINDOW", 10),
+            failure_ratio=getattr(Config, "LLM_BREAKER_FAILURE_RATIO", 0.5),
+            min_calls=getattr(Config, "LLM_BREAKER_MIN_CALLS", 2),
+            slow_call_seconds=getattr(Config, "LLM_BREAKER_SLOW_CALL_SECONDS", 20),
+            open_seconds=getattr(Config, "LLM_BREAKER_PROBE_INTERVAL_SECONDS", 15),
+        )
+        self._probe_task = None
+
+        # 模型预热 / 常驻状态
+        self._keepalive_task = None
+        self._last_call_at = None
+        self.warm_model = None
+        self.model_ready = False
+        self.model_load_seconds = None
+        self.last_keepalive_at = None
+        self.warmup_error = ""
+
         self._refresh_model_from_config()
 
+    def _cache_key(self, context: dict) -> str:
+        return canonical_context_key(
+            context,
+            temp_step=float(getattr(Config, "LLM_CACHE_TEMP_STEP", 1.0)),
+            humidity_step=float(getattr(Config, "LLM_CACHE_HUMIDITY_STEP", 2.0)),
+            mq2_step=float(getattr(Config, "LLM_CACHE_MQ2_STEP", 500)),
+            conf_step=float(getattr(Config, "LLM_CACHE_CONF_STEP", 0.1)),
+            # 影响提示词或生成结果的配置都要进入键，切换后不再命中旧配置下的结果
+            extra=[
+                Config.LLM_MODE,
+                self.model,
+                bool(getattr(Config, "LLM_FORCE_CHINESE", True)),
+                getattr(Config, "LLM_PROMPT_VARIANT", "compact"),
+                bool(getattr(Config, "LLM_USE_IMAGE", False)),
+                getattr(Config, "LLM_MAX_TOKENS", None),
+                getattr(Config, "LLM_TEMPERATURE", None),
+                getattr(Config, "LLM_TOP_P", None),
+            ],
+        )
+
+    def get_cache_stats(self) -> dict:
+        stats = self.cache.stats()
+        stats["enabled"] = bool(getattr(Config, "LLM_CACHE_ENABLED", True))
+        return stats
+
     def _refresh_model_from_config(self):
         if Config.LLM_MODE == "local":
             if getattr(Config, "LLM_USE_IMAGE", False):
@@ -35,6 +162,182 @@ class FireLLMAnalyzer:
         else:
             self.model = Config.LLM_MODEL_CLOUD
 
+    def get_breaker_stats(self) -> dict:
+        stats = self.breaker.snapshot()
+        stats["enabled"] = bool(getattr(Config, "LLM_BREAKER_ENABLED", True))
+        return stats
+
+    def _short_circuit(self) -> bool:
+        """熔断器打开时返回 True，调用方应直接使用规则兜底"""
+        if not getattr(Config, "LLM_BREAKER_ENABLED", True):
+            return False
+        if self.breaker.short_circuit():
+            LLM_BREAKER_REJECTED.inc()
+            return True
+        return False
+
+    def _record_call(self, ok: bool, latency_s: float, error: str = "", permit=None):
+        if not getattr(Config, "LLM_BREAKER_ENABLED", True):
+            return
+        self.breaker.record(ok, latency_s, error, permit)
+        state = self.breaker.state
+        LLM_BREAKER_STATE.set(STATE_VALUES[state])
+        if state == OPEN and (self._probe_task is None or self._probe_task.done()):
+            logging.warning(f"LLM 熔断器打开，改用规则兜底: {self.breaker.last_error}")
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        """熔断期间定期探测后端 (GET /models)，探测成功后转为 half_open 放行一次试探调用"""
+        timeout = float(getattr(Config, "LLM_BREAKER_PROBE_TIMEOUT_SECONDS", 3))
+        while self.breaker.state == OPEN:
+            await asyncio.sleep(self.breaker.open_seconds)
+            try:
+                await self.client.models.list(timeout=timeout)
+            except Exception as e:
+                self.breaker.record_probe(False, str(e))
+                continue
+            self.breaker.record_probe(True)
+            LLM_BREAKER_STATE.set(STATE_VALUES[self.breaker.state])
+            logging.info("LLM 后端探测成功，熔断器进入半开状态")
+
+    def get_warmup_stats(self) -> dict:
+        return {
+            "enabled": bool(getattr(Config, "LLM_WARMUP_ENABLED", True)),
+            "model": self.warm_model,
+            "ready": self.model_ready and self.warm_model == self.model,
+            "load_seconds": self.model_load_seconds,
+            "last_keepalive_at": self.last_keepalive_at,
+            "error": self.warmup_error,
+        }
+
+    async def _ping_model(self, timeout: float) -> float:
+        """发送一次 max_tokens=1 的请求，促使后端加载模型并刷新 keep_alive；返回耗时"""
+        extra_body = None
+        if Config.LLM_MODE == "local":
+            extra_body = {"options": {"num_predict": 1}}
+            keep_alive = getattr(Config, "LLM_KEEP_ALIVE", None)
+            if keep_alive:
+                extra_body["keep_alive"] = keep_alive
+        started = time.perf_counter()
+        await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1,
+            temperature=0.0,
+            timeout=timeout,
+            extra_body=extra_body,
+        )
+        return time.perf_counter() - started
+
+    async def keep_warm(self):
+        """启动时预加载模型，之后周期性保活，使模型常驻内存
+
+        只在本地模式下有意义；预热请求不经过熔断器，首次加载本就很慢，不应计为慢调用。
+        距上次真实调用不足一个保活周期时跳过保活请求。
+        """
+        if Config.LLM_MODE != "local":
+            return
+        self._keepalive_task = asyncio.current_task()
+        timeout = float(getattr(Config, "LLM_WARMUP_TIMEOUT_SECONDS", 180))
+        interval = float(getattr(Config, "LLM_KEEPALIVE_INTERVAL_SECONDS", 600))
+        retry = float(getattr(Config, "LLM_WARMUP_RETRY_SECONDS", 30))
+        while True:
+            self._refresh_model_from_config()
+            fresh = (
+                self.model_ready
+                and self.warm_model == self.model
+                and self._last_call_at is not None
+                and time.monotonic() - self._last_call_at < interval
+            )
+            if not fresh:
+                try:
+                    elapsed = await self._ping_model(timeout)
+                except Exception as e:
+                    self.model_ready = False
+                    self.warmup_error = str(e)
+                    logging.warning(f"LLM 模型预热失败 ({self.model}): {e}")
+                    await asyncio.sleep(retry)
+                    continue
+                self.last_keepalive_at = time.time()
+                self.warmup_error = ""
+                if not self.model_ready or self.warm_model != self.model:
+                    self.warm_model = self.model
+                    self.model_ready = True
+                    self.model_load_seconds = round(elapsed, 3)
+                    logging.info(f"LLM 模型已就绪 ({self.model})，加载耗时 {elapsed:.1f}s")
+            if interval <= 0:
+                return
+            await asyncio.sleep(interval)
+
+    async def aclose(self):
+        for task in (self._probe_task, self._keepalive_task):
+            if task is not None:
+                task.cancel()
+        await self.client.close()
+
+    async def _create_completion(self, on_partial=None, **kwargs) -> str:
+        """调用 chat.completions.create 并返回文本内容，同时记录耗时与结果
+
+        开启 LLM_STREAM 且提供 on_partial 时以流式方式请求，每当已解析出的
+        description 增长时回调 on_partial(description)。
+        """
+        permit = None
+        if getattr(Config, "LLM_BREAKER_ENABLED", True):
+            permit = self.breaker.acquire()
+            if permit is None:
+                LLM_BREAKER_REJECTED.inc()
+                raise CircuitOpenError("LLM 熔断器已打开")
+        stream = bool(on_partial) and bool(getattr(Config, "LLM_STREAM", True))
+        started = time.perf_counter()
+        try:
+            if stream:
+                content = await self._stream_completion(on_partial, started, **kwargs)
+            else:
+                response = await self.client.chat.completions.create(**kwargs)
+                content = response.choices[0].message.content
+        except asyncio.CancelledError:
+            self.breaker.release(permit)
+            raise
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            LLM_CALL_SECONDS.observe(elapsed)
+            if _is_timeout(e):
+                LLM_CALLS_TIMEOUT.inc()
+            else:
+                LLM_CALLS_ERROR.inc()
+            self._record_call(False, elapsed, str(e), permit)
+            raise
+        elapsed = time.perf_counter() - started
+        LLM_CALL_SECONDS.observe(elapsed)
+        LLM_CALLS_OK.inc()
+        self._last_call_at = time.monotonic()
+        self._record_call(True, elapsed, permit=permit)
+        return content
+
+    async def _stream_completion(self, on_partial, started: float, **kwargs) -> str:
+        parts = []
+        last_desc = ""
+        first = True
+        stream = await self.client.chat.completions.create(stream=True, **kwargs)
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first:
+                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                first = False
+            parts.append(delta)
+            desc = partial_json_string_field("".join(parts), "description")
+            if desc and desc != last_desc:
+                last_desc = desc
+                try:
+                    on_partial(desc)
+                except Exception as e:
+                    logging.error(f"推送流式结果失败: {e}")
+        return "".join(parts)
+
     def _normalize_json(self, text: str, fallback_risk: str = "Normal") -> str:
         def _ensure(obj):
             risk = str(obj.get("risk_level", fallback_risk) or fallback_risk)
@@ -110,7 +413,7 @@ class FireLLMAnalyzer:
         if vision_fire_detected is True:
             parts.append("视觉检测到火焰")
         elif vision_fire_detected is False:
-            det_n = len(vision_detections) if isinstance(vision_detections, list) else 0
+            det_n = len(vision_detections) if vision_detections is not None else 0
             parts.append(f"视觉未检测到火焰(目标{det_n}个)")
         else:
             parts.append("视觉状态未知")
@@ -132,76 +435,21 @@ class FireLLMAnalyzer:
         )
 
     def _rule_risk(self, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected) -> str:
-        if vision_fire_detected is True:
-            return "Danger"
-        if smoke_detected is True:
-            return "Danger"
-
-        try:
-            if (
-                getattr(Config, "USE_ADC", False)
-                and mq2_value is not None
-                and float(mq2_value) > float(getattr(Config, "SMOKE_THRESHOLD_ANALOG", 15000))
-            ):
-                return "Danger"
-        except Exception:
-            pass
-
-        try:
-            if temperature is not None and float(temperature) > float(getattr(Config, "TEMP_THRESHOLD", 50.0)):
-                return "Warning"
-        except Exception:
-            pass
-
-        try:
-            if (
-                humidity is not None
-                and temperature is not None
-                and float(humidity) < float(getattr(Config, "HUMIDITY_THRESHOLD", 20.0))
-                and float(temperature) >= float(getattr(Config, "HUMIDITY_WARNING_TEMP_MIN", 35.0))
-            ):
-                return "Warning"
-        except Exception:
-            pass
-
-        return "Normal"
-
-    def encode_image(self, image):
-        """将OpenCV图像转换为Base64字符串"""
-        if image is None:
-            return None
-        try:
-            h, w = image.shape[:2]
-            max_side = int(getattr(Config, "LLM_IMAGE_MAX_SIDE", 384))
-            if max(h, w) > max_side:
-                scale = max_side / float(max(h, w))
-                new_w = max(1, int(w * scale))
-                new_h = max(1, int(h * scale))
-                image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        except Exception:
-            pass
-
-        quality = int(getattr(Config, "LLM_IMAGE_JPEG_QUALITY", 55))
-        _, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
-        return base64.b64encode(buffer).decode('utf-8')
-
-    def analyze_summary(self, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections):
-        self._refresh_model_from_config()
-        if Config.LLM_MODE == "cloud" and not Config.LLM_API_KEY:
-            logging.warning("未配置 LLM API Key，跳过大模型分析")
-            return "未配置大模型，仅依据规则引擎报警"
-
-        rule_risk = self._rule_risk(temperature, humidity, smoke_detected, mq2_value, vision_fire_detected)
+        return self.rules.evaluate(
+            {
+                "temperature": temperature,
+                "humidity": humidity,
+                "smoke": smoke_detected,
+                "mq2": mq2_value,
+                "vision_fire": vision_fire_detected,
+            }
+        )
 
+    def _summary_context(self, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections, rule_risk) -> dict:
+        # 送给模型的上下文 (JSON) 只需要置信度最高的 5 个目标的标签与置信度
         dets = []
-        if isinstance(vision_detections, list) and vision_detections:
-            for d in vision_detections[:5]:
-                dets.append(
-                    {
-                        "label": d.get("label"),
-                        "confidence": float(d.get("confidence", 0) or 0),
-                    }
-                )
+        if vision_detections:
+            dets = [{"label": label, "confidence": conf} for label, conf in vision_detections.top(5).label_confidences()]
 
         try:
             temp_over = temperature is not None and float(temperature) > float(getattr(Config, "TEMP_THRESHOLD", 50.0))
@@ -232,7 +480,7 @@ class FireLLMAnalyzer:
         except Exception:
             mq2_over = None
 
-        context = {
+        return {
             "temperature_c": temperature,
             "humidity_pct": humidity,
             "smoke_digital": smoke_detected,
@@ -250,23 +498,36 @@ class FireLLMAnalyzer:
             "humidity_warning_temp_min": getattr(Config, "HUMIDITY_WARNING_TEMP_MIN", 35.0),
         }
 
-        if getattr(Config, "LLM_FORCE_CHINESE", True):
-            prompt_prefix = (
-                "你将收到来自传感器与YOLO的JSON数据。不得编造任何未给出的信息；"
-                "遇到null/None必须写“未知”。严格只输出JSON，不要Markdown/解释文字。"
-                "输出字段必须且仅包含：risk_level、description、suggestion。"
-                "risk_level必须与输入的risk_level完全一致(只能是Normal/Warning/Danger)。"
-                "description与suggestion必须使用中文。"
-                "描述中不得声称温度/湿度/烟雾/视觉“异常/触发”，除非对应字段为true：temp_over_threshold、humidity_low_effective、mq2_over_threshold、smoke_digital、vision_fire。\n"
-            )
-        else:
-            prompt_prefix = (
-                "You will be given JSON data from sensors and YOLO. Do NOT invent values. "
-                "If a field is null/None, say 'unavailable'. Output ONLY JSON with keys risk_level, description, suggestion. "
-                "risk_level MUST equal input.risk_level.\n"
-            )
+    async def analyze_summary(self, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections, on_partial=None, rule_risk=None):
+        self._refresh_model_from_config()
+        if Config.LLM_MODE == "cloud" and not Config.LLM_API_KEY:
+            logging.warning("未配置 LLM API Key，跳过大模型分析")
+            return "未配置大模型，仅依据规则引擎报警"
+        vision_detections = DetectionBatch.coerce(vision_detections)
+
+        if rule_risk is None:
+            rule_risk = self._rule_risk(temperature, humidity, smoke_detected, mq2_value, vision_fire_detected)
 
-        prompt = prompt_prefix + json.dumps(context, ensure_ascii=False, separators=(",", ":"))
+        context = self._summary_context(temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections, rule_risk)
+
+        cache_key = None
+        if getattr(Config, "LLM_CACHE_ENABLED", True):
+            cache_key = self._cache_key(context)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                LLM_CACHE_HITS.inc()
+                logging.info("LLM 结果缓存命中，跳过大模型调用")
+                return cached
+            LLM_CACHE_MISSES.inc()
+
+        if self._short_circuit():
+            return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
+
+        messages = build_summary_messages(
+            context,
+            force_chinese=bool(getattr(Config, "LLM_FORCE_CHINESE", True)),
+            variant=getattr(Config, "LLM_PROMPT_VARIANT", "compact"),
+        )
 
         try:
             logging.info(f"正在调用大模型 ({self.model})...")
@@ -280,17 +541,22 @@ class FireLLMAnalyzer:
                         "num_ctx": int(getattr(Config, "LLM_NUM_CTX", 512)),
                     }
                 }
+                keep_alive = getattr(Config, "LLM_KEEP_ALIVE", None)
+                if keep_alive:
+                    # 模型常驻时，Ollama 可复用与上次请求相同的 system 前缀的 KV cache
+                    extra_body["keep_alive"] = keep_alive
 
-            response = self.client.chat.completions.create(
+            content = await self._create_completion(
+                on_partial=on_partial,
                 model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=messages,
                 max_tokens=getattr(Config, "LLM_MAX_TOKENS", 120),
                 temperature=getattr(Config, "LLM_TEMPERATURE", 0.0),
                 top_p=getattr(Config, "LLM_TOP_P", 0.3),
                 timeout=Config.LLM_TIMEOUT_SECONDS,
                 extra_body=extra_body,
             )
-            normalized = self._normalize_json(response.choices[0].message.content, fallback_risk=rule_risk)
+            normalized = self._normalize_json(content, fallback_risk=rule_risk)
             try:
                 obj = json.loads(normalized)
             except Exception:
@@ -309,7 +575,7 @@ class FireLLMAnalyzer:
             if not isinstance(sug, str) or self._is_json_like(sug):
                 obj["suggestion"] = json.loads(self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)).get("suggestion", "")
 
-            return json.dumps(
+            result = json.dumps(
                 {
                     "risk_level": obj.get("risk_level", rule_risk),
                     "description": obj.get("description", ""),
@@ -317,29 +583,47 @@ class FireLLMAnalyzer:
                 },
                 ensure_ascii=False,
             )
+            if cache_key is not None:
+                self.cache.put(cache_key, result)
+            return result
+        except CircuitOpenError:
+            return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
         except Exception as e:
             logging.error(f"LLM分析失败: {e}")
             return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
 
-    def analyze(self, temperature, humidity, smoke_detected, image, mq2_value=None, vision_fire_detected=None, vision_detections=None):
-        """调用大模型进行分析"""
+    async def analyze(self, temperature, humidity, smoke_detected, image, mq2_value=None, vision_fire_detected=None, vision_detections=None, on_partial=None, frame_seq=None, rule_risk=None):
+        """调用大模型进行分析；rule_risk 为融合监控已判定的风险等级，缺省时按当前取值无状态判定"""
         self._refresh_model_from_config()
         # 云端模式下如果没有Key则跳过
         if Config.LLM_MODE == "cloud" and not Config.LLM_API_KEY:
             logging.warning("未配置 LLM API Key，跳过大模型分析")
             return "未配置大模型，仅依据传感器数据报警"
+        vision_detections = DetectionBatch.coerce(vision_detections)
 
         if not getattr(Config, "LLM_USE_IMAGE", False):
-            return self.analyze_summary(
+            return await self.analyze_summary(
                 temperature=temperature,
                 humidity=humidity,
                 smoke_detected=smoke_detected,
                 mq2_value=mq2_value,
                 vision_fire_detected=vision_fire_detected,
                 vision_detections=vision_detections,
+                on_partial=on_partial,
+                rule_risk=rule_risk,
             )
 
-        base64_image = self.encode_image(image)
+        if rule_risk is None:
+            rule_risk = self._rule_risk(temperature, humidity, smoke_detected, mq2_value, vision_fire_detected)
+
+        if self._short_circuit():
+            return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
+
+        try:
+            base64_image = self.images.prepare(image, frame_seq, vision_detections)
+        except Exception as e:
+            logging.error(f"图像准备失败: {e}")
+            base64_image = None
         if not base64_image:
             prompt = f"""
             你是一个家庭火灾安全专家。请根据以下传感器数据判断是否存在火灾风险。
@@ -359,15 +643,20 @@ class FireLLMAnalyzer:
 
             try:
                 logging.info(f"正在调用大模型 ({self.model})...")
-                response = self.client.chat.completions.create(
+                content = await self._create_completion(
+                    on_partial=on_partial,
                     model=self.model,
                     messages=[{"role": "user", "content": prompt}],
                     max_tokens=200,
                     timeout=Config.LLM_TIMEOUT_SECONDS,
                 )
-                return response.choices[0].message.content
+                return content
+            except CircuitOpenError:
+                return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
             except Exception as e:
                 logging.error(f"LLM分析失败: {e}")
+                if self.breaker.state == OPEN:
+                    return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
                 return f"智能分析服务暂时不可用 ({str(e)})"
 
         prompt = f"""
@@ -387,9 +676,11 @@ class FireLLMAnalyzer:
         请以JSON格式返回，包含字段: risk_level (String), description (String), suggestion (String)。
         """
 
+        started = time.perf_counter()
         try:
             logging.info(f"正在调用大模型 ({self.model})...")
-            response = self.client.chat.completions.create(
+            content = await self._create_completion(
+                on_partial=on_partial,
                 model=self.model,
                 messages=[
                     {
@@ -408,20 +699,13 @@ class FireLLMAnalyzer:
                 max_tokens=200,
                 timeout=Config.LLM_TIMEOUT_SECONDS,
             )
-            return response.choices[0].message.content
+            return content
+        except CircuitOpenError:
+            return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
         except Exception as e:
-            msg = str(e)
             logging.error(f"LLM分析失败: {e}")
-            if "timed out" in msg.lower() or "timeout" in msg.lower():
-                try:
-                    response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=[{"role": "user", "content": prompt}],
-                        max_tokens=200,
-                        timeout=Config.LLM_TIMEOUT_SECONDS,
-                    )
-                    return response.choices[0].message.content
-                except Exception as e2:
-                    logging.error(f"LLM分析失败: {e2}")
-                    return f"智能分析服务暂时不可用 ({str(e2)})"
+            # 超时或慢调用已计入熔断器的失败统计；不再追加一次同样可能耗尽超时的纯文本调用，
+            # 直接用规则兜底，由熔断器决定何时停止 / 恢复调用
+            if _is_timeout(e) or time.perf_counter() - started > self.breaker.slow_call_seconds or self.breaker.state == OPEN:
+                return self._fallback_result_cn(rule_risk, temperature, humidity, smoke_detected, mq2_value, vision_fire_detected, vision_detections)
             return f"智能分析服务暂时不可用 ({str(e)})"
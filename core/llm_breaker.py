@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出"""
+
+
+class Permit:
+    """acquire() 发放的放行许可；调用结束后交回 record() 或 release()"""
+
+    __slots__ = ("trial",)
+
+    def __init__(self, trial: bool):
+        self.trial = trial
+
+
+class CircuitBreaker:
+    """大模型调用的熔断器
+
+    - closed: 正常放行；在最近 window 次调用中失败 (异常或耗时超过 slow_call_seconds)
+      比例达到 failure_ratio 且样本数不少于 min_calls 时转为 open；
+    - open: 直接拒绝，调用方立即走规则兜底；由后台探测确认后端恢复后转为 half_open；
+    - half_open: 只放行一次试探调用，成功则 closed，失败则重新 open；
+      只有持有试探许可的调用能结束 half_open 或归还试探名额。
+
+    记录与查询可能来自不同线程 (LLM 事件循环与 Web 请求)，内部用锁保护。
+    """
+
+    def __init__(
+        self,
+        window: int = 10,
+        failure_ratio: float = 0.5,
+        min_calls: int = 3,
+        slow_call_seconds: float = 20.0,
+        open_seconds: float = 15.0,
+    ):
+        self.window = max(1, int(window))
+        self.failure_ratio = float(failure_ratio)
+        self.min_calls = max(1, int(min_calls))
+        self.slow_call_seconds = float(slow_call_seconds)
+        self.open_seconds = float(open_seconds)
+        self._outcomes = deque(maxlen=self.window)  # (ok, latency_s)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial = None  # half_open 下已发放的试探许可
+        self._lock = threading.Lock()
+        self.rejected_total = 0
+        self.opened_total = 0
+        self.last_error = ""
+        self.last_probe_at = None
+        self.last_probe_ok = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def acquire(self):
+        """放行一次真实调用时返回 Permit，拒绝时返回 None 并计数"""
+        with self._lock:
+            if self._state == CLOSED:
+                return Permit(trial=False)
+            if self._state == HALF_OPEN and self._trial is None:
+                self._trial = Permit(trial=True)
+                return self._trial
+            self.rejected_total += 1
+            return None
+
+    def short_circuit(self) -> bool:
+        """处于 open 状态时返回 True 并计为一次拒绝；不占用 half_open 的试探名额"""
+        with self._lock:
+            if self._state == OPEN:
+                self.rejected_total += 1
+                return True
+            return False
+
+    def release(self, permit):
+        """调用被取消 (未产生结果) 时交回许可；只有当前的试探许可会归还试探名额"""
+        with self._lock:
+            if permit is not None and permit is self._trial:
+                self._trial = None
+
+    def record(self, ok: bool, latency_s: float, error: str = "", permit=None):
+        failed = (not ok) or latency_s > self.slow_call_seconds
+        with self._lock:
+            if failed:
+                self.last_error = error or f"慢调用 {latency_s:.1f}s"
+            if self._state == HALF_OPEN:
+                # 熔断前发出、此时才结束的调用不代表试探结果
+                if permit is None or permit is not self._trial:
+                    return
+                self._trial = None
+                if failed:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((not failed, latency_s))
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for good, _ in self._outcomes if not good)
+                if failures / len(self._outcomes) >= self.failure_ratio:
+                    self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened_total += 1
+
+    def record_probe(self, ok: bool, error: str = ""):
+        with self._lock:
+            self.last_probe_at = time.time()
+            self.last_probe_ok = ok
+            if self._state != OPEN:
+                return
+            if ok:
+                self._state = HALF_OPEN
+                self._trial = None
+            else:
+                self._opened_at = time.monotonic()
+                if error:
+                    self.last_error = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(lat for _, lat in self._outcomes)
+            failures = sum(1 for good, _ in self._outcomes if not good)
+            return {
+                "state": self._state,
+                "ok": self._state != OPEN,
+                "window_calls": len(self._outcomes),
+                "window_failures": failures,
+                "window_p50_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "window_max_s": round(latencies[-1], 3) if latencies else None,
+                "open_for_s": round(time.monotonic() - self._opened_at, 1) if self._state == OPEN else None,
+                "opened_total": self.opened_total,
+                "rejected_total": self.rejected_total,
+                "last_error": self.last_error,
+                "last_probe_at": self.last_probe_at,
+                "last_probe_ok": self.last_probe_ok,
+            }
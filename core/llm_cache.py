@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def _bucket(value, step: float):
+    if value is None:
+        return None
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if step <= 0:
+        return v
+    return round(round(v / step) * step, 6)
+
+
+def canonical_context_key(context: dict, temp_step: float, humidity_step: float, mq2_step: float, conf_step: float, extra=None) -> str:
+    """把 analyze_summary 的上下文量化为稳定的缓存键
+
+    读数按步长分桶，检测目标只保留 (标签, 置信度分桶) 并排序，
+    这样持续告警状态下的微小波动会命中同一条缓存。
+    """
+    dets = sorted(
+        (str(d.get("label", "")).lower(), _bucket(d.get("confidence", 0), conf_step))
+        for d in (context.get("detections") or [])
+    )
+    quantized = {
+        "risk_level": context.get("risk_level"),
+        "temperature_c": _bucket(context.get("temperature_c"), temp_step),
+        "humidity_pct": _bucket(context.get("humidity_pct"), humidity_step),
+        "mq2_analog": _bucket(context.get("mq2_analog"), mq2_step),
+        "smoke_digital": context.get("smoke_digital"),
+        "vision_fire": context.get("vision_fire"),
+        "temp_over_threshold": context.get("temp_over_threshold"),
+        "humidity_low_effective": context.get("humidity_low_effective"),
+        "mq2_over_threshold": context.get("mq2_over_threshold"),
+        "detections": dets,
+        "extra": extra,
+    }
+    return json.dumps(quantized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+class LLMResultCache:
+    """LRU + TTL 结果缓存，同时限制条目数与总字节数"""
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 256 * 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at, size = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self._bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
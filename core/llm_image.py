@@ -0,0 +1,190 @@
+"""视觉大模型的图像准备
+
+- 有检测框时只把检测区域 (外扩一圈上下文) 送给模型：单个区域直接裁剪，
+  多个区域拼成网格，整体不超过 LLM_IMAGE_MAX_SIDE (模型的原生输入尺寸)；
+- 无需裁剪时优先复用 /video_feed 已经为同一帧编码好的 JPEG；
+- base64 结果按 (帧序号, 区域) 缓存，同一帧的重试 / 重复分析不再重新编码。
+"""
+import base64
+import math
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from config import Config
+from core.metrics import LLM_IMAGE_BYTES, LLM_IMAGE_PREPARE_SECONDS
+from vision.detections import DetectionBatch
+
+
+class EncodedFrameCache:
+    """最近若干帧的 JPEG 编码结果 (帧序号 -> (jpeg bytes, 宽, 高))
+
+    视频流在未绘制检测框时写入，多个 /video_feed 客户端与大模型图像准备共用同一次编码。
+    source 可设为 callable(seq) -> (jpeg bytes, 宽, 高) | None，未命中时向其查询
+    (摄像头 MJPEG 直通模式下直接取摄像头输出的 JPEG)。
+    """
+
+    def __init__(self, max_entries: int = 4, source=None):
+        self.max_entries = max(1, int(max_entries))
+        self.source = source
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, seq):
+        if seq is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(seq)
+        if entry is None and self.source is not None:
+            entry = self.source(seq)
+        return entry
+
+    def put(self, seq, jpeg_bytes: bytes, width: int, height: int):
+        if seq is None or not jpeg_bytes:
+            return
+        with self._lock:
+            self._entries[seq] = (jpeg_bytes, int(width), int(height))
+            self._entries.move_to_end(seq)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _fit(image, max_side: int):
+    """等比缩小到最长边不超过 max_side；不放大，由模型自行缩放"""
+    h, w = image.shape[:2]
+    if max(h, w) <= max_side:
+        return image
+    scale = max_side / float(max(h, w))
+    return cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def detection_regions(detections, width: int, height: int, pad: float, max_regions: int, min_conf: float = 0.0):
+    """检测框外扩 pad 倍后裁到画面内，按置信度取前 max_regions 个，重叠的区域合并"""
+    boxes = []
+    detections = DetectionBatch.coerce(detections)
+    if not detections:
+        return []
+    for x1, y1, x2, y2 in detections.top(len(detections), min_conf).data["box"].tolist():
+        bw, bh = x2 - x1, y2 - y1
+        if bw <= 1 or bh <= 1:
+            continue
+        x1 = max(0, int(x1 - bw * pad))
+        y1 = max(0, int(y1 - bh * pad))
+        x2 = min(width, int(math.ceil(x2 + bw * pad)))
+        y2 = min(height, int(math.ceil(y2 + bh * pad)))
+        if x2 - x1 > 1 and y2 - y1 > 1:
+            boxes.append([x1, y1, x2, y2])
+
+    merged = []
+    for b in boxes:
+        for m in merged:
+            if b[0] < m[2] and m[0] < b[2] and b[1] < m[3] and m[1] < b[3]:
+                m[0], m[1], m[2], m[3] = min(m[0], b[0]), min(m[1], b[1]), max(m[2], b[2]), max(m[3], b[3])
+                break
+        else:
+            merged.append(b)
+        if len(merged) >= max_regions:
+            break
+    return [tuple(m) for m in merged]
+
+
+def mosaic(crops, max_side: int):
+    """把多个裁剪区域缩放后拼成近似正方形的网格，每格 max_side / 列数"""
+    cols = int(math.ceil(math.sqrt(len(crops))))
+    rows = int(math.ceil(len(crops) / cols))
+    cell = max(1, max_side // cols)
+    canvas = np.zeros((rows * cell, cols * cell, 3), dtype=np.uint8)
+    for i, crop in enumerate(crops):
+        tile = _fit(crop, cell)
+        th, tw = tile.shape[:2]
+        r, c = divmod(i, cols)
+        y0 = r * cell + (cell - th) // 2
+        x0 = c * cell + (cell - tw) // 2
+        canvas[y0:y0 + th, x0:x0 + tw] = tile
+    return canvas
+
+
+class LLMImagePreparer:
+    def __init__(self, cache_entries: int = 8):
+        self.encoded_frames = EncodedFrameCache()
+        self._cache = OrderedDict()
+        self._cache_entries = max(1, int(cache_entries))
+        self._lock = threading.Lock()
+        self.stats_counts = {"full": 0, "crop": 0, "mosaic": 0, "reused_jpeg": 0, "cache_hits": 0}
+        self.last_bytes = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.stats_counts)
+        out["last_bytes"] = self.last_bytes
+        return out
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats_counts[key] += 1
+
+    def prepare(self, frame, frame_seq=None, detections=None):
+        """返回送给视觉模型的 base64 JPEG，失败时返回 None"""
+        if frame is None:
+            return None
+        max_side = int(getattr(Config, "LLM_IMAGE_MAX_SIDE", 384))
+        h, w = frame.shape[:2]
+        regions = []
+        if getattr(Config, "LLM_IMAGE_CROP", True):
+            regions = detection_regions(
+                detections,
+                w,
+                h,
+                pad=float(getattr(Config, "LLM_IMAGE_CROP_PAD", 0.25)),
+                max_regions=int(getattr(Config, "LLM_IMAGE_MAX_REGIONS", 4)),
+            )
+
+        key = (frame_seq, tuple(regions), max_side) if frame_seq is not None else None
+        if key is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.stats_counts["cache_hits"] += 1
+                    return cached
+
+        with LLM_IMAGE_PREPARE_SECONDS.time():
+            payload = self._encode(frame, frame_seq, regions, max_side)
+        if payload is None:
+            return None
+        b64 = base64.b64encode(payload).decode("utf-8")
+        self.last_bytes = len(payload)
+        LLM_IMAGE_BYTES.observe(len(payload))
+        if key is not None:
+            with self._lock:
+                self._cache[key] = b64
+                while len(self._cache) > self._cache_entries:
+                    self._cache.popitem(last=False)
+        return b64
+
+    def _encode(self, frame, frame_seq, regions, max_side: int):
+        if regions:
+            crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+            if len(crops) == 1:
+                image = _fit(crops[0], max_side)
+                self._count("crop")
+            else:
+                image = mosaic(crops, max_side)
+                self._count("mosaic")
+        else:
+            if getattr(Config, "LLM_IMAGE_REUSE_STREAM_JPEG", True):
+                cached = self.encoded_frames.get(frame_seq)
+                # 只复用不超过 max_side 的编码结果，否则照常缩小后重新编码
+                if cached is not None and max(cached[1], cached[2]) <= max_side:
+                    self._count("reused_jpeg")
+                    return cached[0]
+            image = _fit(frame, max_side)
+            self._count("full")
+
+        quality = int(getattr(Config, "LLM_IMAGE_JPEG_QUALITY", 55))
+        ok, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if not ok:
+            return None
+        return buffer.tobytes()
@@ -0,0 +1,120 @@
+"""analyze_summary 的提示词构建
+
+静态部分 (指令 + 阈值) 放在 system 消息中且按配置缓存，每次请求逐字节相同，
+Ollama 在模型常驻 (keep_alive) 时可以复用这段前缀的 KV cache，只需对后面的动态数据做 prompt eval；
+动态部分只编码非默认值、已触发或未知 (null) 的字段。
+"""
+import json
+import re
+from functools import lru_cache
+
+_INSTRUCTIONS_CN = (
+    "你将收到来自传感器与YOLO的JSON数据。不得编造任何未给出的信息；"
+    "遇到null/None必须写“未知”。严格只输出JSON，不要Markdown/解释文字。"
+    "输出字段必须且仅包含：risk_level、description、suggestion。"
+    "risk_level必须与输入的risk_level完全一致(只能是Normal/Warning/Danger)。"
+    "description与suggestion必须使用中文。"
+    "描述中不得声称温度/湿度/烟雾/视觉“异常/触发”，除非对应字段为true：temp_over_threshold、humidity_low_effective、mq2_over_threshold、smoke_digital、vision_fire。"
+)
+_INSTRUCTIONS_EN = (
+    "You will be given JSON data from sensors and YOLO. Do NOT invent values. "
+    "If a field is null/None, say 'unavailable'. Output ONLY JSON with keys risk_level, description, suggestion. "
+    "risk_level MUST equal input.risk_level."
+)
+
+# 紧凑编码：布尔标志为 false 时省略，缺省即 false；读数缺失 (null) 的字段照常出现
+_COMPACT_NOTE_CN = "输入中未出现的布尔字段均为false，值为null的字段表示未知；阈值：温度{temp}℃，湿度{hum}%(仅当温度≥{hum_temp}℃时湿度过低才有效){mq2}。"
+_COMPACT_NOTE_EN = " Boolean fields that are absent are false; null fields are unknown. Thresholds: temperature {temp}C, humidity {hum}% (only effective at >= {hum_temp}C){mq2}."
+
+# 紧凑编码中始终保留的字段 (即使为 null，模型也需要据此写"未知")
+_ALWAYS_KEEP = ("risk_level", "temperature_c", "humidity_pct")
+# 只作为静态阈值写入 system 前缀，不再出现在每次的上下文中
+_THRESHOLD_KEYS = ("temp_threshold", "humidity_threshold", "humidity_warning_temp_min", "mq2_threshold")
+
+PROMPT_VARIANTS = ("verbose", "compact")
+
+
+@lru_cache(maxsize=8)
+def system_prefix(force_chinese: bool, temp_threshold, humidity_threshold, humidity_warning_temp_min, mq2_threshold) -> str:
+    """紧凑模式下的 system 消息；参数不变时返回同一个字符串对象"""
+    if force_chinese:
+        mq2 = f"，MQ-2模拟值{mq2_threshold}" if mq2_threshold is not None else ""
+        return _INSTRUCTIONS_CN + _COMPACT_NOTE_CN.format(
+            temp=temp_threshold, hum=humidity_threshold, hum_temp=humidity_warning_temp_min, mq2=mq2
+        )
+    mq2 = f", MQ-2 analog {mq2_threshold}" if mq2_threshold is not None else ""
+    return _INSTRUCTIONS_EN + _COMPACT_NOTE_EN.format(
+        temp=temp_threshold, hum=humidity_threshold, hum_temp=humidity_warning_temp_min, mq2=mq2
+    )
+
+
+def compact_context(context: dict) -> dict:
+    """只保留非默认值、已触发或未知的字段：去掉阈值、false 标志与空列表
+
+    null 必须保留：system 前缀声明"未出现的布尔字段均为false"，省略 null 会把未知的
+    传感器状态 (如烟雾数字量读取失败) 变成 false。
+    """
+    out = {}
+    for key, value in context.items():
+        if key in _THRESHOLD_KEYS:
+            continue
+        if key in _ALWAYS_KEEP:
+            out[key] = value
+        elif key == "detections":
+            if value:
+                out[key] = [
+                    {"label": d.get("label"), "confidence": round(float(d.get("confidence", 0) or 0), 2)} for d in value
+                ]
+        elif value is not False and value != []:
+            out[key] = value
+    return out
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_summary_messages(context: dict, force_chinese: bool = True, variant: str = "compact") -> list:
+    """构建 chat.completions 的 messages
+
+    verbose: 与旧版一致，单条 user 消息 = 指令 + 完整上下文；
+    compact: 缓存的静态 system 前缀 + 只含动态字段的 user 消息。
+    """
+    if variant == "verbose":
+        prefix = _INSTRUCTIONS_CN if force_chinese else _INSTRUCTIONS_EN
+        return [{"role": "user", "content": prefix + "\n" + _dumps(context)}]
+    system = system_prefix(
+        bool(force_chinese),
+        context.get("temp_threshold"),
+        context.get("humidity_threshold"),
+        context.get("humidity_warning_temp_min"),
+        context.get("mq2_threshold"),
+    )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": _dumps(compact_context(context))},
+    ]
+
+
+_CJK = re.compile(r"[　-〿一-鿿＀-￯]")
+_WORD = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数 (中文按字、英文按词、数字与符号逐个计)，用于对比提示词变体"""
+    cjk = len(_CJK.findall(text))
+    rest = _CJK.sub(" ", text)
+    return cjk + len(_WORD.findall(rest))
+
+
+def prompt_report(messages: list) -> dict:
+    """每条消息与总计的字符数 / 估算 token 数；static_tokens 是可复用前缀的部分"""
+    per_role = []
+    static = 0
+    for m in messages:
+        tokens = estimate_tokens(m["content"])
+        per_role.append({"role": m["role"], "chars": len(m["content"]), "tokens_est": tokens})
+        if m["role"] == "system":
+            static += tokens
+    total = sum(p["tokens_est"] for p in per_role)
+    return {"messages": per_role, "tokens_est": total, "static_tokens_est": static, "dynamic_tokens_est": total - static}
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import Future
+
+# 数值越小优先级越高
+PRIORITY_DANGER = 0
+PRIORITY_WARNING = 1
+PRIORITY_MANUAL = 2
+PRIORITY_PERIODIC = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_DANGER: "danger",
+    PRIORITY_WARNING: "warning",
+    PRIORITY_MANUAL: "manual",
+    PRIORITY_PERIODIC: "periodic",
+}
+
+# 告警触发的任务：风险从 Warning / Danger 回到 Normal 时可直接取消 (定时分析只在 Normal 时发起，不取消)
+AUTO_PRIORITIES = (PRIORITY_DANGER, PRIORITY_WARNING)
+
+
+def priority_for_trigger(trigger: str) -> int:
+    if trigger == "auto:Danger":
+        return PRIORITY_DANGER
+    if trigger == "auto:Warning":
+        return PRIORITY_WARNING
+    if trigger == "periodic":
+        return PRIORITY_PERIODIC
+    return PRIORITY_MANUAL
+
+
+class LLMJob:
+    """一次大模型分析任务
+
+    result_future 是交给调用方的结果；exec_future 是实际执行的协程。
+    任务被更高优先级抢占时 exec_future 被取消，result_future 改由抢占者的结果填充。
+    """
+
+    __slots__ = ("priority", "trigger", "result_future", "exec_future", "preempted", "submitted_at")
+
+    def __init__(self, priority: int, trigger: str):
+        self.priority = priority
+        self.trigger = trigger
+        self.result_future = Future()
+        self.exec_future = None
+        self.preempted = False
+        self.submitted_at = time.monotonic()
+
+    def done(self) -> bool:
+        return self.result_future.done()
+
+
+class TokenBucket:
+    """令牌桶：容量 capacity，每 refill_seconds 秒补充一个令牌"""
+
+    def __init__(self, capacity: float, refill_seconds: float):
+        self.capacity = max(1.0, float(capacity))
+        self.refill_seconds = max(0.001, float(refill_seconds))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed / self.refill_seconds)
+            self._updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+def build_budgets(config: dict) -> dict:
+    return {
+        name: TokenBucket(spec.get("capacity", 1), spec.get("refill_seconds", 60))
+        for name, spec in (config or {}).items()
+    }
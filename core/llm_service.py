@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+
+from core.llm_scheduler import PRIORITY_NAMES, LLMJob
+
+
+class LLMAnalysisService:
+    """在独立线程中运行 asyncio 事件循环，承载所有大模型请求
+
+    - 事件循环与 FireLLMAnalyzer 的 AsyncOpenAI/httpx 连接池常驻，请求间复用 keep-alive 连接；
+    - 同一时刻只执行一个任务。新任务优先级不高于在途任务时合并到在途任务上，
+      所有调用方拿到同一个 Future 与同一份结果；优先级更高时取消在途任务并立即执行，
+      被抢占任务的调用方得到抢占者的结果。
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._current = None
+        self.coalesced_total = 0
+        self.preempted_total = 0
+        self.cancelled_total = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="llm-service", daemon=True)
+            self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(self.analyzer.aclose())
+            except Exception:
+                pass
+            loop.close()
+
+    def stop(self):
+        loop = self._loop
+        if loop is None:
+            return
+        self.cancel()
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def spawn(self, coro):
+        """在服务事件循环上运行一个后台协程 (如模型预热)，不参与任务调度"""
+        if self._loop is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def in_progress(self) -> bool:
+        with self._lock:
+            return self._current is not None and not self._current.done()
+
+    def current_priority(self):
+        with self._lock:
+            if self._current is None or self._current.done():
+                return None
+            return self._current.priority
+
+    def would_coalesce(self, priority: int) -> bool:
+        """在途任务的优先级不低于 priority 时，新提交会被合并"""
+        current = self.current_priority()
+        return current is not None and current <= priority
+
+    def submit(self, coro_factory, priority: int, trigger: str = ""):
+        """提交一次分析；返回 (concurrent.futures.Future, 是否合并到在途任务)
+
+        coro_factory(job) 只在真正发起新任务时调用，避免为被合并的触发创建多余的协程。
+        """
+        if self._loop is None:
+            self.start()
+        with self._lock:
+            current = self._current
+            if current is not None and not current.done():
+                if current.priority <= priority:
+                    self.coalesced_total += 1
+                    return current.result_future, True
+                current.preempted = True
+                current.exec_future.cancel()
+                self.preempted_total += 1
+                logging.info(
+                    f"LLM 任务 {current.trigger} 被更高优先级任务 {trigger} 抢占"
+                )
+
+            job = LLMJob(priority, trigger)
+            job.exec_future = asyncio.run_coroutine_threadsafe(coro_factory(job), self._loop)
+            job.exec_future.add_done_callback(lambda f, job=job: self._on_exec_done(job, f))
+            if current is not None and current.preempted and not current.done():
+                job.result_future.add_done_callback(lambda f, old=current: _copy_result(f, old.result_future))
+            self._current = job
+            return job.result_future, False
+
+    def cancel(self, priorities=None) -> bool:
+        """取消在途任务 (可限定优先级)，调用方得到 None"""
+        with self._lock:
+            current = self._current
+            if current is None or current.done():
+                return False
+            if priorities is not None and current.priority not in priorities:
+                return False
+            current.exec_future.cancel()
+            self.cancelled_total += 1
+        logging.info(f"已取消 LLM 任务 {current.trigger}")
+        return True
+
+    def _on_exec_done(self, job, future):
+        if future.cancelled():
+            if not job.preempted and not job.result_future.done():
+                job.result_future.set_result(None)
+            return
+        exc = future.exception()
+        if job.result_future.done():
+            return
+        if exc is not None:
+            job.result_future.set_exception(exc)
+        else:
+            job.result_future.set_result(future.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            current = self._current if (self._current is not None and not self._current.done()) else None
+            return {
+                "in_flight": None
+                if current is None
+                else {"trigger": current.trigger, "priority": PRIORITY_NAMES.get(current.priority, current.priority)},
+                "coalesced_total": self.coalesced_total,
+                "preempted_total": self.preempted_total,
+                "cancelled_total": self.cancelled_total,
+            }
+
+
+def _copy_result(src, dst):
+    if dst.done():
+        return
+    if src.cancelled():
+        dst.set_result(None)
+    elif src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
@@ -0,0 +1,345 @@
+"""轻量级指标注册表，输出 Prometheus 文本格式 (text/plain; version=0.0.4)
+
+热路径上的记录操作只做下标定位与数值累加：桶边界在注册时确定，
+带标签的子指标在模块加载时预先创建，记录时不构造 dict/list/字符串。
+"""
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOCK_WAIT_BUCKETS_S = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _fmt(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _label_str(labelnames, labelvalues, extra: str = "") -> str:
+    pairs = [f'{k}="{v}"' for k, v in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues):
+        """返回带标签的子指标；应在模块加载时调用并保存引用，而非在热路径中调用"""
+        key = tuple(str(v) for v in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        if not self.labelnames:
+            yield (), self._self_child()
+            return
+        for key in sorted(self._children):
+            yield key, self._children[key]
+
+    def _self_child(self):
+        return self
+
+    def render(self, const_labels=()):
+        """const_labels: 附加到每个样本的 ((名称, 值), ...)，如拆分部署时区分 web worker"""
+        constnames = tuple(k for k, _ in const_labels)
+        constvalues = tuple(str(v) for _, v in const_labels)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, child in self._samples():
+            lines.extend(
+                child._render_values(self.name, constnames + self.labelnames, constvalues + tuple(labelvalues))
+            )
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def _render_values(self, name, labelnames, labelvalues):
+        return [f"{name}{_label_str(labelnames, labelvalues)} {_fmt(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def _render_values(self, name, labelnames, labelvalues):
+        return [f"{name}{_label_str(labelnames, labelvalues)} {_fmt(self.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=LATENCY_BUCKETS_S, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(float(b) for b in buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def _new_child(self):
+        return Histogram(self.name, self.documentation, buckets=self.bounds)
+
+    def observe(self, value: float):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def _render_values(self, name, labelnames, labelvalues):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            total_sum = self.sum
+        lines = []
+        cumulative = 0
+        for bound, c in zip(self.bounds + (float("inf"),), counts):
+            cumulative += c
+            le = 'le="' + _fmt(bound) + '"'
+            lines.append(f"{name}_bucket{_label_str(labelnames, labelvalues, le)} {cumulative}")
+        lines.append(f"{name}_sum{_label_str(labelnames, labelvalues)} {_fmt(total_sum)}")
+        lines.append(f"{name}_count{_label_str(labelnames, labelvalues)} {total}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist):
+        self._hist = hist
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._hist.observe(time.perf_counter() - self._start)
+        return False
+
+
+class InstrumentedLock:
+    """threading.Lock 的替代品，记录每次获取锁的等待时间"""
+
+    def __init__(self, wait_histogram: Histogram):
+        self._lock = threading.Lock()
+        self._wait = wait_histogram
+
+    def acquire(self, blocking: bool = True, timeout: float = -1):
+        started = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        self._wait.observe(time.perf_counter() - started)
+        return ok
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._lock.release()
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._names:
+                raise ValueError(f"重复注册指标: {metric.name}")
+            self._names.add(metric.name)
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets=LATENCY_BUCKETS_S, labelnames=()):
+        return self._register(Histogram(name, documentation, buckets=buckets, labelnames=labelnames))
+
+    def render(self, names=None, const_labels=None) -> str:
+        """names 不为空时只输出这些指标；const_labels (dict) 附加到每个样本"""
+        with self._lock:
+            metrics = list(self._metrics)
+        if names is not None:
+            metrics = [m for m in metrics if m.name in names]
+        const = tuple((const_labels or {}).items())
+        lines = []
+        for m in metrics:
+            lines.extend(m.render(const))
+        return "\n".join(lines) + "\n"
+
+
+def merge_expositions(*texts) -> str:
+    """合并多个进程的文本格式输出：同名指标族只保留第一组 HELP/TYPE，各进程的样本归入同一族
+
+    样本需带有可区分的标签 (如 worker)，否则合并后同一序列会重复出现。
+    """
+    families = {}
+    current = None
+    for text in texts:
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    current = families.setdefault(parts[2], {"HELP": None, "TYPE": None, "samples": []})
+                    if current[parts[1]] is None:
+                        current[parts[1]] = line
+                continue
+            if current is not None:
+                current["samples"].append(line)
+    lines = []
+    for family in families.values():
+        lines.extend(line for line in (family["HELP"], family["TYPE"]) if line)
+        lines.extend(family["samples"])
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- 采集 ---
+CAPTURE_FRAMES = REGISTRY.counter("firedetect_capture_frames_total", "Frames grabbed from the camera driver")
+CAPTURE_DECODED = REGISTRY.counter(
+    "firedetect_capture_decoded_frames_total", "Frames retrieved (decoded) from the driver for a consumer"
+)
+CAPTURE_DROPPED = REGISTRY.counter(
+    "firedetect_capture_dropped_frames_total", "Frames overwritten before any consumer fetched them"
+)
+CAPTURE_READ_ERRORS = REGISTRY.counter("firedetect_capture_read_errors_total", "Failed camera reads")
+CAPTURE_FPS = REGISTRY.gauge("firedetect_capture_fps", "Camera grab rate over the last second")
+CAPTURE_DECODE_FPS = REGISTRY.gauge("firedetect_capture_decode_fps", "Camera retrieve/decode rate over the last second")
+
+# --- 推理 ---
+INFERENCE_SECONDS = REGISTRY.histogram("firedetect_inference_seconds", "YOLO detect() latency")
+NMS_CANDIDATES = REGISTRY.histogram(
+    "firedetect_nms_candidates", "Boxes above the confidence threshold entering NMS", buckets=COUNT_BUCKETS
+)
+NMS_KEPT = REGISTRY.histogram("firedetect_nms_kept", "Boxes kept after NMS", buckets=COUNT_BUCKETS)
+
+VISION_FRAMES = REGISTRY.counter(
+    "firedetect_vision_frames_total", "Frames handled by the vision loop, by full inference vs tracker carry-forward", labelnames=("mode",)
+)
+VISION_FRAMES_DETECTED = VISION_FRAMES.labels("detect")
+VISION_FRAMES_TRACKED = VISION_FRAMES.labels("track")
+VISION_FRAMES_SCREENED_OUT = VISION_FRAMES.labels("screened_out")
+VISION_CASCADE_SCREEN = REGISTRY.counter(
+    "firedetect_vision_screen_total", "Cascade stage-1 screen outcomes", labelnames=("result",)
+)
+VISION_CASCADE_SCREEN_PASS = VISION_CASCADE_SCREEN.labels("pass")
+VISION_CASCADE_SCREEN_REJECT = VISION_CASCADE_SCREEN.labels("reject")
+VISION_CASCADE_CPU = REGISTRY.counter(
+    "firedetect_vision_cascade_cpu_seconds_total", "Thread CPU time spent per cascade stage", labelnames=("stage",)
+)
+VISION_CASCADE_CPU_SCREEN = VISION_CASCADE_CPU.labels("screen")
+VISION_CASCADE_CPU_DETECT = VISION_CASCADE_CPU.labels("detect")
+
+# --- 负载调节 ---
+GOVERNOR_LEVEL = REGISTRY.gauge("firedetect_governor_level", "Current governor degradation level (0 = full quality)")
+GOVERNOR_SOC_TEMPERATURE = REGISTRY.gauge("firedetect_soc_temperature_celsius", "Hottest thermal zone reading")
+GOVERNOR_CPU_LOAD = REGISTRY.gauge("firedetect_cpu_load_ratio", "Whole-machine CPU utilisation (0-1)")
+
+# --- 融合 ---
+MONITOR_ITERATION_SECONDS = REGISTRY.histogram(
+    "firedetect_monitor_iteration_seconds", "Work time of one _monitor_loop iteration (excluding sleep)"
+)
+FUSION_LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "firedetect_fusion_lock_wait_seconds", "Time spent waiting to acquire DataFusionSystem._lock", buckets=LOCK_WAIT_BUCKETS_S
+)
+
+# --- 视频流 ---
+JPEG_ENCODE_SECONDS = REGISTRY.histogram("firedetect_jpeg_encode_seconds", "cv2.imencode latency for the MJPEG stream")
+STREAM_CLIENTS = REGISTRY.gauge("firedetect_stream_clients", "Active /video_feed clients")
+# 拆分部署时也在各 web worker 中记录的指标 (/video_feed 客户端与无信号帧编码)
+WORKER_METRICS = frozenset((JPEG_ENCODE_SECONDS.name, STREAM_CLIENTS.name))
+
+# --- 传感器 ---
+I2C_READ_SECONDS = REGISTRY.histogram("firedetect_i2c_read_seconds", "ADS1115 conversion + read latency")
+I2C_ERRORS = REGISTRY.counter("firedetect_i2c_errors_total", "ADS1115 I2C read/write failures")
+
+# --- LLM ---
+LLM_CALL_SECONDS = REGISTRY.histogram("firedetect_llm_call_seconds", "chat.completions.create latency")
+LLM_CALLS = REGISTRY.counter("firedetect_llm_calls_total", "LLM calls by outcome", labelnames=("outcome",))
+LLM_CALLS_OK = LLM_CALLS.labels("ok")
+LLM_CALLS_ERROR = LLM_CALLS.labels("error")
+LLM_CALLS_TIMEOUT = LLM_CALLS.labels("timeout")
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram("firedetect_llm_first_token_seconds", "Time to first streamed LLM token")
+LLM_CACHE_HITS = REGISTRY.counter("firedetect_llm_cache_hits_total", "analyze_summary results served from cache")
+LLM_CACHE_MISSES = REGISTRY.counter("firedetect_llm_cache_misses_total", "analyze_summary cache misses")
+LLM_IMAGE_BYTES = REGISTRY.histogram(
+    "firedetect_llm_image_bytes",
+    "JPEG bytes uploaded to the vision model",
+    buckets=(2000, 5000, 10000, 20000, 40000, 80000, 160000, 320000),
+)
+LLM_IMAGE_PREPARE_SECONDS = REGISTRY.histogram("firedetect_llm_image_prepare_seconds", "Crop/mosaic + JPEG encode time for the vision model")
+LLM_BREAKER_STATE = REGISTRY.gauge("firedetect_llm_breaker_state", "LLM circuit breaker state (0=closed, 1=half_open, 2=open)")
+LLM_BREAKER_REJECTED = REGISTRY.counter(
+    "firedetect_llm_breaker_rejected_total", "Analyses answered by the rule fallback because the breaker was open"
+)
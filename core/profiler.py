@@ -0,0 +1,115 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_SECONDS = 30.0
+MAX_RATE_HZ = 200.0
+MAX_STACK_DEPTH = 64
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _thread_cpu_seconds(ident):
+    """线程累计 CPU 时间 (秒)，平台不支持时返回 None"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError, ValueError):
+        return None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """基于 sys._current_frames() 的采样分析器
+
+    在独立线程中按固定频率抓取所有线程的调用栈，聚合为 collapsed stack 格式
+    (可直接交给 flamegraph.pl / speedscope)。同一时刻只允许一次采样，
+    时长、频率和栈深度均有上限，保证在线上设备运行时开销有界。
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    def profile(self, seconds: float = 5.0, rate_hz: float = 50.0) -> dict:
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        rate_hz = max(1.0, min(float(rate_hz), MAX_RATE_HZ))
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("已有采样正在进行")
+        try:
+            return self._run(seconds, rate_hz)
+        finally:
+            self._busy.release()
+
+    def _run(self, seconds: float, rate_hz: float) -> dict:
+        interval = 1.0 / rate_hz
+        me = threading.get_ident()
+        names = {}
+        cpu_start = {}
+        for t in threading.enumerate():
+            if t.ident is None or t.ident == me:
+                continue
+            names[t.ident] = t.name
+            cpu_start[t.ident] = _thread_cpu_seconds(t.ident)
+
+        stacks = Counter()
+        samples = 0
+        sampler_cpu_start = time.thread_time()
+        wall_start = time.monotonic()
+        deadline = wall_start + seconds
+        next_tick = wall_start
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now < next_tick:
+                time.sleep(next_tick - now)
+                continue
+            next_tick += interval
+
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    # 采样期间新建的线程
+                    names[ident] = next((t.name for t in threading.enumerate() if t.ident == ident), str(ident))
+                    cpu_start[ident] = _thread_cpu_seconds(ident)
+                parts = []
+                depth = 0
+                while frame is not None and depth < MAX_STACK_DEPTH:
+                    parts.append(_frame_label(frame))
+                    frame = frame.f_back
+                    depth += 1
+                parts.append(names[ident])
+                parts.reverse()
+                stacks[";".join(parts)] += 1
+            samples += 1
+
+        wall = time.monotonic() - wall_start
+        threads = {}
+        for ident, name in names.items():
+            start = cpu_start.get(ident)
+            end = _thread_cpu_seconds(ident)
+            cpu = (end - start) if (start is not None and end is not None) else None
+            key = name if name not in threads else f"{name}-{ident}"
+            threads[key] = {
+                "ident": ident,
+                "cpu_seconds": round(cpu, 4) if cpu is not None else None,
+                "cpu_percent": round(cpu / wall * 100.0, 1) if (cpu is not None and wall > 0) else None,
+            }
+
+        return {
+            "seconds": round(wall, 3),
+            "rate_hz": rate_hz,
+            "samples": samples,
+            "sampler_cpu_seconds": round(time.thread_time() - sampler_cpu_start, 4),
+            "threads": threads,
+            "collapsed": [f"{stack} {count}" for stack, count in stacks.most_common()],
+        }
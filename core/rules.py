@@ -0,0 +1,222 @@
+"""声明式风险规则
+
+Config.RISK_RULES 中的规则编译一次 (RuleSet)，融合监控与 FireLLMAnalyzer 共用：
+
+- RuleSet.evaluate(values): 无状态判定，只看当前取值 (LLM 兜底、基准测试)；
+- RiskEngine.update(signals): 增量判定，只重新计算取值变化或有待定计时的规则，并带有
+  迟滞 (hysteresis)、最短驻留 (dwell_seconds / release_seconds) 与视觉 k-of-n 帧投票，
+  单帧噪声不会把状态翻到 Danger、进而触发一次完整的大模型分析。
+"""
+import threading
+import time
+from collections import deque
+
+from config import Config
+
+LEVELS = ("Normal", "Warning", "Danger")
+LEVEL_RANK = {level: i for i, level in enumerate(LEVELS)}
+
+_MISSING = object()
+
+
+class _Condition:
+    __slots__ = ("signal", "op", "threshold", "hysteresis")
+
+    def __init__(self, signal: str, op: str, threshold=None, hysteresis: float = 0.0):
+        if op not in ("true", ">", ">=", "<", "<="):
+            raise ValueError(f"未知的规则运算符: {op}")
+        self.signal = signal
+        self.op = op
+        self.threshold = None if threshold is None else float(threshold)
+        self.hysteresis = float(hysteresis or 0.0)
+
+    def test(self, value, active: bool) -> bool:
+        """active 为 True 时阈值向"解除"方向放宽 hysteresis，避免在阈值附近来回翻转"""
+        if self.op == "true":
+            return value is True
+        if value is None:
+            return False
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return False
+        slack = self.hysteresis if active else 0.0
+        if self.op == ">":
+            return value > self.threshold - slack
+        if self.op == ">=":
+            return value >= self.threshold - slack
+        if self.op == "<":
+            return value < self.threshold + slack
+        return value <= self.threshold + slack
+
+
+class CompiledRule:
+    __slots__ = ("name", "level", "rank", "conditions", "signals", "dwell", "release", "vote_k", "vote_n")
+
+    def __init__(self, name, level, conditions, dwell, release, vote):
+        self.name = name
+        self.level = level
+        self.rank = LEVEL_RANK[level]
+        self.conditions = tuple(conditions)
+        self.signals = tuple(c.signal for c in self.conditions)
+        self.dwell = float(dwell)
+        self.release = float(release)
+        if vote:
+            if len(self.conditions) != 1 or self.conditions[0].op != "true":
+                raise ValueError(f"规则 {name}: vote 只适用于单个布尔条件")
+            self.vote_k, self.vote_n = int(vote[0]), int(vote[1])
+        else:
+            self.vote_k = self.vote_n = 0
+
+    def holds(self, values: dict, active: bool = False) -> bool:
+        for c in self.conditions:
+            if not c.test(values.get(c.signal), active):
+                return False
+        return True
+
+
+def _resolve(value):
+    """阈值可以写成 Config 属性名，编译时取值"""
+    if isinstance(value, str):
+        return getattr(Config, value)
+    return value
+
+
+def compile_rules(spec=None) -> list:
+    spec = getattr(Config, "RISK_RULES", []) if spec is None else spec
+    default_release = float(getattr(Config, "RISK_RELEASE_SECONDS", 0))
+    rules = []
+    for entry in spec:
+        requires = entry.get("requires")
+        if requires and not getattr(Config, requires, False):
+            continue
+        conditions = []
+        for cond in entry["when"]:
+            signal, op = cond[0], cond[1]
+            threshold = _resolve(cond[2]) if len(cond) > 2 else None
+            hysteresis = cond[3] if len(cond) > 3 else 0.0
+            conditions.append(_Condition(signal, op, threshold, hysteresis))
+        rules.append(
+            CompiledRule(
+                entry["name"],
+                entry["level"],
+                conditions,
+                dwell=entry.get("dwell_seconds", 0),
+                release=entry.get("release_seconds", default_release),
+                vote=entry.get("vote"),
+            )
+        )
+    rules.sort(key=lambda r: -r.rank)
+    return rules
+
+
+class RuleSet:
+    def __init__(self, spec=None):
+        self.rules = compile_rules(spec)
+
+    def evaluate(self, values: dict) -> str:
+        """无状态判定：命中的最高等级，规则按等级降序排列，命中即返回"""
+        for rule in self.rules:
+            if rule.holds(values):
+                return rule.level
+        return "Normal"
+
+    def reasons(self, values: dict) -> list:
+        return [rule.name for rule in self.rules if rule.holds(values)]
+
+
+class RiskEngine:
+    """带记忆的增量规则判定
+
+    signals 中的普通信号只有取值变化时才会使相关规则重新计算；投票规则的信号 (如 vision_fire)
+    每出现一次就记一票，因此只应在确实产生了新的视觉结果时传入。
+
+    取值为 None 表示本次没有采样 (如 DHT22 两次读取间隔过短或读取失败)，不视为条件不成立：
+    沿用该信号最后一次有效取值，驻留计时不被打断；超过 max_sample_age 秒仍没有新的有效取值时
+    才把该信号视为未知。
+    """
+
+    def __init__(self, ruleset: RuleSet, max_sample_age: float = None):
+        self.ruleset = ruleset
+        if max_sample_age is None:
+            max_sample_age = getattr(Config, "RISK_SIGNAL_MAX_AGE_SECONDS", 30)
+        self.max_sample_age = float(max_sample_age)
+        self._values = {}
+        self._sampled_at = {}
+        self._active = {r.name: False for r in ruleset.rules}
+        self._pending_since = {}
+        self._votes = {r.name: deque(maxlen=r.vote_n) for r in ruleset.rules if r.vote_n}
+        self._by_signal = {}
+        for rule in ruleset.rules:
+            for signal in rule.signals:
+                self._by_signal.setdefault(signal, []).append(rule)
+        self._lock = threading.Lock()
+        self.level = "Normal"
+        self.evaluations = 0
+
+    def update(self, signals: dict, now: float = None) -> str:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            dirty = {name for name in self._pending_since}
+            for key, value in signals.items():
+                rules = self._by_signal.get(key, ())
+                for rule in rules:
+                    if rule.vote_n and value is not None:
+                        self._votes[rule.name].append(value is True)
+                        dirty.add(rule.name)
+                if value is None:
+                    sampled_at = self._sampled_at.get(key)
+                    if sampled_at is None or now - sampled_at <= self.max_sample_age:
+                        continue
+                    # 信号已过期 (如检测器持续失败)：投票窗口一并清空，否则窗口中的旧票会一直锁住告警
+                    for rule in rules:
+                        if rule.vote_n and self._votes[rule.name]:
+                            self._votes[rule.name].clear()
+                            dirty.add(rule.name)
+                else:
+                    self._sampled_at[key] = now
+                if self._values.get(key, _MISSING) != value:
+                    self._values[key] = value
+                    dirty.update(rule.name for rule in rules)
+            if dirty:
+                for rule in self.ruleset.rules:
+                    if rule.name in dirty:
+                        self._step(rule, now)
+                self.level = self._current_level()
+            return self.level
+
+    def _step(self, rule: CompiledRule, now: float):
+        self.evaluations += 1
+        active = self._active[rule.name]
+        if rule.vote_n:
+            raw = sum(self._votes[rule.name]) >= rule.vote_k
+        else:
+            raw = rule.holds(self._values, active)
+        if raw == active:
+            self._pending_since.pop(rule.name, None)
+            return
+        since = self._pending_since.setdefault(rule.name, now)
+        if now - since >= (rule.dwell if raw else rule.release):
+            self._active[rule.name] = raw
+            self._pending_since.pop(rule.name, None)
+
+    def _current_level(self) -> str:
+        for rule in self.ruleset.rules:
+            if self._active[rule.name]:
+                return rule.level
+        return "Normal"
+
+    def active_rules(self) -> list:
+        with self._lock:
+            return [name for name, on in self._active.items() if on]
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "level": self.level,
+                "active": [name for name, on in self._active.items() if on],
+                "pending": {name: round(now - since, 2) for name, since in self._pending_since.items()},
+                "votes": {name: f"{sum(v)}/{len(v)}" for name, v in self._votes.items()},
+                "evaluations": self.evaluations,
+            }
@@ -0,0 +1,266 @@
+"""边缘节点向汇聚中心 (hub) 推送遥测
+
+按 sample_seconds 对融合状态采样，攒批后按 flush_seconds 推送 (进入 Danger 时按 danger_flush_seconds 提前推送)：
+
+- 每批第一条记录为完整关键帧，其后只记录相对上一条变化的字段 (delta)，hub 可以逐批独立解码；
+- 风险等级变化与新的大模型结论作为事件随批次发送；
+- 批次 JSON 经 zlib 压缩 (Content-Encoding: deflate) 后 POST 到 hub 的 /hub/ingest，
+  失败的批次保留重试 (最多 max_pending 批，超出丢弃最旧的)，hub 按启动号与批次序号去重。
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.request
+import zlib
+from collections import deque
+
+from vision.detections import DetectionBatch
+
+# 分析进行中时融合状态里的占位结论，不作为大模型事件上报
+ANALYSIS_PLACEHOLDER = "分析中..."
+
+# 采样字段: 短键 -> get_raw_state() 中的键
+FIELDS = (
+    ("temp", "temperature"),
+    ("hum", "humidity"),
+    ("mq2", "mq2_value"),
+    ("smoke", "smoke_detected"),
+    ("vf", "vision_fire_detected"),
+    ("risk", "risk_level"),
+    ("why", "risk_reasons"),
+    ("det", "vision_detections"),
+)
+
+
+def compact_detections(detections, max_boxes: int = 8):
+    """[label, conf, x1, y1, x2, y2] 列表，置信度取两位小数，避免微小抖动产生 delta"""
+    batch = DetectionBatch.coerce(detections)
+    if not batch:
+        return []
+    batch = batch.select(slice(0, max_boxes))
+    return [
+        [label, round(conf, 2), *box]
+        for (label, conf), box in zip(batch.label_confidences(), batch.data["box"].tolist())
+    ]
+
+
+def sample_record(state: dict, now: float = None) -> dict:
+    """把 get_raw_state() 快照量化为紧凑记录"""
+    record = {"t": round(time.time() if now is None else now, 1)}
+    for short, key in FIELDS:
+        value = state.get(key)
+        if key == "vision_detections":
+            value = compact_detections(value)
+        elif isinstance(value, float):
+            value = round(value, 1)
+        elif isinstance(value, list):
+            value = list(value)
+        record[short] = value
+    return record
+
+
+def delta_encode(records: list) -> list:
+    """首条完整，其余只保留变化字段；时间戳改为相对上一条的 dt"""
+    if not records:
+        return []
+    out = [dict(records[0])]
+    prev = records[0]
+    for rec in records[1:]:
+        delta = {"dt": round(rec["t"] - prev["t"], 1)}
+        for key, value in rec.items():
+            if key != "t" and prev.get(key) != value:
+                delta[key] = value
+        out.append(delta)
+        prev = rec
+    return out
+
+
+def delta_decode(encoded: list) -> list:
+    if not encoded:
+        return []
+    records = [dict(encoded[0])]
+    for delta in encoded[1:]:
+        rec = dict(records[-1])
+        rec["t"] = round(rec["t"] + delta.get("dt", 0), 1)
+        for key, value in delta.items():
+            if key != "dt":
+                rec[key] = value
+        records.append(rec)
+    return records
+
+
+class TelemetryPusher:
+    def __init__(
+        self,
+        source,
+        hub_url: str,
+        site_id: str = "",
+        sample_seconds: float = 2.0,
+        flush_seconds: float = 10.0,
+        danger_flush_seconds: float = 1.0,
+        max_pending: int = 30,
+        timeout: float = 5.0,
+    ):
+        self.source = source
+        self.url = hub_url.rstrip("/") + "/hub/ingest"
+        self.site_id = site_id or socket.gethostname()
+        self.sample_seconds = float(sample_seconds)
+        self.flush_seconds = float(flush_seconds)
+        self.danger_flush_seconds = float(danger_flush_seconds)
+        self.timeout = float(timeout)
+        self._records = []
+        self._events = []
+        self._pending = deque(maxlen=max(1, int(max_pending)))
+        self._last_risk = None
+        self._last_llm_request = None
+        # 启动号：每次启动随机生成，hub 据此区分重启后从 1 开始的新序列与重试的旧批次
+        self.boot_id = os.urandom(8).hex()
+        self._batch_seq = 0
+        self._stop = threading.Event()
+        self._flush = threading.Event()
+        self._thread = None
+        self._sender = None
+        self._lock = threading.Lock()
+        self.counts = {
+            "samples": 0,
+            "events": 0,
+            "batches_sent": 0,
+            "batches_failed": 0,
+            "batches_dropped": 0,
+            "json_bytes": 0,      # 不做 delta 时的 JSON 字节数
+            "delta_bytes": 0,     # delta 编码后的 JSON 字节数
+            "wire_bytes": 0,      # 压缩后实际发送的字节数
+        }
+
+    def start(self):
+        # 采样与推送分开：hub 不可达时 HTTP 超时只阻塞推送线程，不影响采样节奏
+        self._thread = threading.Thread(target=self._run, name="telemetry-sample", daemon=True)
+        self._sender = threading.Thread(target=self._send_loop, name="telemetry-push", daemon=True)
+        self._thread.start()
+        self._sender.start()
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        self._flush.set()
+        for thread in (self._thread, self._sender):
+            if thread is not None:
+                thread.join(timeout=self.timeout + 1)
+        if flush:
+            self._seal_batch()
+            self._send_pending()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                risk = self.sample()
+            except Exception as e:
+                logging.error(f"遥测采样失败: {e}")
+                risk = None
+            interval = self.danger_flush_seconds if risk == "Danger" else self.flush_seconds
+            if time.monotonic() - last_flush >= interval:
+                self._seal_batch()
+                self._flush.set()
+                last_flush = time.monotonic()
+            self._stop.wait(self.sample_seconds)
+
+    def _send_loop(self):
+        while not self._stop.is_set():
+            self._flush.wait()
+            self._flush.clear()
+            if not self._stop.is_set():
+                self._send_pending()
+
+    def sample(self, now: float = None):
+        """采样一次，返回当前风险等级"""
+        state = self.source()
+        record = sample_record(state, now)
+        with self._lock:
+            self._records.append(record)
+            self.counts["samples"] += 1
+            risk = record.get("risk")
+            if risk != self._last_risk:
+                if self._last_risk is not None:
+                    self._events.append({"t": record["t"], "type": "risk", "from": self._last_risk, "to": risk})
+                self._last_risk = risk
+            # 分析发起时请求号先递增、结论为占位文本；等到真实结论出现再上报并记下请求号
+            request_id = state.get("llm_last_request_id")
+            analysis = state.get("llm_analysis")
+            if (
+                request_id
+                and request_id != self._last_llm_request
+                and analysis
+                and analysis != ANALYSIS_PLACEHOLDER
+                and not state.get("llm_in_progress")
+            ):
+                self._events.append({"t": record["t"], "type": "llm", "analysis": analysis})
+                self._last_llm_request = request_id
+        return risk
+
+    def _seal_batch(self):
+        with self._lock:
+            if not self._records and not self._events:
+                return
+            records, self._records = self._records, []
+            events, self._events = self._events, []
+            self._batch_seq += 1
+            batch = {
+                "site": self.site_id,
+                "boot": self.boot_id,
+                "seq": self._batch_seq,
+                "sent_at": round(time.time(), 1),
+                "records": delta_encode(records),
+                "events": events,
+            }
+            body = json.dumps(batch, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.counts["events"] += len(events)
+            self.counts["json_bytes"] += len(json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            self.counts["delta_bytes"] += len(body)
+            if len(self._pending) == self._pending.maxlen:
+                self.counts["batches_dropped"] += 1
+            self._pending.append(zlib.compress(body, 6))
+
+    def _send_pending(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                payload = self._pending[0]
+            request = urllib.request.Request(
+                self.url,
+                data=payload,
+                method="POST",
+                headers={"Content-Type": "application/json", "Content-Encoding": "deflate"},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                    resp.read()
+            except Exception as e:
+                with self._lock:
+                    self.counts["batches_failed"] += 1
+                logging.debug(f"遥测推送失败，稍后重试: {e}")
+                return
+            with self._lock:
+                if self._pending and self._pending[0] is payload:
+                    self._pending.popleft()
+                self.counts["batches_sent"] += 1
+                self.counts["wire_bytes"] += len(payload)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            pending = len(self._pending)
+            buffered = len(self._records)
+        return {
+            "site": self.site_id,
+            "hub": self.url,
+            "flush_seconds": self.flush_seconds,
+            "pending_batches": pending,
+            "buffered_samples": buffered,
+            **counts,
+            "delta_ratio": round(counts["delta_bytes"] / counts["json_bytes"], 3) if counts["json_bytes"] else None,
+            "wire_ratio": round(counts["wire_bytes"] / counts["json_bytes"], 3) if counts["json_bytes"] and counts["batches_sent"] else None,
+        }
@@ -0,0 +1,189 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+# 单位: 毫秒，最后一个桶为 +Inf
+DEFAULT_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+# 相邻 span 之间的区间，以及 "检测到告警" 的端到端区间
+TRACE_INTERVALS = (
+    ("capture_to_infer_start", "capture", "infer_start"),
+    ("inference", "infer_start", "infer_end"),
+    ("infer_end_to_decision", "infer_end", "decision"),
+    ("decision_to_publish", "decision", "published"),
+    ("capture_to_publish", "capture", "published"),
+    ("publish_to_llm_done", "published", "llm_done"),
+    ("capture_to_llm_done", "capture", "llm_done"),
+)
+
+
+class LatencyHistogram:
+    """固定桶直方图，记录时不分配内存"""
+
+    def __init__(self, bounds_ms=DEFAULT_LATENCY_BUCKETS_MS):
+        self.bounds = tuple(float(b) for b in bounds_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        i = 0
+        n = len(self.bounds)
+        while i < n and value_ms > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q: float) -> float:
+        """按桶线性插值估算分位数"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, c in enumerate(self.counts):
+            upper = self.bounds[i] if i < len(self.bounds) else self.max
+            if c and seen + c >= rank:
+                frac = (rank - seen) / c
+                return min(self.max, lower + (upper - lower) * frac)
+            seen += c
+            lower = upper
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max, 3),
+            "buckets": {
+                **{str(int(b)): c for b, c in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class FrameTrace:
+    __slots__ = ("frame_seq", "spans", "risk_level")
+
+    def __init__(self, frame_seq, capture_ts):
+        self.frame_seq = frame_seq
+        self.spans = {"capture": capture_ts}
+        self.risk_level = None
+
+
+class PipelineTracer:
+    """逐帧记录流水线各阶段的单调时钟时间戳，并聚合为直方图
+
+    span 名称: capture / infer_start / infer_end / decision / published / llm_done
+    """
+
+    def __init__(self, enabled: bool = True, dump_path: str = "", max_pending_llm: int = 16):
+        self.enabled = bool(enabled)
+        self.dump_path = dump_path or ""
+        self.max_pending_llm = int(max_pending_llm)
+        self._lock = threading.Lock()
+        self._histograms = {name: LatencyHistogram() for name, _, _ in TRACE_INTERVALS}
+        # 告警路径单独统计：帧采集 -> risk_level 变为 Danger 并发布
+        self._histograms["capture_to_danger"] = LatencyHistogram()
+        self._pending_llm = OrderedDict()
+        self._last_published = None
+        self._last_risk = "Normal"
+        self._finished = 0
+
+    def begin(self, frame_seq, capture_ts=None):
+        if not self.enabled:
+            return None
+        return FrameTrace(frame_seq, capture_ts if capture_ts is not None else time.monotonic())
+
+    def mark(self, trace, name: str, ts=None):
+        if trace is None:
+            return
+        trace.spans[name] = ts if ts is not None else time.monotonic()
+
+    def finish(self, trace, risk_level: str):
+        """帧处理结束 (状态已发布)，汇总各区间"""
+        if trace is None:
+            return
+        trace.risk_level = risk_level
+        with self._lock:
+            self._observe_intervals(trace)
+            if risk_level == "Danger" and self._last_risk != "Danger":
+                start = trace.spans.get("capture")
+                end = trace.spans.get("published")
+                if start is not None and end is not None:
+                    self._histograms["capture_to_danger"].observe((end - start) * 1000.0)
+            self._last_risk = risk_level
+            self._last_published = trace
+            self._finished += 1
+        self._dump(trace, "frame")
+
+    def attach_llm(self, request_id: int):
+        """把最近一次发布的帧与一次 LLM 请求关联"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._last_published is None:
+                return
+            self._pending_llm[request_id] = self._last_published
+            while len(self._pending_llm) > self.max_pending_llm:
+                self._pending_llm.popitem(last=False)
+
+    def complete_llm(self, request_id: int, ts=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            trace = self._pending_llm.pop(request_id, None)
+            if trace is None:
+                return
+            trace.spans["llm_done"] = ts if ts is not None else time.monotonic()
+            self._observe_intervals(trace, only=("publish_to_llm_done", "capture_to_llm_done"))
+        self._dump(trace, "llm", request_id=request_id)
+
+    def _observe_intervals(self, trace, only=None):
+        for name, start_span, end_span in TRACE_INTERVALS:
+            if only is not None and name not in only:
+                continue
+            start = trace.spans.get(start_span)
+            end = trace.spans.get(end_span)
+            if start is None or end is None:
+                continue
+            self._histograms[name].observe(max(0.0, (end - start) * 1000.0))
+
+    def _dump(self, trace, kind: str, request_id=None):
+        if not self.dump_path:
+            return
+        capture = trace.spans.get("capture", 0.0)
+        record = {
+            "kind": kind,
+            "frame_seq": trace.frame_seq,
+            "risk_level": trace.risk_level,
+            "capture_monotonic": capture,
+            "offsets_ms": {k: round((v - capture) * 1000.0, 3) for k, v in trace.spans.items()},
+        }
+        if request_id is not None:
+            record["llm_request_id"] = request_id
+        try:
+            with open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.error(f"写入 trace 文件失败: {e}")
+            self.dump_path = ""
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "frames": self._finished,
+                "pending_llm": len(self._pending_llm),
+                "dump_path": self.dump_path,
+                "histograms": {name: h.summary() for name, h in self._histograms.items()},
+            }
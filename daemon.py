@@ -0,0 +1,98 @@
+"""硬件 / 融合守护进程 (拆分部署)
+
+唯一持有 GPIO、I2C、摄像头与检测器的进程：运行 DataFusionSystem，
+通过 Unix socket 提供状态快照与统计 (core/ipc.py)，并把视频流帧写入共享内存环形缓冲，
+Web worker (Config.ARCH_MODE = "split") 只读取这些数据，因此可以开任意多个 uvicorn worker。
+
+用法: python daemon.py  (run.py 在拆分模式下会自动拉起)
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from core.fusion import DataFusionSystem
+from core.ipc import IPCServer, SharedFrameRing
+from web.backend import LocalBackend
+
+
+class FramePublisher:
+    """按 IPC_FRAME_FPS 渲染视频流帧并写入共享内存；最近没有 worker 读取时不渲染，不触发解码"""
+
+    def __init__(self, backend: LocalBackend, ring: SharedFrameRing):
+        self.backend = backend
+        self.ring = ring
+        self.fps = float(getattr(Config, "IPC_FRAME_FPS", 10))
+        self.idle_seconds = float(getattr(Config, "IPC_FRAME_IDLE_SECONDS", 2))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ipc-frames", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # 启动后先发布一帧，worker 附加时即可拿到画面
+        first = True
+        while not self._stop.is_set():
+            started = time.monotonic()
+            # 不超过 IPC_FRAME_FPS，降档时跟随负载调节的视频流帧率
+            interval = max(1.0 / max(0.1, self.fps), self.backend.stream_interval())
+            if first or self.ring.reader_idle_seconds() <= self.idle_seconds:
+                try:
+                    payload = self.backend.latest_frame()
+                    if payload is not None:
+                        self.ring.write(payload)
+                        first = False
+                except Exception as e:
+                    logging.error(f"视频帧发布失败: {e}")
+            self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    fusion = DataFusionSystem()
+    backend = LocalBackend(fusion)
+    ring = SharedFrameRing(
+        getattr(Config, "IPC_SHM_NAME", "firedetect_frames"),
+        slots=getattr(Config, "IPC_FRAME_SLOTS", 4),
+        slot_bytes=getattr(Config, "IPC_FRAME_MAX_BYTES", 512 * 1024),
+        create=True,
+    )
+    server = IPCServer(
+        getattr(Config, "IPC_SOCKET_PATH", "/tmp/firedetect.sock"),
+        backend.ipc_handlers(),
+        subscribe=backend.forward_events,
+    )
+    publisher = FramePublisher(backend, ring)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    fusion.start()
+    server.start()
+    publisher.start()
+    logging.info("守护进程已启动")
+    try:
+        stop.wait()
+    finally:
+        publisher.stop()
+        server.stop()
+        fusion.stop()
+        ring.close()
+        logging.info("守护进程已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 import cv2
+import numpy as np
 import time
 import logging
 import threading
 from config import Config
+from core.metrics import (
+    CAPTURE_DECODE_FPS,
+    CAPTURE_DECODED,
+    CAPTURE_DROPPED,
+    CAPTURE_FPS,
+    CAPTURE_FRAMES,
+    CAPTURE_READ_ERRORS,
+)
 
 class CameraDriver:
     def __init__(self):
@@ -13,6 +22,23 @@ class CameraDriver:
         self._thread = None
         self._lock = threading.Lock()
         self._latest_frame = None
+        self._frame_seq = 0
+        self._frame_ts = 0.0
+        self._frame_consumed = True
+        # 按需采集：消费者登记 _wanted 并在 _fresh 上等待，采集线程只在 _wanted 时 retrieve()
+        self.capture_mode = getattr(Config, "CAMERA_CAPTURE_MODE", "continuous")
+        self._fresh = threading.Condition(self._lock)
+        self._wanted = True
+        self.grabbed_frames = 0
+        self.decoded_frames = 0
+        self.grab_fps = 0.0
+        self.decode_fps = 0.0
+        # MJPEG 直通模式：保存摄像头原始 JPEG，BGR 帧按需解码并按帧序号缓存
+        self.mjpeg_passthrough = False
+        self.jpeg_size = (640, 480)
+        self._latest_jpeg = None
+        self._decoded_seq = None
+        self._decoded_frame = None
 
     def start(self):
         try:
@@ -49,33 +75,191 @@ class CameraDriver:
                 self.cap.set(cv2.CAP_PROP_FPS, 15)
                 # 设置缓冲区大小，减少延迟
                 self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                if getattr(Config, "CAMERA_MJPEG_PASSTHROUGH", False):
+                    self._enable_mjpeg_passthrough()
                 self._running = True
-                self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+                self._thread = threading.Thread(target=self._capture_loop, name="camera-capture", daemon=True)
                 self._thread.start()
         except Exception as e:
             logging.error(f"摄像头初始化失败: {e}")
             self.is_open = False
 
+    def _enable_mjpeg_passthrough(self):
+        """请求 MJPG 格式并关闭 OpenCV 的自动解码 (V4L2 后端)；探测一帧确认拿到的是 JPEG，否则回退"""
+        self.mjpeg_passthrough = False
+        try:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            ret, probe = self.cap.read()
+            if ret and _is_jpeg_buffer(probe):
+                self.jpeg_size = (
+                    int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640,
+                    int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480,
+                )
+                self.mjpeg_passthrough = True
+                logging.info("摄像头 MJPEG 直通已启用")
+                return
+        except Exception as e:
+            logging.info(f"摄像头不支持 MJPEG 直通: {e}")
+        try:
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        except Exception:
+            pass
+        logging.info("摄像头未输出 MJPEG，使用解码模式")
+
     def _capture_loop(self):
+        demand = self.capture_mode == "demand"
+        fps_window_start = time.monotonic()
+        window_grabbed = 0
+        window_decoded = 0
         while self._running and self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
+            if demand:
+                # grab() 只从驱动取出缓冲 (保持低延迟)，不解码；有消费者请求时才 retrieve()
+                if not self.cap.grab():
+                    CAPTURE_READ_ERRORS.inc()
+                    time.sleep(0.01)
+                    continue
                 with self._lock:
-                    self._latest_frame = frame
+                    wanted = self._wanted
+                ret, frame = self.cap.retrieve() if wanted else (False, None)
             else:
-                time.sleep(0.01)
+                ret, frame = self.cap.read()
+                wanted = True
+                if not ret:
+                    CAPTURE_READ_ERRORS.inc()
+                    time.sleep(0.01)
+                    continue
+
+            now = time.monotonic()
+            self.grabbed_frames += 1
+            window_grabbed += 1
+            CAPTURE_FRAMES.inc()
+            if ret and self.mjpeg_passthrough and not _is_jpeg_buffer(frame):
+                ret = False
+            if ret:
+                jpeg = frame.tobytes() if self.mjpeg_passthrough else None
+                with self._fresh:
+                    dropped = not self._frame_consumed
+                    if jpeg is not None:
+                        self._latest_jpeg = jpeg
+                    else:
+                        self._latest_frame = frame
+                    self._frame_seq += 1
+                    self._frame_ts = now
+                    self._frame_consumed = False
+                    self._wanted = False
+                    self._fresh.notify_all()
+                self.decoded_frames += 1
+                window_decoded += 1
+                CAPTURE_DECODED.inc()
+                if dropped:
+                    CAPTURE_DROPPED.inc()
+            elif wanted:
+                CAPTURE_READ_ERRORS.inc()
+
+            if now - fps_window_start >= 1.0:
+                elapsed = now - fps_window_start
+                self.grab_fps = window_grabbed / elapsed
+                self.decode_fps = window_decoded / elapsed
+                CAPTURE_FPS.set(self.grab_fps)
+                CAPTURE_DECODE_FPS.set(self.decode_fps)
+                fps_window_start = now
+                window_grabbed = 0
+                window_decoded = 0
+
+    def _await_fresh(self):
+        """需持有 self._lock 调用。按需模式下若最新帧已被取走或已过期，则登记请求并等待下一次解码 (有超时)
+
+        上一个消费者等待超时后才解码出的帧不会被标记为已取走，按解码时间判断是否仍然新鲜，
+        超过 CAMERA_DEMAND_WAIT_SECONDS 的帧同样要等待下一次解码。
+        """
+        if self.capture_mode != "demand" or not self._running:
+            return
+        wait = float(getattr(Config, "CAMERA_DEMAND_WAIT_SECONDS", 0.15))
+        if self._frame_seq and not self._frame_consumed and time.monotonic() - self._frame_ts <= wait:
+            return
+        seq = self._frame_seq
+        self._wanted = True
+        self._fresh.wait_for(lambda: self._frame_seq != seq or not self._running, timeout=wait)
+
+    def get_capture_stats(self) -> dict:
+        return {
+            "mode": self.capture_mode,
+            "mjpeg_passthrough": self.mjpeg_passthrough,
+            "grabbed_frames": self.grabbed_frames,
+            "decoded_frames": self.decoded_frames,
+            "grab_fps": round(self.grab_fps, 2),
+            "decode_fps": round(self.decode_fps, 2),
+            "decode_ratio": round(self.decoded_frames / self.grabbed_frames, 4) if self.grabbed_frames else None,
+        }
+
+    def _decode_latest(self):
+        """直通模式：解码最新的 JPEG (每个帧序号只解码一次)，返回 (frame, seq, ts)"""
+        with self._lock:
+            self._await_fresh()
+            jpeg = self._latest_jpeg
+            seq = self._frame_seq
+            ts = self._frame_ts
+            if jpeg is None:
+                return None, None, None
+            self._frame_consumed = True
+            if self._decoded_seq == seq:
+                return self._decoded_frame, seq, ts
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), _decode_flag(getattr(Config, "CAMERA_DECODE_SCALE", 1)))
+        if frame is None:
+            return None, None, None
+        with self._lock:
+            if self._decoded_seq is None or seq > self._decoded_seq:
+                self._decoded_seq = seq
+                self._decoded_frame = frame
+        return frame, seq, ts
 
     def get_frame(self):
         """获取当前帧，如果摄像头未打开则返回None或黑图"""
         if self.is_open and self.cap:
+            if self.mjpeg_passthrough:
+                return self._decode_latest()[0]
             with self._lock:
+                self._await_fresh()
+                self._frame_consumed = True
                 return self._latest_frame
         
         # 模拟模式：如果没有摄像头，返回None，业务层处理
         return None
 
+    def get_frame_with_meta(self):
+        """返回 (frame, 帧序号, 采集时刻 time.monotonic())，无画面时返回 (None, None, None)"""
+        if self.is_open and self.cap:
+            if self.mjpeg_passthrough:
+                return self._decode_latest()
+            with self._lock:
+                self._await_fresh()
+                if self._latest_frame is not None:
+                    self._frame_consumed = True
+                    return self._latest_frame, self._frame_seq, self._frame_ts
+        return None, None, None
+
+    def get_jpeg_with_meta(self):
+        """直通模式下返回摄像头原始 JPEG (bytes, 帧序号)；非直通或无画面时返回 (None, None)"""
+        if self.is_open and self.cap and self.mjpeg_passthrough:
+            with self._lock:
+                self._await_fresh()
+                if self._latest_jpeg is not None:
+                    self._frame_consumed = True
+                    return self._latest_jpeg, self._frame_seq
+        return None, None
+
+    def get_encoded(self, seq):
+        """取指定帧序号的原始 JPEG (bytes, 宽, 高)，已被新帧覆盖时返回 None"""
+        with self._lock:
+            if self.mjpeg_passthrough and self._latest_jpeg is not None and self._frame_seq == seq:
+                return self._latest_jpeg, self.jpeg_size[0], self.jpeg_size[1]
+        return None
+
     def release(self):
-        self._running = False
+        with self._fresh:
+            self._running = False
+            self._fresh.notify_all()
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=1)
         self._thread = None
@@ -88,3 +272,30 @@ class CameraDriver:
         self.is_open = False
         with self._lock:
             self._latest_frame = None
+            self._latest_jpeg = None
+            self._decoded_seq = None
+            self._decoded_frame = None
+            self._wanted = True
+        self.mjpeg_passthrough = False
+
+
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def _decode_flag(scale) -> int:
+    return _DECODE_FLAGS.get(int(scale or 1), cv2.IMREAD_COLOR)
+
+
+def _is_jpeg_buffer(frame) -> bool:
+    """CONVERT_RGB=0 时 V4L2 返回 1xN 的原始字节；以 JPEG SOI 标记 (FF D8) 判断"""
+    if frame is None or frame.dtype != np.uint8 or frame.size < 4:
+        return False
+    if frame.ndim > 2 or (frame.ndim == 2 and frame.shape[0] != 1):
+        return False
+    flat = frame.reshape(-1)
+    return flat[0] == 0xFF and flat[1] == 0xD8
@@ -2,6 +2,7 @@ import time
 import random
 import logging
 from config import Config
+from core.metrics import I2C_ERRORS, I2C_READ_SECONDS
 
 try:
     import board
@@ -79,11 +80,14 @@ class SensorManager:
         )
 
         addr = int(Config.ADS1115_ADDRESS)
+        started = time.perf_counter()
         try:
             self.i2c_bus.write_i2c_block_data(addr, 0x01, [(config >> 8) & 0xFF, config & 0xFF])
             time.sleep(0.01)
             data = self.i2c_bus.read_i2c_block_data(addr, 0x00, 2)
+            I2C_READ_SECONDS.observe(time.perf_counter() - started)
         except OSError as e:
+            I2C_ERRORS.inc()
             logging.error(f"ADS1115 I2C 读写失败: {e}")
             self._adc_disabled = True
             try:
@@ -1,12 +1,39 @@
 import uvicorn
 import os
+import subprocess
 import sys
+import time
 
 # 确保项目根目录在 path 中
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from config import Config
+
+
+def start_daemon():
+    """拆分模式：先拉起独占硬件的守护进程，等待 IPC socket 就绪"""
+    if os.path.exists(Config.IPC_SOCKET_PATH):
+        os.unlink(Config.IPC_SOCKET_PATH)
+    daemon = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py")])
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline and not os.path.exists(Config.IPC_SOCKET_PATH):
+        if daemon.poll() is not None:
+            raise SystemExit("守护进程启动失败")
+        time.sleep(0.2)
+    return daemon
+
+
 if __name__ == "__main__":
     print("正在启动火灾监测系统...")
     print("访问地址: http://localhost:8000")
-    # 树莓派上不要开启 reload：会启动额外的 reloader 进程，导致 GPIO/I2C/DHT22 等硬件初始化冲突
-    uvicorn.run("web.main:app", host="0.0.0.0", port=8000, reload=False)
+    if getattr(Config, "ARCH_MODE", "single") == "split":
+        # 硬件只在守护进程中访问，Web 层可以安全地开多个 worker
+        daemon = start_daemon()
+        try:
+            uvicorn.run("web.main:app", host="0.0.0.0", port=8000, reload=False, workers=Config.WEB_WORKERS)
+        finally:
+            daemon.terminate()
+            daemon.wait(timeout=10)
+    else:
+        # 树莓派上不要开启 reload：会启动额外的 reloader 进程，导致 GPIO/I2C/DHT22 等硬件初始化冲突
+        uvicorn.run("web.main:app", host="0.0.0.0", port=8000, reload=False)
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from hardware.camera import CameraDriver
+
+
+def demand_camera(monkeypatch):
+    monkeypatch.setattr("config.Config.CAMERA_CAPTURE_MODE", "demand", raising=False)
+    monkeypatch.setattr("config.Config.CAMERA_DEMAND_WAIT_SECONDS", 0.05, raising=False)
+    camera = CameraDriver()
+    camera._running = True
+    return camera
+
+
+def publish(camera, ts):
+    with camera._fresh:
+        camera._frame_seq += 1
+        camera._frame_ts = ts
+        camera._frame_consumed = False
+        camera._wanted = False
+        camera._fresh.notify_all()
+
+
+def test_fresh_unconsumed_frame_is_returned_immediately(monkeypatch):
+    camera = demand_camera(monkeypatch)
+    publish(camera, time.monotonic())
+    with camera._lock:
+        camera._await_fresh()
+        assert not camera._wanted
+
+
+def test_stale_unconsumed_frame_waits_for_next_decode(monkeypatch):
+    camera = demand_camera(monkeypatch)
+    # 上一个消费者超时之后才解码出的帧：未被取走，但早已过期
+    publish(camera, time.monotonic() - 1.0)
+    threading.Timer(0.01, publish, (camera, time.monotonic())).start()
+    with camera._lock:
+        camera._await_fresh()
+        assert camera._frame_seq == 2
@@ -0,0 +1,70 @@
+import numpy as np
+
+from vision.detections import DetectionBatch
+
+LABELS = ("fire", "smoke", "person")
+
+
+def sample_batch():
+    return DetectionBatch.from_arrays(
+        [0, 2, 1],
+        [0.9, 0.4, 0.7],
+        [[10, 10, 50, 50], [100, 100, 200, 300], [20, 5, 60, 40]],
+        LABELS,
+    )
+
+
+def test_dict_round_trip():
+    batch = sample_batch()
+    dicts = batch.to_list()
+    assert dicts[0] == {"class_id": 0, "label": "fire", "confidence": 0.9, "x1": 10, "y1": 10, "x2": 50, "y2": 50}
+    again = DetectionBatch.from_dicts(dicts, LABELS)
+    assert again.to_list() == dicts
+    assert not again.tracked
+
+
+def test_from_dicts_appends_unknown_labels_and_skips_bad_rows():
+    batch = DetectionBatch.from_dicts(
+        [
+            {"label": "steam", "confidence": 0.5, "x1": 1, "y1": 2, "x2": 3, "y2": 4, "track_id": 7},
+            {"label": "fire", "x1": 1},
+        ],
+        LABELS,
+    )
+    assert len(batch) == 1
+    assert batch.labels == LABELS + ("steam",)
+    assert batch.label(0) == "steam"
+    assert batch.tracked and batch.to_list()[0]["track_id"] == 7
+
+
+def test_label_mask_and_any_label():
+    batch = sample_batch()
+    assert batch.label_mask({"fire", "smoke"}).tolist() == [True, False, True]
+    assert batch.any_label({"smoke"}, min_conf=0.5)
+    assert not batch.any_label({"person"}, min_conf=0.5)
+    batch.data["confirmed"][0] = False
+    assert not batch.any_label({"fire"}, confirmed_only=True)
+
+
+def test_top_orders_by_confidence():
+    top = sample_batch().top(2, min_conf=0.5)
+    assert [top.label(i) for i in range(len(top))] == ["fire", "smoke"]
+    assert len(DetectionBatch.empty(LABELS).top(3)) == 0
+
+
+def test_overlay_key_ignores_age_and_hits():
+    batch = sample_batch()
+    key = batch.overlay_key()
+    batch.data["age"] += 5
+    batch.data["hits"] += 1
+    batch.data["confidence"][0] = np.float32(0.901)
+    assert batch.overlay_key() == key
+    batch.data["box"][1, 0] += 1
+    assert batch.overlay_key() != key
+
+
+def test_coerce():
+    batch = sample_batch()
+    assert DetectionBatch.coerce(None) is None
+    assert DetectionBatch.coerce(batch) is batch
+    assert DetectionBatch.coerce(batch.to_list(), LABELS).to_list() == batch.to_list()
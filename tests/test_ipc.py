@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from core.ipc import _SLOT, SharedFrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(f"fire_test_{os.getpid()}", slots=3, slot_bytes=64, create=True)
+    yield ring
+    ring.close()
+
+
+def test_write_then_read_latest(ring):
+    reader = SharedFrameRing(ring.name)
+    try:
+        assert reader.instance == ring.instance
+        assert reader.read_latest() == (None, None)
+        for i in range(5):  # 超过槽位数，覆盖最旧的槽位
+            assert ring.write(b"frame-%d" % i)
+        assert reader.read_latest() == (b"frame-4", 5)
+        assert not ring.write(b"x" * 65)
+        assert ring.frames_oversize == 1
+        assert reader.read_latest() == (b"frame-4", 5)
+    finally:
+        reader.close()
+
+
+def test_torn_read_retries_then_recovers(ring):
+    reader = SharedFrameRing(ring.name)
+    try:
+        ring.write(b"stable")
+        offset = ring._slot_offset(0)
+        gen, seq, length = _SLOT.unpack_from(ring.shm.buf, offset)
+        # 写入中 (代数为奇数)：读者重试后放弃，不返回半写的数据
+        _SLOT.pack_into(ring.shm.buf, offset, gen + 1, seq, length)
+        assert reader.read_latest() == (None, None)
+        assert reader.read_retries == 3
+        _SLOT.pack_into(ring.shm.buf, offset, gen + 2, seq, length)
+        assert reader.read_latest() == (b"stable", 1)
+    finally:
+        reader.close()
@@ -0,0 +1,69 @@
+import asyncio
+
+import numpy as np
+
+from config import Config
+from core.llm_analyzer import FireLLMAnalyzer
+from core.llm_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(window=3, failure_ratio=0.5, min_calls=1)
+    breaker.record(False, 0.1, "boom", breaker.acquire())
+    assert breaker.state == OPEN
+    breaker.record_probe(True)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_half_open_allows_single_trial():
+    breaker = half_open_breaker()
+    assert breaker.acquire() is not None
+    assert breaker.acquire() is None
+
+
+def test_cancelled_non_trial_call_keeps_trial_slot():
+    breaker = CircuitBreaker(window=3, failure_ratio=0.5, min_calls=1)
+    early = breaker.acquire()  # 熔断前发出的调用
+    breaker.record(False, 0.1, "boom", breaker.acquire())
+    breaker.record_probe(True)
+    trial = breaker.acquire()
+    assert trial is not None
+    breaker.release(early)
+    assert breaker.acquire() is None
+    breaker.release(trial)
+    assert breaker.acquire() is not None
+
+
+def test_only_trial_result_closes_half_open():
+    breaker = CircuitBreaker(window=3, failure_ratio=0.5, min_calls=1)
+    early = breaker.acquire()
+    breaker.record(False, 0.1, "boom", breaker.acquire())
+    breaker.record_probe(True)
+    trial = breaker.acquire()
+    breaker.record(True, 0.1, permit=early)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, 0.1, permit=trial)
+    assert breaker.state == CLOSED
+
+
+def test_image_timeout_does_not_retry_text(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_USE_IMAGE", True)
+    monkeypatch.setattr(Config, "LLM_MODE", "local")
+    analyzer = FireLLMAnalyzer()
+    calls = []
+
+    async def slow_backend(**kwargs):
+        calls.append(kwargs)
+        raise asyncio.TimeoutError("Request timed out.")
+
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", slow_backend)
+    monkeypatch.setattr(analyzer.images, "prepare", lambda *args, **kwargs: "aW1n")
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    result = asyncio.run(analyzer.analyze(60.0, 30.0, False, frame, rule_risk="Warning"))
+
+    # 一次超时只调用一次后端，直接规则兜底；失败计入熔断器
+    assert len(calls) == 1
+    assert "Warning" in result
+    assert analyzer.breaker.snapshot()["window_failures"] == 1
@@ -0,0 +1,85 @@
+import pytest
+
+from core import llm_cache
+from core.llm_cache import LLMResultCache, canonical_context_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "monotonic", clock)
+    return clock
+
+
+def key(**context):
+    return canonical_context_key(context, temp_step=1.0, humidity_step=2.0, mq2_step=500, conf_step=0.1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LLMResultCache(ttl_seconds=10)
+    cache.put("k", "v")
+    clock.now += 10
+    assert cache.get("k") == "v"
+    clock.now += 0.5
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["expired"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = LLMResultCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_cap_evicts_oldest(clock):
+    cache = LLMResultCache(max_entries=10, max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    cache.put("c", "z" * 10)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 30
+
+
+def test_oversized_value_is_not_cached(clock):
+    cache = LLMResultCache(max_bytes=8)
+    cache.put("k", "too long for the cache")
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_put_replaces_and_refreshes_timestamp(clock):
+    cache = LLMResultCache(ttl_seconds=10)
+    cache.put("k", "old")
+    clock.now += 8
+    cache.put("k", "new")
+    clock.now += 8
+    assert cache.get("k") == "new"
+    assert cache.stats()["bytes"] == len("k") + len("new")
+
+
+def test_context_key_buckets_small_changes():
+    base = key(risk_level="Warning", temperature_c=51.2, humidity_pct=30.4, detections=[{"label": "Fire", "confidence": 0.81}])
+    same = key(risk_level="Warning", temperature_c=50.8, humidity_pct=29.6, detections=[{"label": "fire", "confidence": 0.79}])
+    other = key(risk_level="Warning", temperature_c=53.0, humidity_pct=30.4, detections=[{"label": "fire", "confidence": 0.81}])
+    assert base == same
+    assert base != other
+
+
+def test_context_key_ignores_detection_order():
+    a = key(detections=[{"label": "fire", "confidence": 0.9}, {"label": "smoke", "confidence": 0.4}])
+    b = key(detections=[{"label": "smoke", "confidence": 0.4}, {"label": "fire", "confidence": 0.9}])
+    assert a == b
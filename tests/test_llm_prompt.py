@@ -0,0 +1,35 @@
+from core.llm_prompt import build_summary_messages, compact_context
+
+CONTEXT = {
+    "risk_level": "Warning",
+    "temperature_c": None,
+    "humidity_pct": 35.0,
+    "temp_threshold": 50,
+    "temp_over_threshold": False,
+    "smoke_digital": None,
+    "mq2_over_threshold": True,
+    "vision_fire": False,
+    "detections": [],
+}
+
+
+def test_false_flags_and_thresholds_are_dropped():
+    out = compact_context(CONTEXT)
+    assert "temp_over_threshold" not in out
+    assert "vision_fire" not in out
+    assert "temp_threshold" not in out
+    assert "detections" not in out
+    assert out["mq2_over_threshold"] is True
+
+
+def test_unknown_values_stay_explicit():
+    # system 前缀声明"未出现的布尔字段均为false"，读取失败的烟雾信号不能被省略成 false
+    out = compact_context(CONTEXT)
+    assert "smoke_digital" in out and out["smoke_digital"] is None
+    assert out["temperature_c"] is None
+
+
+def test_compact_messages_encode_null():
+    messages = build_summary_messages(CONTEXT, variant="compact")
+    assert '"smoke_digital":null' in messages[1]["content"]
+    assert "null" in messages[0]["content"]
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+import pytest
+
+from core import llm_scheduler
+from core.llm_scheduler import (
+    AUTO_PRIORITIES,
+    PRIORITY_DANGER,
+    PRIORITY_MANUAL,
+    PRIORITY_PERIODIC,
+    PRIORITY_WARNING,
+    TokenBucket,
+    priority_for_trigger,
+)
+from core.llm_service import LLMAnalysisService
+
+TIMEOUT = 5
+
+
+class DummyAnalyzer:
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def service():
+    service = LLMAnalysisService(DummyAnalyzer())
+    service.start()
+    yield service
+    service.stop()
+
+
+def gated(result, gate, log):
+    """返回 coro_factory：等 gate 打开后返回 result，被取消时记入 log"""
+
+    async def run(job):
+        log.append(("start", job.trigger))
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, gate.wait, TIMEOUT)
+        except asyncio.CancelledError:
+            log.append(("cancelled", job.trigger))
+            raise
+        return result
+
+    return run
+
+
+def test_priority_for_trigger():
+    assert priority_for_trigger("auto:Danger") == PRIORITY_DANGER
+    assert priority_for_trigger("auto:Warning") == PRIORITY_WARNING
+    assert priority_for_trigger("periodic") == PRIORITY_PERIODIC
+    assert priority_for_trigger("manual") == PRIORITY_MANUAL
+    assert PRIORITY_PERIODIC not in AUTO_PRIORITIES
+
+
+def test_equal_or_lower_priority_coalesces(service):
+    gate, log = threading.Event(), []
+    first, coalesced = service.submit(gated("A", gate, log), PRIORITY_MANUAL, "manual")
+    assert not coalesced
+    again, coalesced = service.submit(gated("B", gate, log), PRIORITY_MANUAL, "manual")
+    assert coalesced and again is first
+    lower, coalesced = service.submit(gated("C", gate, log), PRIORITY_PERIODIC, "periodic")
+    assert coalesced and lower is first
+    gate.set()
+    assert first.result(TIMEOUT) == "A"
+    assert service.stats()["coalesced_total"] == 2
+
+
+def test_higher_priority_preempts_and_answers_preempted_caller(service):
+    periodic_gate, danger_gate, log = threading.Event(), threading.Event(), []
+    periodic, _ = service.submit(gated("periodic", periodic_gate, log), PRIORITY_PERIODIC, "periodic")
+    danger, coalesced = service.submit(gated("danger", danger_gate, log), PRIORITY_DANGER, "auto:Danger")
+    assert not coalesced
+    assert service.current_priority() == PRIORITY_DANGER
+    # 抢占后提交的低优先级触发合并到 Danger 任务
+    warning, coalesced = service.submit(gated("warning", danger_gate, log), PRIORITY_WARNING, "auto:Warning")
+    assert coalesced and warning is danger
+    danger_gate.set()
+    assert danger.result(TIMEOUT) == "danger"
+    assert periodic.result(TIMEOUT) == "danger"
+    assert ("cancelled", "periodic") in log
+    assert service.stats()["preempted_total"] == 1
+    periodic_gate.set()
+
+
+def test_cancel_is_limited_to_priorities(service):
+    gate, log = threading.Event(), []
+    periodic, _ = service.submit(gated("periodic", gate, log), PRIORITY_PERIODIC, "periodic")
+    assert not service.cancel(AUTO_PRIORITIES)
+    assert service.in_progress()
+    assert service.cancel()
+    assert periodic.result(TIMEOUT) is None
+    gate.set()
+
+
+def test_token_bucket_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(capacity=2, refill_seconds=10)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    now[0] += 5
+    assert not bucket.try_acquire()
+    now[0] += 5
+    assert bucket.try_acquire()
+    now[0] += 100
+    assert bucket.tokens() == 2
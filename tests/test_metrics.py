@@ -0,0 +1,51 @@
+import asyncio
+
+from core.metrics import WORKER_METRICS, MetricsRegistry, merge_expositions
+from web import backend as web_backend
+
+
+def registry():
+    reg = MetricsRegistry()
+    clients = reg.gauge("firedetect_stream_clients", "Active /video_feed clients")
+    encode = reg.histogram("firedetect_jpeg_encode_seconds", "encode", buckets=(0.01,))
+    calls = reg.counter("firedetect_llm_calls_total", "calls", labelnames=("outcome",))
+    return reg, clients, encode, calls
+
+
+def test_const_labels_and_name_filter():
+    reg, clients, encode, calls = registry()
+    clients.set(2)
+    encode.observe(0.005)
+    calls.labels("ok").inc()
+    text = reg.render(names=WORKER_METRICS, const_labels={"worker": 42})
+    assert 'firedetect_stream_clients{worker="42"} 2' in text
+    assert 'firedetect_jpeg_encode_seconds_bucket{worker="42",le="0.01"} 1' in text
+    assert "llm_calls" not in text
+    assert 'firedetect_llm_calls_total{outcome="ok"} 1' in reg.render()
+
+
+def test_merge_keeps_one_family_header():
+    daemon, clients, _, calls = registry()
+    calls.labels("ok").inc()
+    worker, worker_clients, _, _ = registry()
+    worker_clients.set(3)
+    merged = merge_expositions(daemon.render(), worker.render(names=WORKER_METRICS, const_labels={"worker": 7}))
+    lines = merged.splitlines()
+    assert lines.count("# TYPE firedetect_stream_clients gauge") == 1
+    family = lines[lines.index("# TYPE firedetect_stream_clients gauge") + 1:][:2]
+    assert family == ["firedetect_stream_clients 0", 'firedetect_stream_clients{worker="7"} 3']
+    assert 'firedetect_llm_calls_total{outcome="ok"} 1' in lines
+
+
+def test_remote_backend_appends_worker_metrics(monkeypatch):
+    daemon, _, _, _ = registry()
+    remote = web_backend.RemoteBackend(socket_path="/nonexistent.sock")
+
+    async def fake_request(op, **args):
+        assert op == "metrics"
+        return daemon.render()
+
+    monkeypatch.setattr(remote, "_request", fake_request)
+    text = asyncio.run(remote.metrics())
+    assert text.count("# TYPE firedetect_stream_clients gauge") == 1
+    assert 'firedetect_stream_clients{worker="' in text
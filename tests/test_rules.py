@@ -0,0 +1,102 @@
+import pytest
+
+from core.rules import RiskEngine, RuleSet
+
+SPEC = [
+    {"name": "vision_fire", "level": "Danger", "when": [("vision_fire", "true")], "vote": (2, 3)},
+    {"name": "smoke", "level": "Danger", "when": [("smoke", "true")], "dwell_seconds": 2},
+    {
+        "name": "high_temperature",
+        "level": "Warning",
+        "when": [("temperature", ">", 50.0, 1.0)],
+        "dwell_seconds": 2,
+        "release_seconds": 6,
+    },
+]
+
+
+@pytest.fixture
+def engine():
+    return RiskEngine(RuleSet(SPEC), max_sample_age=30)
+
+
+def test_dwell_delays_activation(engine):
+    assert engine.update({"temperature": 60.0}, now=0.0) == "Normal"
+    assert engine.update({"temperature": 60.0}, now=1.0) == "Normal"
+    assert engine.update({"temperature": 60.0}, now=2.0) == "Warning"
+
+
+def test_short_spike_does_not_activate(engine):
+    engine.update({"temperature": 60.0}, now=0.0)
+    engine.update({"temperature": 20.0}, now=1.0)
+    assert engine.update({"temperature": 20.0}, now=5.0) == "Normal"
+
+
+def test_release_delay(engine):
+    for t in (0.0, 2.0):
+        engine.update({"temperature": 60.0}, now=t)
+    assert engine.update({"temperature": 20.0}, now=3.0) == "Warning"
+    assert engine.update({"temperature": 20.0}, now=8.0) == "Warning"
+    assert engine.update({"temperature": 20.0}, now=9.0) == "Normal"
+
+
+def test_hysteresis_keeps_active_near_threshold(engine):
+    for t in (0.0, 2.0):
+        engine.update({"temperature": 60.0}, now=t)
+    # 49.5 仍高于 50 - 1.0，不开始解除计时
+    assert engine.update({"temperature": 49.5}, now=3.0) == "Warning"
+    assert engine.update({"temperature": 49.5}, now=20.0) == "Warning"
+    assert engine.snapshot()["pending"] == {}
+
+
+def test_hysteresis_not_applied_when_inactive(engine):
+    engine.update({"temperature": 49.5}, now=0.0)
+    assert engine.update({"temperature": 49.5}, now=5.0) == "Normal"
+
+
+def test_vote_requires_k_of_n(engine):
+    assert engine.update({"vision_fire": True}, now=0.0) == "Normal"
+    assert engine.update({"vision_fire": False}, now=0.1) == "Normal"
+    assert engine.update({"vision_fire": True}, now=0.2) == "Danger"
+
+
+def test_vote_ignores_missing_results(engine):
+    engine.update({"vision_fire": True}, now=0.0)
+    engine.update({"vision_fire": None}, now=0.1)
+    engine.update({"vision_fire": None}, now=0.2)
+    assert engine.snapshot()["votes"]["vision_fire"] == "1/1"
+
+
+def test_none_reading_does_not_reset_dwell(engine):
+    # DHT22 在读取间隔过短或失败时返回 None，隔次出现
+    levels = [engine.update({"temperature": 60.0 if i % 2 == 0 else None}, now=float(i)) for i in range(4)]
+    assert levels[-1] == "Warning"
+
+
+def test_none_reading_keeps_active_rule(engine):
+    for t in (0.0, 2.0):
+        engine.update({"temperature": 60.0}, now=t)
+    assert engine.update({"temperature": None}, now=20.0) == "Warning"
+
+
+def test_stale_reading_expires(engine):
+    for t in (0.0, 2.0):
+        engine.update({"temperature": 60.0}, now=t)
+    # 超过 max_sample_age 没有有效读数：信号视为未知，按解除计时处理
+    engine.update({"temperature": None}, now=33.0)
+    assert engine.update({"temperature": None}, now=40.0) == "Normal"
+
+
+def test_initial_none_is_normal(engine):
+    assert engine.update({"temperature": None, "smoke": None}, now=0.0) == "Normal"
+    assert engine.update({"temperature": None, "smoke": None}, now=10.0) == "Normal"
+
+
+def test_vote_expires_when_vision_result_missing(engine):
+    # 检测器失败 / 摄像头断开后不再有推理结果，旧票不能一直锁住 Danger
+    engine.update({"vision_fire": True}, now=0.0)
+    assert engine.update({"vision_fire": True}, now=0.5) == "Danger"
+    assert engine.update({"vision_fire": None}, now=20.0) == "Danger"
+    engine.update({"vision_fire": None}, now=31.0)
+    assert engine.snapshot()["votes"]["vision_fire"] == "0/0"
+    assert engine.update({"vision_fire": None}, now=40.0) == "Normal"
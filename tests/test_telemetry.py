@@ -0,0 +1,105 @@
+import json
+import zlib
+
+from core.hub import FleetIndex
+from core.telemetry import ANALYSIS_PLACEHOLDER, TelemetryPusher, delta_decode, delta_encode, sample_record
+
+
+class FakeState:
+    def __init__(self):
+        self.state = {"temperature": 25.0, "risk_level": "Normal", "llm_last_request_id": 0, "llm_analysis": ""}
+
+    def __call__(self):
+        return dict(self.state)
+
+
+def pusher(source, site="edge-1"):
+    return TelemetryPusher(source, "http://hub.invalid", site_id=site)
+
+
+def deliver(p, fleet):
+    """把待发批次按 hub 的解码路径送入 FleetIndex"""
+    p._seal_batch()
+    added = 0
+    while p._pending:
+        added += fleet.ingest(json.loads(zlib.decompress(p._pending.popleft())))
+    return added
+
+
+def test_delta_round_trip():
+    records = [
+        sample_record({"temperature": 25.04, "risk_level": "Normal", "risk_reasons": []}, now=100.0),
+        sample_record({"temperature": 25.04, "risk_level": "Normal", "risk_reasons": []}, now=102.0),
+        sample_record({"temperature": 61.2, "risk_level": "Warning", "risk_reasons": ["high_temperature"]}, now=104.0),
+    ]
+    encoded = delta_encode(records)
+    assert encoded[1] == {"dt": 2.0}
+    assert set(encoded[2]) == {"dt", "temp", "risk", "why"}
+    assert delta_decode(encoded) == records
+
+
+def test_batch_survives_zlib_round_trip():
+    source = FakeState()
+    p = pusher(source)
+    for t in (100.0, 102.0):
+        p.sample(now=t)
+    source.state["risk_level"] = "Danger"
+    p.sample(now=104.0)
+    fleet = FleetIndex()
+    assert deliver(p, fleet) == 3
+    site = fleet.site("edge-1", history=3)
+    assert [r["risk"] for r in site["history"]] == ["Normal", "Normal", "Danger"]
+    assert fleet.sites(risk="Danger")[0]["site"] == "edge-1"
+    assert [e["type"] for e in fleet.events()] == ["risk"]
+
+
+def test_llm_event_waits_for_final_analysis():
+    source = FakeState()
+    p = pusher(source)
+    fleet = FleetIndex()
+    # 分析发起：请求号已递增，结论为占位文本
+    source.state.update(llm_last_request_id=1, llm_analysis=ANALYSIS_PLACEHOLDER, llm_in_progress=True)
+    p.sample(now=100.0)
+    deliver(p, fleet)
+    assert fleet.events() == []
+
+    source.state.update(llm_analysis="厨房温度正常", llm_in_progress=False)
+    p.sample(now=102.0)
+    p.sample(now=104.0)
+    deliver(p, fleet)
+    events = [e for e in fleet.events() if e["type"] == "llm"]
+    assert [e["analysis"] for e in events] == ["厨房温度正常"]
+
+
+def test_hub_dedupes_retried_batches_per_boot():
+    fleet = FleetIndex()
+    batch = {"site": "edge-1", "boot": "a", "seq": 1, "records": delta_encode([sample_record({}, now=100.0)])}
+    assert fleet.ingest(dict(batch)) == 1
+    # 首批重试不能被当成边缘重启
+    assert fleet.ingest(dict(batch)) == 0
+    assert fleet.ingest(dict(batch, seq=2)) == 1
+    assert fleet.ingest(dict(batch, seq=2)) == 0
+    # 新的启动号：序号从 1 重新开始
+    assert fleet.ingest(dict(batch, boot="b")) == 1
+    assert fleet.ingest(dict(batch, boot="b")) == 0
+    assert fleet.site("edge-1")["duplicates"] == 3
+
+
+def test_hub_event_cannot_override_site_and_limit_is_clamped():
+    fleet = FleetIndex(max_events=5)
+    events = [{"type": "risk", "site": "other", "n": i} for i in range(8)]
+    fleet.ingest({"site": "edge-1", "boot": "a", "seq": 1, "events": events})
+    assert {e["site"] for e in fleet.events()} == {"edge-1"}
+    assert fleet.events(site="other") == []
+    assert [e["n"] for e in fleet.events(limit=0)] == [7]
+    assert [e["n"] for e in fleet.events(limit=-3)] == [7]
+    assert len(fleet.events(limit=10**9)) == 5
+
+
+def test_pusher_batches_carry_boot_id():
+    p = pusher(FakeState())
+    p.sample(now=100.0)
+    p._seal_batch()
+    batch = json.loads(zlib.decompress(p._pending[0]))
+    assert batch["boot"] == p.boot_id and batch["seq"] == 1
+    assert pusher(FakeState()).boot_id != p.boot_id
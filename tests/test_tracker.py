@@ -0,0 +1,66 @@
+from vision.detections import DetectionBatch
+from vision.tracker import MultiObjectTracker
+
+LABELS = ("fire", "smoke")
+
+
+def detections(*rows):
+    """rows: (class_id, confidence, box)"""
+    return DetectionBatch.from_arrays(
+        [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows], LABELS
+    )
+
+
+def test_iou_match_keeps_track_id_and_confirms():
+    tracker = MultiObjectTracker(confirm_hits=2)
+    tracker.update(detections((0, 0.8, [10, 10, 50, 50])))
+    assert tracker.as_batch(confirmed_only=True).to_list() == []
+    tracks = tracker.update(detections((0, 0.9, [14, 12, 54, 52])))
+    assert [t.track_id for t in tracks] == [1]
+    batch = tracker.as_batch(confirmed_only=True)
+    assert batch.to_list()[0]["track_id"] == 1
+    assert batch.to_list()[0]["confirmed"] is True
+
+
+def test_center_distance_fallback_matches_fast_object():
+    tracker = MultiObjectTracker(iou_threshold=0.3, max_center_distance=0.5)
+    tracker.update(detections((0, 0.8, [0, 0, 40, 40])))
+    # IoU 很低，但中心点位移不到平均对角线的一半
+    tracks = tracker.update(detections((0, 0.8, [20, 0, 60, 40])))
+    assert [t.track_id for t in tracks] == [1]
+    tracks = tracker.update(detections((0, 0.8, [200, 200, 240, 240])))
+    assert sorted(t.track_id for t in tracks) == [1, 2]
+
+
+def test_class_mismatch_starts_new_track():
+    tracker = MultiObjectTracker()
+    tracker.update(detections((0, 0.8, [10, 10, 50, 50])))
+    tracks = tracker.update(detections((1, 0.8, [10, 10, 50, 50])))
+    assert {(t.track_id, t.label) for t in tracks} == {(1, "fire"), (2, "smoke")}
+
+
+def test_track_dropped_after_max_misses():
+    tracker = MultiObjectTracker(max_misses=2)
+    tracker.update(detections((0, 0.8, [10, 10, 50, 50])))
+    empty = DetectionBatch.empty(LABELS)
+    assert len(tracker.update(empty)) == 1
+    # 漏检的轨迹不输出到叠加层
+    assert len(tracker.as_batch()) == 0
+    assert len(tracker.update(empty)) == 1
+    assert tracker.update(empty) == []
+
+
+def test_predict_extrapolates_velocity():
+    tracker = MultiObjectTracker()
+    tracker.update(detections((0, 0.8, [0, 0, 40, 40])))
+    tracker.update(detections((0, 0.8, [10, 0, 50, 40])))
+    tracker.predict()
+    assert tracker.as_batch().to_list()[0]["x1"] == 20
+    # 两次外推后的检测：只按外推后的残差修正速度
+    tracker.predict()
+    tracks = tracker.update(detections((0, 0.8, [30, 0, 70, 40])))
+    assert tracks[0].velocity == (10.0, 0.0)
+    tracks = tracker.update(detections((0, 0.8, [34, 0, 74, 40])))
+    assert tracks[0].velocity == (4.0, 0.0)
+    tracker.reset()
+    assert tracker.tracks == []
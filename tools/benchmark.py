@@ -0,0 +1,362 @@
+"""端到端流水线基准测试
+
+用法:
+    python tools/benchmark.py run --frames 200 --out bench_base.json
+    python tools/benchmark.py run --video samples/kitchen.mp4 --out bench_new.json
+    python tools/benchmark.py compare bench_base.json bench_new.json --threshold 0.10
+
+run 子命令逐阶段驱动 采集 -> YOLO 推理 -> 规则融合 -> MJPEG 编码 -> LLM 输出归一化，
+输出每个阶段的 p50/p95/p99 延迟、吞吐量以及峰值 RSS (JSON)。
+compare 子命令对比两份结果，任一阶段 p95 变慢或吞吐下降超过阈值即视为回归 (退出码 1)。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from config import Config
+from vision.detections import DetectionBatch
+
+
+class SyntheticFrameSource:
+    """与 CameraDriver 接口兼容的合成帧源：在噪声背景上移动一个橙色"火焰"色块"""
+
+    def __init__(self, width: int = 640, height: int = 480, seed: int = 0):
+        self.width = int(width)
+        self.height = int(height)
+        self._rng = np.random.default_rng(seed)
+        self._background = self._rng.integers(0, 60, (self.height, self.width, 3), dtype=np.uint8)
+        self._index = 0
+        self.is_open = False
+
+    def start(self):
+        self.is_open = True
+
+    def get_frame(self):
+        frame = self._background.copy()
+        cx = int((self._index * 7) % self.width)
+        cy = int(self.height * 0.6)
+        cv2.circle(frame, (cx, cy), 40, (0, 140, 255), -1)
+        self._index += 1
+        return frame
+
+    def release(self):
+        self.is_open = False
+
+
+class VideoFileFrameSource:
+    """与 CameraDriver 接口兼容的录像帧源，读到结尾后循环播放"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cap = None
+        self.is_open = False
+
+    def start(self):
+        self.cap = cv2.VideoCapture(self.path)
+        self.is_open = bool(self.cap.isOpened())
+
+    def get_frame(self):
+        if not self.is_open:
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        if self.cap:
+            self.cap.release()
+        self.cap = None
+        self.is_open = False
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * (pct / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return float(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo))
+
+
+def peak_rss_kb() -> int:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss = rss // 1024
+    return int(rss)
+
+
+def measure(fn, inputs, warmup: int = 3):
+    """对每个输入调用一次 fn，返回延迟统计 (毫秒)"""
+    for item in inputs[:warmup]:
+        fn(item)
+
+    durations = []
+    started = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        durations.append((time.perf_counter() - t0) * 1000.0)
+    total_s = time.perf_counter() - started
+
+    durations.sort()
+    return {
+        "count": len(durations),
+        "p50_ms": round(percentile(durations, 50), 4),
+        "p95_ms": round(percentile(durations, 95), 4),
+        "p99_ms": round(percentile(durations, 99), 4),
+        "mean_ms": round(sum(durations) / len(durations), 4) if durations else 0.0,
+        "throughput_per_s": round(len(durations) / total_s, 2) if total_s > 0 else 0.0,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def _synthetic_sensor_inputs(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(n):
+        inputs.append(
+            (
+                rng.choice([None, round(rng.uniform(20.0, 70.0), 1)]),
+                rng.choice([None, round(rng.uniform(10.0, 80.0), 1)]),
+                rng.choice([None, False, False, True]),
+                rng.choice([None, False, False, True]),
+            )
+        )
+    return inputs
+
+
+def _synthetic_llm_outputs(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    samples = [
+        '{"risk_level":"Warning","description":"温度偏高","suggestion":"检查热源"}',
+        '好的，以下是分析结果：{"risk_level":"Danger","description":"视觉检测到火焰","suggestion":"立即撤离"}',
+        '```json\n{"risk_level": "Normal", "description": "一切正常", "suggestion": "保持监测"}\n```',
+        '风险较低，建议继续观察。',
+        '{"risk_level":"Unknown","description":"","suggestion":null}',
+        '',
+    ]
+    return [rng.choice(samples) for _ in range(n)]
+
+
+def bench_capture(source, n: int):
+    source.start()
+    try:
+        return measure(lambda _: source.get_frame(), list(range(n)))
+    finally:
+        source.release()
+
+
+def bench_detector(frames, model_path: str):
+    from vision.yolo_onnx import YoloOnnxDetector
+
+    detector = YoloOnnxDetector(
+        model_path=model_path,
+        class_names=list(Config.YOLO_CLASSES),
+        input_size=Config.YOLO_INPUT_SIZE,
+        conf_threshold=Config.YOLO_CONF_THRESHOLD,
+        iou_threshold=Config.YOLO_IOU_THRESHOLD,
+    )
+    if not detector.is_ready():
+        return None
+    return measure(detector.detect, frames)
+
+
+def bench_vision_screen(frames):
+    """级联第一级初筛的耗时；pass_rate 记录在结果中，便于与 detector 阶段对照权衡召回与成本"""
+    from vision.cascade import build_screen
+
+    screen = build_screen(Config)
+    passed = []
+    stats = measure(lambda frame: passed.append(bool(screen(frame))), frames)
+    passed = passed[-len(frames):]  # 去掉预热调用
+    stats["pass_rate"] = round(sum(passed) / len(passed), 4) if passed else None
+    return stats
+
+
+def bench_fusion_rules(n: int):
+    from core.fusion import evaluate_rule_risk
+
+    return measure(lambda args: evaluate_rule_risk(*args), _synthetic_sensor_inputs(n))
+
+
+def _fake_detections(n: int, moving: bool):
+    """每帧一个新的 DetectionBatch (与视觉线程一致)；moving 时框逐帧平移，叠加层每帧都在变化"""
+    batches = []
+    for i in range(n):
+        dx = (i * 3) % 60 if moving else 0
+        batches.append(
+            DetectionBatch.from_arrays(
+                [0, 1],
+                [0.87, 0.55],
+                [[100 + dx, 120, 220 + dx, 260], [300 - dx, 40, 520 - dx, 200]],
+                ("fire", "smoke"),
+            )
+        )
+    return batches
+
+
+def bench_mjpeg_encode(frames, detections=None):
+    """detections 为与 frames 等长的 DetectionBatch 列表 (None 表示无叠加层)"""
+    from web.stream import annotate_frame, encode_jpeg, mjpeg_part
+
+    def _encode(item):
+        frame, batch = item
+        data = encode_jpeg(annotate_frame(frame, batch))
+        if data is not None:
+            mjpeg_part(data)
+
+    return measure(_encode, list(zip(frames, detections or [None] * len(frames))))
+
+
+def bench_normalize_json(n: int):
+    from core.llm_analyzer import FireLLMAnalyzer
+
+    analyzer = FireLLMAnalyzer()
+    return measure(lambda text: analyzer._normalize_json(text, fallback_risk="Warning"), _synthetic_llm_outputs(n))
+
+
+def run(args) -> dict:
+    if args.video:
+        source = VideoFileFrameSource(args.video)
+    else:
+        source = SyntheticFrameSource(width=args.width, height=args.height)
+
+    stages = {}
+    stages["capture"] = bench_capture(source, args.frames)
+
+    # 预先取出一批帧，后续阶段共享同一输入，保证可比性
+    source.start()
+    frames = []
+    while len(frames) < args.frames:
+        frame = source.get_frame()
+        if frame is None:
+            break
+        frames.append(frame)
+    source.release()
+    if not frames:
+        raise SystemExit("未能从帧源读取到任何帧")
+
+    detector_stats = bench_detector(frames, args.model)
+    if detector_stats is None:
+        print(f"⚠️  模型 {args.model} 不存在或加载失败，跳过 detector 阶段", file=sys.stderr)
+    else:
+        stages["detector"] = detector_stats
+    stages["vision_screen"] = bench_vision_screen(frames)
+
+    stages["fusion_rules"] = bench_fusion_rules(args.iterations)
+
+    stages["mjpeg_encode"] = bench_mjpeg_encode(frames)
+    stages["mjpeg_encode_overlay"] = bench_mjpeg_encode(frames, _fake_detections(len(frames), moving=True))
+    stages["mjpeg_encode_overlay_static"] = bench_mjpeg_encode(frames, _fake_detections(len(frames), moving=False))
+    stages["llm_normalize_json"] = bench_normalize_json(args.iterations)
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "source": args.video or f"synthetic:{args.width}x{args.height}",
+            "frames": len(frames),
+            "iterations": args.iterations,
+        },
+        "stages": stages,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def compare(base: dict, new: dict, threshold: float):
+    """返回 (回归列表, 逐阶段对比)；p95 延迟上升或吞吐下降超过 threshold 记为回归"""
+    regressions = []
+    rows = []
+    base_stages = base.get("stages", {})
+    new_stages = new.get("stages", {})
+    for name in sorted(set(base_stages) & set(new_stages)):
+        b = base_stages[name]
+        n = new_stages[name]
+        b_p95 = float(b.get("p95_ms", 0) or 0)
+        n_p95 = float(n.get("p95_ms", 0) or 0)
+        b_tp = float(b.get("throughput_per_s", 0) or 0)
+        n_tp = float(n.get("throughput_per_s", 0) or 0)
+        p95_delta = (n_p95 - b_p95) / b_p95 if b_p95 > 0 else 0.0
+        tp_delta = (n_tp - b_tp) / b_tp if b_tp > 0 else 0.0
+        regressed = p95_delta > threshold or tp_delta < -threshold
+        rows.append(
+            {
+                "stage": name,
+                "p95_ms": [b_p95, n_p95],
+                "p95_change": round(p95_delta, 4),
+                "throughput_per_s": [b_tp, n_tp],
+                "throughput_change": round(tp_delta, 4),
+                "regressed": regressed,
+            }
+        )
+        if regressed:
+            regressions.append(name)
+
+    b_rss = int(base.get("peak_rss_kb", 0) or 0)
+    n_rss = int(new.get("peak_rss_kb", 0) or 0)
+    if b_rss > 0 and (n_rss - b_rss) / b_rss > threshold:
+        regressions.append("peak_rss_kb")
+    return regressions, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="火灾监测流水线基准测试")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="运行基准测试并输出 JSON")
+    p_run.add_argument("--video", default="", help="录像文件路径，缺省使用合成帧")
+    p_run.add_argument("--model", default=Config.YOLO_MODEL_PATH, help="YOLO ONNX 模型路径")
+    p_run.add_argument("--frames", type=int, default=100, help="图像阶段的帧数")
+    p_run.add_argument("--iterations", type=int, default=5000, help="纯 CPU 阶段的迭代次数")
+    p_run.add_argument("--width", type=int, default=640)
+    p_run.add_argument("--height", type=int, default=480)
+    p_run.add_argument("--out", default="", help="结果输出文件，缺省打印到标准输出")
+
+    p_cmp = sub.add_parser("compare", help="对比两份结果并标记回归")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="允许的相对变化 (默认 10%%)")
+
+    args = parser.parse_args()
+
+    if args.cmd == "run":
+        result = run(args)
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"结果已写入 {args.out}")
+        else:
+            print(text)
+        return
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    regressions, rows = compare(base, new, args.threshold)
+    print(json.dumps({"threshold": args.threshold, "stages": rows, "regressions": regressions}, ensure_ascii=False, indent=2))
+    if regressions:
+        print(f"❌ 检测到性能回归: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+    print("✅ 未检测到性能回归", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""在实际设备上标定检测模型的输入尺寸、DNN 后端与线程数
+
+用法:
+    python tools/calibrate.py                                   # 使用 Config 中的候选与目标延迟
+    python tools/calibrate.py --target-ms 250 --sizes 256,320,416 --threads 1,2,4
+    python tools/calibrate.py --video samples/kitchen.mp4 --runs 30
+    python tools/calibrate.py --dry-run                          # 只打印结果，不写标定文件
+
+结果写入 Config.DEVICE_PROFILE_PATH，DataFusionSystem 启动时自动加载。
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import SyntheticFrameSource, VideoFileFrameSource
+from config import Config
+from vision.calibration import build_profile, calibrate, save_profile
+from vision.yolo_onnx import YoloOnnxDetector, available_backends
+
+
+def _int_list(text: str):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def _frames(video: str, n: int):
+    source = VideoFileFrameSource(video) if video else SyntheticFrameSource()
+    source.start()
+    try:
+        frames = [source.get_frame() for _ in range(n)]
+    finally:
+        source.release()
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        raise SystemExit("无法读取标定用的帧")
+    return frames
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_threads = sorted({1, max(1, cpu_count // 2), cpu_count})
+    parser = argparse.ArgumentParser(description="检测模型设备标定")
+    parser.add_argument("--model", default=Config.YOLO_MODEL_PATH)
+    parser.add_argument("--target-ms", type=float, default=getattr(Config, "CALIBRATION_TARGET_P95_MS", 400))
+    parser.add_argument("--sizes", type=_int_list, default=list(getattr(Config, "CALIBRATION_INPUT_SIZES", [256, 320, 416])))
+    parser.add_argument("--backends", default="", help="逗号分隔，默认为本机 OpenCV 可用的全部后端")
+    parser.add_argument("--threads", type=_int_list, default=default_threads)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--video", default="", help="使用录像帧 (默认合成帧)")
+    parser.add_argument("--out", default=getattr(Config, "DEVICE_PROFILE_PATH", "device_profile.json"))
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"模型文件不存在: {args.model}")
+    backends = [b for b in args.backends.split(",") if b] if args.backends else available_backends()
+    frames = _frames(args.video, 16)
+
+    def factory(size, backend):
+        return YoloOnnxDetector(
+            model_path=args.model,
+            class_names=list(Config.YOLO_CLASSES),
+            input_size=size,
+            conf_threshold=Config.YOLO_CONF_THRESHOLD,
+            iou_threshold=Config.YOLO_IOU_THRESHOLD,
+            backend=backend,
+        )
+
+    print(f"标定 {args.model}: 后端 {backends}，尺寸 {args.sizes}，线程 {args.threads}，目标 p95 ≤ {args.target_ms} ms")
+    best, meets, results = calibrate(factory, frames, args.sizes, backends, args.threads, args.target_ms, runs=args.runs)
+    if best is None:
+        raise SystemExit("所有配置均无法运行")
+
+    profile = build_profile(args.model, best, meets, args.target_ms, results)
+    summary = {k: profile[k] for k in ("input_size", "backend", "threads", "p50_ms", "p95_ms", "meets_target")}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if not meets:
+        print(f"⚠️  没有配置满足目标延迟，已选用最快的配置")
+    if args.dry_run:
+        return
+    save_profile(args.out, profile)
+    print(f"✅ 标定结果已写入 {args.out}，重启系统后生效")
+
+
+if __name__ == "__main__":
+    main()
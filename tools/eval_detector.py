@@ -0,0 +1,372 @@
+"""离线评估 YoloOnnxDetector 的精度与速度
+
+数据集目录 (YOLO 标注格式，每行 "class_id cx cy w h"，坐标归一化到 0-1):
+    dataset/
+        images/xxx.jpg        labels/xxx.txt        # 或标注文件与图片放在同一目录
+        videos/clip.mp4       clip/000123.txt       # 视频: 与视频同名的目录，按帧号命名
+
+图片缺少标注文件视为无目标 (负样本)；视频只评估有标注文件的帧。
+
+用法:
+    python tools/eval_detector.py dataset/ --workers 4 --out eval.json
+    python tools/eval_detector.py dataset/ --input-size 416 --conf 0.25
+
+推理结果按 (模型文件, 检测器配置) 的哈希缓存在 --cache-dir 下，
+每个图片/视频分段单独缓存，重跑时只处理新增或修改过的文件 (含标注文件)。
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from functools import lru_cache
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from config import Config
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov")
+VIDEO_CHUNK_FRAMES = 200
+
+_detector = None
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_hash(args) -> str:
+    payload = {
+        "model_sha256": file_digest(args.model),
+        "classes": list(Config.YOLO_CLASSES),
+        "input_size": args.input_size,
+        "conf": args.conf,
+        "iou": args.iou,
+        "video_stride": args.video_stride,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _unit_label_files(unit):
+    """该单元涉及的标注文件：图片为对应的标注文件，视频分段为区间内有标注的帧"""
+    kind, path, start, end = unit
+    if kind == "image":
+        label = _label_path_for_image(path)
+        return [label] if os.path.exists(label) else []
+    label_dir = os.path.splitext(path)[0]
+    return [os.path.join(label_dir, name) for index, name in _frame_label_names(label_dir) if start <= index < end]
+
+
+@lru_cache(maxsize=64)
+def _frame_label_names(label_dir: str):
+    """[(帧号, 文件名)]；同一视频的各分段共用一次目录扫描"""
+    if not os.path.isdir(label_dir):
+        return ()
+    names = []
+    for name in sorted(os.listdir(label_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext == ".txt" and stem.isdigit():
+            names.append((int(stem), name))
+    return tuple(names)
+
+
+def unit_key(unit) -> str:
+    """视频/图片文件与标注文件 (名称、大小、修改时间) 任一变化都会使缓存失效：
+    视频只对有标注的帧推理，标注增删会改变该单元的预测结果"""
+    kind, path, start, end = unit
+    st = os.stat(path)
+    labels = hashlib.sha256()
+    for label in _unit_label_files(unit):
+        lst = os.stat(label)
+        labels.update(f"{os.path.basename(label)}|{lst.st_size}|{lst.st_mtime_ns}\n".encode("utf-8"))
+    raw = f"{kind}|{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{start}|{end}|{labels.hexdigest()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def _label_path_for_image(path: str) -> str:
+    stem = os.path.splitext(path)[0]
+    parent = os.path.dirname(path)
+    if os.path.basename(parent) == "images":
+        return os.path.join(os.path.dirname(parent), "labels", os.path.basename(stem) + ".txt")
+    return stem + ".txt"
+
+
+def _label_path_for_frame(video_path: str, index: int) -> str:
+    return os.path.join(os.path.splitext(video_path)[0], f"{index:06d}.txt")
+
+
+def read_labels(path: str, width: int, height: int):
+    boxes = []
+    if not os.path.exists(path):
+        return boxes
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cls = int(float(parts[0]))
+            cx, cy, bw, bh = (float(v) for v in parts[1:5])
+            boxes.append(
+                {
+                    "class_id": cls,
+                    "x1": (cx - bw / 2) * width,
+                    "y1": (cy - bh / 2) * height,
+                    "x2": (cx + bw / 2) * width,
+                    "y2": (cy + bh / 2) * height,
+                }
+            )
+    return boxes
+
+
+def discover_units(root: str):
+    """扫描数据集，返回工作单元 (kind, path, start, end)"""
+    units = []
+    for path in sorted(glob.glob(os.path.join(root, "**", "*"), recursive=True)):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTS:
+            units.append(("image", path, 0, 1))
+        elif ext in VIDEO_EXTS:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            cap.release()
+            if total <= 0:
+                # 帧数未知时整段作为一个单元
+                units.append(("video", path, 0, sys.maxsize))
+                continue
+            for start in range(0, total, VIDEO_CHUNK_FRAMES):
+                units.append(("video", path, start, min(start + VIDEO_CHUNK_FRAMES, total)))
+    return units
+
+
+def _init_worker(model_path, input_size, conf, iou):
+    global _detector
+    from vision.yolo_onnx import YoloOnnxDetector
+
+    # 每个进程单线程推理，避免多进程 x 多线程的 CPU 超订
+    cv2.setNumThreads(1)
+    _detector = YoloOnnxDetector(
+        model_path=model_path,
+        class_names=list(Config.YOLO_CLASSES),
+        input_size=input_size,
+        conf_threshold=conf,
+        iou_threshold=iou,
+    )
+
+
+def _predict(frame):
+    t0 = time.perf_counter()
+    dets = _detector.detect(frame)
+    infer_ms = (time.perf_counter() - t0) * 1000.0
+    preds = dets.to_list() if dets is not None else []
+    return preds, infer_ms
+
+
+def _process_unit(job):
+    """在工作进程中运行：返回该单元每一帧的预测结果"""
+    unit, stride = job
+    kind, path, start, end = unit
+    frames = []
+    if kind == "image":
+        img = cv2.imread(path)
+        if img is not None:
+            preds, infer_ms = _predict(img)
+            frames.append({"index": 0, "width": img.shape[1], "height": img.shape[0], "preds": preds, "infer_ms": infer_ms})
+        return unit, frames
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    index = start
+    while index < end:
+        if (index - start) % stride != 0 or not os.path.exists(_label_path_for_frame(path, index)):
+            if not cap.grab():
+                break
+            index += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        preds, infer_ms = _predict(frame)
+        frames.append({"index": index, "width": frame.shape[1], "height": frame.shape[0], "preds": preds, "infer_ms": infer_ms})
+        index += 1
+    cap.release()
+    return unit, frames
+
+
+def _box_iou(a, b) -> float:
+    iw = max(0.0, min(a["x2"], b["x2"]) - max(a["x1"], b["x1"]))
+    ih = max(0.0, min(a["y2"], b["y2"]) - max(a["y1"], b["y1"]))
+    inter = iw * ih
+    if inter <= 0:
+        return 0.0
+    area_a = max(0.0, a["x2"] - a["x1"]) * max(0.0, a["y2"] - a["y1"])
+    area_b = max(0.0, b["x2"] - b["x1"]) * max(0.0, b["y2"] - b["y1"])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def average_precision(recalls, precisions) -> float:
+    """VOC 全点插值 AP"""
+    mrec = [0.0] + list(recalls) + [1.0]
+    mpre = [0.0] + list(precisions) + [0.0]
+    for i in range(len(mpre) - 2, -1, -1):
+        mpre[i] = max(mpre[i], mpre[i + 1])
+    ap = 0.0
+    for i in range(1, len(mrec)):
+        ap += (mrec[i] - mrec[i - 1]) * mpre[i]
+    return ap
+
+
+def evaluate(samples, class_ids, iou_threshold: float = 0.5):
+    """samples: [(gt_boxes, pred_boxes)]，返回每个类别的 precision/recall/AP"""
+    results = {}
+    for cls in class_ids:
+        scored = []
+        n_gt = 0
+        for gts, preds in samples:
+            gt_cls = [g for g in gts if g["class_id"] == cls]
+            n_gt += len(gt_cls)
+            matched = [False] * len(gt_cls)
+            for p in sorted((p for p in preds if p["class_id"] == cls), key=lambda p: -p["confidence"]):
+                best, best_iou = -1, iou_threshold
+                for j, g in enumerate(gt_cls):
+                    if matched[j]:
+                        continue
+                    iou = _box_iou(p, g)
+                    if iou >= best_iou:
+                        best, best_iou = j, iou
+                if best >= 0:
+                    matched[best] = True
+                scored.append((p["confidence"], best >= 0))
+
+        scored.sort(key=lambda x: -x[0])
+        tp = fp = 0
+        recalls, precisions = [], []
+        for _, is_tp in scored:
+            if is_tp:
+                tp += 1
+            else:
+                fp += 1
+            recalls.append(tp / n_gt if n_gt else 0.0)
+            precisions.append(tp / (tp + fp))
+        results[cls] = {
+            "ground_truth": n_gt,
+            "predictions": len(scored),
+            "precision": round(tp / (tp + fp), 4) if (tp + fp) else 0.0,
+            "recall": round(tp / n_gt, 4) if n_gt else 0.0,
+            "ap50": round(average_precision(recalls, precisions), 4) if n_gt else 0.0,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 火焰/烟雾检测器离线评估")
+    parser.add_argument("dataset", help="数据集目录 (图片/视频 + YOLO 格式标注)")
+    parser.add_argument("--model", default=Config.YOLO_MODEL_PATH)
+    parser.add_argument("--input-size", type=int, default=Config.YOLO_INPUT_SIZE)
+    parser.add_argument("--conf", type=float, default=Config.YOLO_CONF_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=Config.YOLO_IOU_THRESHOLD, help="NMS IoU 阈值")
+    parser.add_argument("--match-iou", type=float, default=0.5, help="评估匹配 IoU 阈值")
+    parser.add_argument("--video-stride", type=int, default=1, help="视频每隔 N 帧评估一次")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--cache-dir", default=".eval_cache")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"模型不存在: {args.model}")
+
+    cfg_hash = config_hash(args)
+    cache_dir = os.path.join(args.cache_dir, cfg_hash)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    units = discover_units(args.dataset)
+    if not units:
+        raise SystemExit(f"{args.dataset} 下未找到图片或视频")
+
+    results_by_unit = {}
+    keys = {}
+    pending = []
+    for unit in units:
+        key = keys[unit] = unit_key(unit)
+        cached = os.path.join(cache_dir, key + ".json")
+        if not args.no_cache and os.path.exists(cached):
+            with open(cached, "r", encoding="utf-8") as f:
+                results_by_unit[unit] = json.load(f)
+        else:
+            pending.append(unit)
+
+    print(f"配置哈希 {cfg_hash}: 共 {len(units)} 个单元，缓存命中 {len(units) - len(pending)}，待处理 {len(pending)}", file=sys.stderr)
+
+    started = time.perf_counter()
+    processed_frames = 0
+    if pending:
+        with multiprocessing.Pool(
+            processes=args.workers,
+            initializer=_init_worker,
+            initargs=(args.model, args.input_size, args.conf, args.iou),
+        ) as pool:
+            jobs = [(u, max(1, args.video_stride)) for u in pending]
+            for unit, frames in pool.imap_unordered(_process_unit, jobs):
+                results_by_unit[unit] = frames
+                processed_frames += len(frames)
+                with open(os.path.join(cache_dir, keys[unit] + ".json"), "w", encoding="utf-8") as f:
+                    json.dump(frames, f)
+    wall = time.perf_counter() - started
+
+    samples = []
+    infer_ms = []
+    for unit in units:
+        kind, path, _, _ = unit
+        for fr in results_by_unit.get(unit, []):
+            label_path = _label_path_for_image(path) if kind == "image" else _label_path_for_frame(path, fr["index"])
+            samples.append((read_labels(label_path, fr["width"], fr["height"]), fr["preds"]))
+            infer_ms.append(fr["infer_ms"])
+
+    class_ids = list(range(len(Config.YOLO_CLASSES)))
+    per_class = evaluate(samples, class_ids, iou_threshold=args.match_iou)
+    infer_ms.sort()
+    report = {
+        "config_hash": cfg_hash,
+        "config": {
+            "model": args.model,
+            "input_size": args.input_size,
+            "conf": args.conf,
+            "iou": args.iou,
+            "match_iou": args.match_iou,
+            "video_stride": args.video_stride,
+        },
+        "frames": len(samples),
+        "classes": {Config.YOLO_CLASSES[c]: v for c, v in per_class.items()},
+        "map50": round(sum(v["ap50"] for v in per_class.values()) / len(per_class), 4) if per_class else 0.0,
+        "speed": {
+            "workers": args.workers,
+            "processed_frames": processed_frames,
+            "wall_seconds": round(wall, 3),
+            "throughput_fps": round(processed_frames / wall, 2) if (processed_frames and wall > 0) else None,
+            "infer_ms_p50": round(infer_ms[len(infer_ms) // 2], 3) if infer_ms else None,
+            "infer_ms_p95": round(infer_ms[min(len(infer_ms) - 1, int(len(infer_ms) * 0.95))], 3) if infer_ms else None,
+        },
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"结果已写入 {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""本地 OpenAI 兼容的模拟大模型服务，用于离线测试分析器的延迟与吞吐
+
+提供 /v1/chat/completions (支持 stream=true)、/v1/models 与 Ollama 的 /api/tags，
+可配置延迟分布、逐 token 流式输出、超时、格式错误的 JSON 输出与错误率。
+
+用法:
+    # 单独启动，然后把 Config.LLM_LOCAL_URL 指向 http://127.0.0.1:11435/v1
+    python tools/mock_llm_server.py serve --port 11435 --latency lognormal:-1.2,0.5 --error-rate 0.05
+
+    # 在进程内启动模拟服务并用 FireLLMAnalyzer 压测
+    python tools/mock_llm_server.py loadtest --requests 200 --concurrency 4 \\
+        --latency uniform:0.05,0.3 --malformed-rate 0.2 --timeout-rate 0.05 --client-timeout 2
+
+在测试/基准中使用:
+    server = MockLLMServer(MockLLMSettings(latency="fixed:0.1")).start()
+    Config.LLM_LOCAL_URL = server.url + "/v1"
+    ...
+    server.stop()
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@dataclass
+class MockLLMSettings:
+    latency: str = "fixed:0.05"       # 首 token 延迟分布: fixed:s | uniform:a,b | normal:mean,std | lognormal:mu,sigma
+    tokens_per_second: float = 50.0   # 流式输出速度，非流式时也计入总耗时
+    error_rate: float = 0.0           # 返回 HTTP 500 的概率
+    timeout_rate: float = 0.0         # 挂起 hang_seconds 不响应的概率
+    hang_seconds: float = 120.0
+    malformed_rate: float = 0.0       # 输出不合规 JSON 的概率
+    seed: int = 0
+
+
+def parse_latency(spec: str):
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+
+def _prompt_text(messages) -> str:
+    parts = []
+    for m in messages or []:
+        content = m.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(c.get("text", "") for c in content if isinstance(c, dict))
+    return "\n".join(parts)
+
+
+def build_reply(prompt: str, rng: random.Random, malformed_rate: float) -> str:
+    m = re.search(r'"risk_level"\s*:\s*"(\w+)"', prompt)
+    risk = m.group(1) if m else rng.choice(["Normal", "Warning", "Danger"])
+    obj = {
+        "risk_level": risk,
+        "description": "模拟分析：传感器读数与视觉检测结果已综合评估。",
+        "suggestion": "模拟建议：请结合现场情况核验。",
+    }
+    good = json.dumps(obj, ensure_ascii=False)
+    if rng.random() >= malformed_rate:
+        return good
+    variants = [
+        good[: max(1, len(good) // 2)],                       # 截断
+        "```json\n" + good + "\n```",                          # Markdown 包裹
+        "好的，以下是分析结果：" + good + " 希望对你有帮助。",   # 前后夹杂解释
+        json.dumps({"risk": "High", "desc": "字段名错误"}, ensure_ascii=False),
+        "当前风险较低，建议继续观察。",                          # 纯文本
+        json.dumps({"risk_level": risk, "description": {"temperature_c": 30}}, ensure_ascii=False),
+    ]
+    return rng.choice(variants)
+
+
+def _tokenize(text: str, size: int = 3):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockLLM/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status: int, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        model = {"id": "mock", "object": "model", "owned_by": "mock"}
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [model]})
+        elif self.path.rstrip("/") == "/api/tags":
+            self._send_json(200, {"models": [{"name": "mock"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid json"}})
+            return
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        with mock.lock:
+            mock.requests += 1
+            roll_error = mock.rng.random()
+            roll_timeout = mock.rng.random()
+            ttft = mock.latency(mock.rng)
+            reply = build_reply(_prompt_text(req.get("messages")), mock.rng, mock.settings.malformed_rate)
+
+        if roll_timeout < mock.settings.timeout_rate:
+            with mock.lock:
+                mock.timeouts += 1
+            mock.stopping.wait(mock.settings.hang_seconds)
+            return
+        if mock.stopping.wait(ttft):
+            return
+        if roll_error < mock.settings.error_rate:
+            with mock.lock:
+                mock.errors += 1
+            self._send_json(500, {"error": {"message": "mock internal error", "type": "server_error"}})
+            return
+
+        tokens = _tokenize(reply)
+        per_token = 1.0 / mock.settings.tokens_per_second if mock.settings.tokens_per_second > 0 else 0.0
+        created = int(time.time())
+        model = req.get("model") or "mock"
+
+        if not req.get("stream"):
+            if mock.stopping.wait(per_token * len(tokens)):
+                return
+            self._send_json(
+                200,
+                {
+                    "id": f"chatcmpl-mock-{mock.requests}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, tok in enumerate(tokens):
+            if i and mock.stopping.wait(per_token):
+                return
+            chunk = {
+                "id": f"chatcmpl-mock-{mock.requests}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": tok}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class MockLLMServer:
+    def __init__(self, settings: MockLLMSettings = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or MockLLMSettings()
+        self.latency = parse_latency(self.settings.latency)
+        self.rng = random.Random(self.settings.seed)
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors, "timeouts": self.timeouts}
+
+
+def _settings_from_args(args) -> MockLLMSettings:
+    return MockLLMSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+
+
+async def _load(analyzer, requests: int, concurrency: int, seed: int):
+    rng = random.Random(seed)
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = {}
+
+    async def one():
+        temp = round(rng.uniform(20, 70), 1)
+        hum = round(rng.uniform(10, 80), 1)
+        smoke = rng.choice([False, False, True])
+        async with sem:
+            t0 = time.perf_counter()
+            result = await analyzer.analyze(temp, hum, smoke, None, mq2_value=rng.randint(0, 30000), vision_fire_detected=False, vision_detections=[])
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        try:
+            obj = json.loads(result)
+            kind = "json" if isinstance(obj, dict) and "risk_level" in obj else "other"
+        except (TypeError, ValueError):
+            kind = "text"
+        outcomes[kind] = outcomes.get(kind, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - started
+    await analyzer.aclose()
+    return latencies, outcomes, wall
+
+
+def loadtest(args):
+    from benchmark import percentile
+
+    from config import Config
+    from core import metrics
+
+    server = MockLLMServer(_settings_from_args(args)).start()
+    Config.LLM_MODE = "local"
+    Config.LLM_LOCAL_URL = server.url + "/v1"
+    Config.LLM_TIMEOUT_SECONDS = args.client_timeout
+    Config.LLM_STREAM = args.stream
+    Config.LLM_CACHE_ENABLED = False
+    Config.LLM_USE_IMAGE = False
+
+    from core.llm_analyzer import FireLLMAnalyzer
+
+    before = {k: c.value for k, c in metrics.LLM_CALLS._children.items()}
+    analyzer = FireLLMAnalyzer()
+    try:
+        latencies, outcomes, wall = asyncio.run(_load(analyzer, args.requests, args.concurrency, args.seed))
+    finally:
+        server.stop()
+    latencies.sort()
+    calls = {k[0]: c.value - before.get(k, 0.0) for k, c in metrics.LLM_CALLS._children.items()}
+    report = {
+        "server": _settings_from_args(args).__dict__,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "stream": args.stream,
+        "client_timeout_s": args.client_timeout,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "llm_calls": calls,
+        "result_kinds": outcomes,
+        "server_stats": server.stats(),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 兼容的模拟大模型服务")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "loadtest"):
+        p = sub.add_parser(name)
+        p.add_argument("--latency", default="fixed:0.05")
+        p.add_argument("--tokens-per-second", type=float, default=50.0)
+        p.add_argument("--error-rate", type=float, default=0.0)
+        p.add_argument("--timeout-rate", type=float, default=0.0)
+        p.add_argument("--hang-seconds", type=float, default=120.0)
+        p.add_argument("--malformed-rate", type=float, default=0.0)
+        p.add_argument("--seed", type=int, default=0)
+        if name == "serve":
+            p.add_argument("--host", default="127.0.0.1")
+            p.add_argument("--port", type=int, default=11435)
+        else:
+            p.add_argument("--requests", type=int, default=100)
+            p.add_argument("--concurrency", type=int, default=4)
+            p.add_argument("--client-timeout", type=float, default=5.0)
+            p.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+
+    if args.cmd == "loadtest":
+        loadtest(args)
+        return
+
+    server = MockLLMServer(_settings_from_args(args), host=args.host, port=args.port)
+    print(f"模拟大模型服务已启动: {server.url}/v1 (Ctrl+C 退出)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""对比 analyze_summary 各提示词变体的长度与 prompt eval 耗时
+
+用法:
+    python tools/prompt_report.py                     # 只输出字符数 / 估算 token 数
+    python tools/prompt_report.py --measure --repeat 5  # 同时向当前配置的后端发请求 (max_tokens=1)，
+                                                        # 记录服务端返回的 prompt_tokens 与耗时
+
+--measure 时同一变体连续请求，第一次之后的耗时体现了 system 前缀 KV cache 复用的效果。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from core.llm_prompt import PROMPT_VARIANTS, build_summary_messages, prompt_report
+from vision.detections import DetectionBatch
+
+SCENARIOS = {
+    "normal": dict(temperature=24.5, humidity=45.0, smoke_detected=False, mq2_value=3200, vision_fire_detected=False, vision_detections=[]),
+    "warning": dict(temperature=52.3, humidity=18.0, smoke_detected=False, mq2_value=9000, vision_fire_detected=False, vision_detections=[]),
+    "danger": dict(
+        temperature=61.0,
+        humidity=12.0,
+        smoke_detected=True,
+        mq2_value=21000,
+        vision_fire_detected=True,
+        vision_detections=DetectionBatch.from_arrays(
+            [0, 1], [0.873, 0.612], [[100, 120, 220, 260], [300, 40, 520, 200]], ("fire", "smoke")
+        ),
+    ),
+    "sensor_missing": dict(temperature=None, humidity=None, smoke_detected=False, mq2_value=None, vision_fire_detected=False, vision_detections=[]),
+}
+
+
+async def _measure(analyzer, messages, repeat: int):
+    latencies = []
+    prompt_tokens = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await analyzer.client.chat.completions.create(
+            model=analyzer.model,
+            messages=messages,
+            max_tokens=1,
+            temperature=0.0,
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+            extra_body={"keep_alive": Config.LLM_KEEP_ALIVE} if Config.LLM_MODE == "local" and Config.LLM_KEEP_ALIVE else None,
+        )
+        latencies.append(round((time.perf_counter() - started) * 1000.0, 1))
+        if response.usage is not None:
+            prompt_tokens = response.usage.prompt_tokens
+    return {"latency_ms": latencies, "prompt_tokens": prompt_tokens}
+
+
+async def _run(args):
+    from core.llm_analyzer import FireLLMAnalyzer
+
+    analyzer = FireLLMAnalyzer()
+    analyzer._refresh_model_from_config()
+    force_chinese = bool(getattr(Config, "LLM_FORCE_CHINESE", True))
+    report = {}
+    try:
+        for name, inputs in SCENARIOS.items():
+            rule_risk = analyzer._rule_risk(
+                inputs["temperature"], inputs["humidity"], inputs["smoke_detected"], inputs["mq2_value"], inputs["vision_fire_detected"]
+            )
+            context = analyzer._summary_context(rule_risk=rule_risk, **inputs)
+            report[name] = {}
+            for variant in PROMPT_VARIANTS:
+                messages = build_summary_messages(context, force_chinese=force_chinese, variant=variant)
+                entry = prompt_report(messages)
+                if args.measure:
+                    entry["backend"] = await _measure(analyzer, messages, args.repeat)
+                report[name][variant] = entry
+    finally:
+        await analyzer.aclose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提示词变体 token 数与 prompt eval 耗时报告")
+    parser.add_argument("--measure", action="store_true", help="向当前配置的大模型后端实际发送请求")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
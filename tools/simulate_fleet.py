@@ -0,0 +1,160 @@
+"""单机模拟多站点：一个 hub + N 个模拟边缘进程
+
+用法:
+    python tools/simulate_fleet.py --edges 20 --seconds 30 --flush 5
+    python tools/simulate_fleet.py --edges 50 --hub http://127.0.0.1:9000   # 使用已启动的 hub
+
+每个边缘进程运行真实的 TelemetryPusher (delta 编码 + zlib 压缩 + 失败重试)，数据源为合成的
+传感器随机游走，部分站点会按 --fire-rate 进入 Warning / Danger 并产生检测框。
+结束后汇总各边缘的字节数 (原始 JSON / delta / 压缩后)，并测量 hub 按风险等级查询的延迟。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.telemetry import TelemetryPusher
+
+
+class SyntheticSite:
+    """与 DataFusionSystem.get_state() 字段一致的合成状态"""
+
+    def __init__(self, seed: int, fire_rate: float):
+        self.rng = random.Random(seed)
+        self.fire_rate = float(fire_rate)
+        self.temperature = self.rng.uniform(18, 30)
+        self.humidity = self.rng.uniform(30, 70)
+        self.mq2 = self.rng.randint(3000, 8000)
+        self.fire_left = 0
+        self.request_id = 0
+        self.analysis = ""
+
+    def state(self) -> dict:
+        rng = self.rng
+        if self.fire_left <= 0 and rng.random() < self.fire_rate:
+            self.fire_left = rng.randint(5, 20)
+        burning = self.fire_left > 0
+        self.fire_left -= 1
+        target = 65.0 if burning else 24.0
+        self.temperature += (target - self.temperature) * 0.2 + rng.gauss(0, 0.2)
+        self.humidity = min(95.0, max(5.0, self.humidity + rng.gauss(0, 0.3)))
+        self.mq2 = int(max(0, self.mq2 + (2500 if burning else -300) + rng.gauss(0, 150)))
+        detections = []
+        if burning:
+            x = rng.randint(100, 400)
+            detections = [{"label": "fire", "confidence": rng.uniform(0.5, 0.9), "x1": x, "y1": 200, "x2": x + 80, "y2": 300}]
+        if self.temperature > 50 or self.mq2 > 15000 or detections:
+            risk = "Danger" if detections or self.mq2 > 15000 else "Warning"
+        else:
+            risk = "Normal"
+        if burning and rng.random() < 0.1:
+            self.request_id += 1
+            self.analysis = f"检测到火焰，温度 {self.temperature:.1f}℃"
+        return {
+            "temperature": round(self.temperature, 2),
+            "humidity": round(self.humidity, 2),
+            "smoke_detected": False,
+            "mq2_value": self.mq2,
+            "vision_fire_detected": bool(detections),
+            "vision_detections": detections,
+            "risk_level": risk,
+            "risk_reasons": ["vision_fire"] if detections else [],
+            "llm_analysis": self.analysis,
+            "llm_last_request_id": self.request_id,
+        }
+
+
+def run_edge(index: int, args, results):
+    site = SyntheticSite(seed=args.seed + index, fire_rate=args.fire_rate)
+    pusher = TelemetryPusher(
+        site.state,
+        args.hub,
+        site_id=f"sim-{index:03d}",
+        sample_seconds=args.sample,
+        flush_seconds=args.flush,
+        danger_flush_seconds=args.danger_flush,
+    )
+    pusher.start()
+    time.sleep(args.seconds)
+    pusher.stop()
+    results.put(pusher.stats())
+
+
+def _get(url: str):
+    with urllib.request.urlopen(url, timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def _wait_hub(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return _get(url + "/hub/summary")
+        except Exception:
+            time.sleep(0.2)
+    raise SystemExit(f"hub 未就绪: {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单机模拟多站点遥测推送")
+    parser.add_argument("--edges", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--sample", type=float, default=0.5, help="边缘采样间隔 (秒)")
+    parser.add_argument("--flush", type=float, default=5, help="边缘推送间隔 (秒)")
+    parser.add_argument("--danger-flush", type=float, default=1)
+    parser.add_argument("--fire-rate", type=float, default=0.01, help="每次采样进入火情的概率")
+    parser.add_argument("--hub", default="", help="已运行的 hub 地址；为空时在本机启动一个")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    hub_proc = None
+    if not args.hub:
+        args.hub = f"http://127.0.0.1:{args.port}"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        hub_proc = subprocess.Popen(
+            [sys.executable, "-m", "web.hub", "--host", "127.0.0.1", "--port", str(args.port)], cwd=root
+        )
+    try:
+        _wait_hub(args.hub)
+        results = multiprocessing.Queue()
+        edges = [multiprocessing.Process(target=run_edge, args=(i, args, results)) for i in range(args.edges)]
+        for p in edges:
+            p.start()
+        stats = [results.get(timeout=args.seconds + 30) for _ in edges]
+        for p in edges:
+            p.join()
+
+        totals = {k: sum(s[k] for s in stats) for k in ("samples", "events", "batches_sent", "batches_failed", "json_bytes", "delta_bytes", "wire_bytes")}
+        query_ms = []
+        for _ in range(50):
+            started = time.perf_counter()
+            _get(args.hub + "/hub/sites?risk=Danger")
+            query_ms.append((time.perf_counter() - started) * 1000.0)
+        query_ms.sort()
+        report = {
+            "edges": args.edges,
+            "seconds": args.seconds,
+            "edge_totals": totals,
+            "delta_ratio": round(totals["delta_bytes"] / totals["json_bytes"], 3) if totals["json_bytes"] else None,
+            "wire_ratio": round(totals["wire_bytes"] / totals["json_bytes"], 3) if totals["json_bytes"] else None,
+            "hub": _get(args.hub + "/hub/summary"),
+            "danger_query_ms": {"p50": round(query_ms[len(query_ms) // 2], 2), "max": round(query_ms[-1], 2)},
+            "recent_events": _get(args.hub + "/hub/events?limit=5"),
+        }
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    finally:
+        if hub_proc is not None:
+            hub_proc.terminate()
+            hub_proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
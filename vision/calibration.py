@@ -0,0 +1,151 @@
+"""设备标定：在实际设备上为检测模型选择输入尺寸、DNN 后端与线程数
+
+calibrate() 依次测量每种组合的推理延迟，选出满足目标延迟 (p95) 的最佳配置：
+优先更大的输入尺寸 (小目标召回更好)，同尺寸下取 p95 最低的后端，
+再取 p95 不超过该后端最优值 thread_slack 倍的最少线程数，把剩余核心留给视频流与其他线程。
+
+结果写入 JSON 标定文件 (Config.DEVICE_PROFILE_PATH)，DataFusionSystem 启动时通过 load_profile() 读取；
+模型文件或 OpenCV 版本变化后标定文件自动失效。
+"""
+import json
+import logging
+import os
+import platform
+import time
+
+import cv2
+
+PROFILE_VERSION = 1
+
+
+def model_signature(model_path: str) -> dict:
+    st = os.stat(model_path)
+    return {"path": os.path.abspath(model_path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def device_info() -> dict:
+    return {
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+    }
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * (pct / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return float(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo))
+
+
+def measure_detector(detector, frames, runs: int, warmup: int = 3) -> dict:
+    """单个配置的推理延迟 (毫秒)；推理抛出异常 (如固定输入尺寸的模型) 时返回 error"""
+    try:
+        for i in range(warmup):
+            detector.detect(frames[i % len(frames)])
+        durations = []
+        for i in range(runs):
+            t0 = time.perf_counter()
+            detector.detect(frames[i % len(frames)])
+            durations.append((time.perf_counter() - t0) * 1000.0)
+    except Exception as e:
+        return {"error": str(e).splitlines()[0][:200] if str(e) else type(e).__name__}
+    durations.sort()
+    return {
+        "p50_ms": round(_percentile(durations, 50), 2),
+        "p95_ms": round(_percentile(durations, 95), 2),
+        "mean_ms": round(sum(durations) / len(durations), 2),
+    }
+
+
+def choose(results: list, target_ms: float, thread_slack: float = 1.1):
+    """从测量结果中选出配置，返回 (最佳结果, 是否满足目标)"""
+    ok = [r for r in results if "error" not in r]
+    if not ok:
+        return None, False
+    meeting = [r for r in ok if r["p95_ms"] <= target_ms]
+    if not meeting:
+        return min(ok, key=lambda r: r["p95_ms"]), False
+    size = max(r["input_size"] for r in meeting)
+    same_size = [r for r in meeting if r["input_size"] == size]
+    backend = min(same_size, key=lambda r: r["p95_ms"])["backend"]
+    candidates = [r for r in same_size if r["backend"] == backend]
+    best = min(r["p95_ms"] for r in candidates)
+    return min((r for r in candidates if r["p95_ms"] <= best * thread_slack), key=lambda r: r["threads"]), True
+
+
+def calibrate(detector_factory, frames, input_sizes, backends, thread_counts, target_ms: float, runs: int = 20, log=print):
+    """detector_factory(input_size, backend) -> 检测器；逐一测量所有组合"""
+    results = []
+    previous_threads = cv2.getNumThreads()
+    try:
+        for backend in backends:
+            for size in input_sizes:
+                detector = detector_factory(int(size), backend)
+                for threads in thread_counts:
+                    cv2.setNumThreads(int(threads))
+                    stats = measure_detector(detector, frames, runs)
+                    entry = {"input_size": int(size), "backend": backend, "threads": int(threads), **stats}
+                    results.append(entry)
+                    if log:
+                        shown = stats.get("error") or f"p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms"
+                        log(f"  {backend:<8} {size:>4}px  {threads} 线程  {shown}")
+                    if "error" in stats:
+                        break  # 该尺寸在此后端不可用，其他线程数同样会失败
+    finally:
+        cv2.setNumThreads(previous_threads)
+    best, meets = choose(results, target_ms)
+    return best, meets, results
+
+
+def build_profile(model_path: str, best: dict, meets_target: bool, target_ms: float, results: list) -> dict:
+    return {
+        "version": PROFILE_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": model_signature(model_path),
+        "device": device_info(),
+        "target_p95_ms": target_ms,
+        "meets_target": meets_target,
+        "input_size": best["input_size"],
+        "backend": best["backend"],
+        "threads": best["threads"],
+        "p50_ms": best["p50_ms"],
+        "p95_ms": best["p95_ms"],
+        "results": results,
+    }
+
+
+def save_profile(path: str, profile: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_profile(path: str, model_path: str):
+    """读取标定文件；不存在、格式不符、模型或 OpenCV 版本已变化时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"标定文件无法读取 ({path}): {e}")
+        return None
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    try:
+        signature = model_signature(model_path)
+    except OSError:
+        return None
+    recorded = profile.get("model") or {}
+    if recorded.get("size") != signature["size"] or recorded.get("mtime") != signature["mtime"]:
+        logging.warning("检测模型已变化，标定文件失效，请重新运行 tools/calibrate.py")
+        return None
+    if (profile.get("device") or {}).get("opencv") != cv2.__version__:
+        logging.warning("OpenCV 版本已变化，标定文件失效，请重新运行 tools/calibrate.py")
+        return None
+    return profile
@@ -0,0 +1,171 @@
+"""两级检测级联：廉价初筛 + 完整 YOLO
+
+第一级在缩小的画面上做火焰颜色 (HSV) 与闪烁能量检查，或运行一个很小的 ONNX 二分类模型；
+只有初筛通过、仍有轨迹需要更新、或距上次完整推理超过 refresh_seconds 时才运行第二级 YOLO。
+初筛看不到的目标 (如无明火的烟雾) 依靠周期性刷新兜底。
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from core.metrics import (
+    VISION_CASCADE_CPU_DETECT,
+    VISION_CASCADE_CPU_SCREEN,
+    VISION_CASCADE_SCREEN_PASS,
+    VISION_CASCADE_SCREEN_REJECT,
+)
+from vision.detections import DetectionBatch
+
+# 火焰色：红-橙-黄，高饱和高亮度；红色在 HSV 中跨越 0/180 两端
+_FLAME_RANGES = (
+    (np.array([0, 80, 150], dtype=np.uint8), np.array([35, 255, 255], dtype=np.uint8)),
+    (np.array([170, 80, 150], dtype=np.uint8), np.array([180, 255, 255], dtype=np.uint8)),
+)
+
+
+class FlameScreen:
+    """HSV 火焰颜色占比 + 颜色区域内亮度变化 (闪烁能量)，全部为向量化运算"""
+
+    def __init__(self, size=(80, 60), min_fraction: float = 0.002, min_flicker: float = 3.0):
+        self.size = (int(size[0]), int(size[1]))
+        self.min_fraction = float(min_fraction)
+        self.min_flicker = float(min_flicker)
+        self._prev_v = None
+        self.last_fraction = 0.0
+        self.last_flicker = 0.0
+
+    def __call__(self, frame) -> bool:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, *_FLAME_RANGES[0]) | cv2.inRange(hsv, *_FLAME_RANGES[1])
+        count = cv2.countNonZero(mask)
+        self.last_fraction = count / float(mask.size)
+
+        v = hsv[:, :, 2]
+        flicker = 0.0
+        if self._prev_v is not None and count:
+            diff = cv2.absdiff(v, self._prev_v)
+            flicker = float(cv2.mean(diff, mask=mask)[0])
+        self._prev_v = v
+        self.last_flicker = flicker
+
+        if self.last_fraction < self.min_fraction:
+            return False
+        return self.min_flicker <= 0 or flicker >= self.min_flicker
+
+
+class OnnxScreen:
+    """小型 ONNX 二分类初筛：输出单个 logit / 概率，或 [负, 正] 两类"""
+
+    def __init__(self, model_path: str, input_size: int = 64, threshold: float = 0.3):
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.input_size = int(input_size)
+        self.threshold = float(threshold)
+        self.last_score = 0.0
+
+    def __call__(self, frame) -> bool:
+        blob = cv2.dnn.blobFromImage(frame, 1.0 / 255.0, (self.input_size, self.input_size), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        out = np.asarray(self.net.forward()).reshape(-1).astype(np.float32)
+        if out.size >= 2:
+            e = np.exp(out - out.max())
+            score = float(e[1] / e.sum())
+        else:
+            score = float(out[0])
+            if score < 0.0 or score > 1.0:
+                score = float(1.0 / (1.0 + np.exp(-score)))
+        self.last_score = score
+        return score >= self.threshold
+
+
+def build_screen(config):
+    model_path = getattr(config, "VISION_SCREEN_MODEL_PATH", "")
+    if model_path and os.path.exists(model_path):
+        return OnnxScreen(
+            model_path,
+            input_size=getattr(config, "VISION_SCREEN_INPUT_SIZE", 64),
+            threshold=getattr(config, "VISION_SCREEN_THRESHOLD", 0.3),
+        )
+    return FlameScreen(
+        size=getattr(config, "VISION_SCREEN_SIZE", (80, 60)),
+        min_fraction=getattr(config, "VISION_SCREEN_MIN_FRACTION", 0.002),
+        min_flicker=getattr(config, "VISION_SCREEN_MIN_FLICKER", 3.0),
+    )
+
+
+class DetectionCascade:
+    def __init__(self, screen, detector, refresh_seconds: float = 10.0):
+        self.screen = screen
+        self.detector = detector
+        self.refresh_seconds = float(refresh_seconds)
+        self._last_full = 0.0
+        self._lock = threading.Lock()
+        self.counts = {
+            "screened": 0,
+            "screen_passed": 0,
+            "detect_runs": 0,
+            "detect_by_screen": 0,
+            "detect_by_refresh": 0,
+            "detect_by_force": 0,
+            "detect_positive": 0,
+        }
+        self.cpu_seconds = {"screen": 0.0, "detect": 0.0}
+
+    def run(self, frame, force: bool = False):
+        """返回 (detections, ran_full)；初筛拒绝时 detections 为空的 DetectionBatch，推理失败为 None"""
+        reason = None
+        if force:
+            reason = "detect_by_force"
+        else:
+            cpu0 = time.thread_time()
+            passed = bool(self.screen(frame))
+            cpu = time.thread_time() - cpu0
+            VISION_CASCADE_CPU_SCREEN.inc(cpu)
+            (VISION_CASCADE_SCREEN_PASS if passed else VISION_CASCADE_SCREEN_REJECT).inc()
+            with self._lock:
+                self.counts["screened"] += 1
+                self.cpu_seconds["screen"] += cpu
+                if passed:
+                    self.counts["screen_passed"] += 1
+            if passed:
+                reason = "detect_by_screen"
+            elif time.monotonic() - self._last_full >= self.refresh_seconds:
+                reason = "detect_by_refresh"
+        if reason is None:
+            return DetectionBatch.empty(self.detector.class_names), False
+
+        self._last_full = time.monotonic()
+        cpu0 = time.thread_time()
+        try:
+            detections = self.detector.detect(frame)
+        except Exception:
+            detections = None
+        cpu = time.thread_time() - cpu0
+        VISION_CASCADE_CPU_DETECT.inc(cpu)
+        with self._lock:
+            self.counts["detect_runs"] += 1
+            self.counts[reason] += 1
+            self.cpu_seconds["detect"] += cpu
+            if detections:
+                self.counts["detect_positive"] += 1
+        return detections, True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            cpu = dict(self.cpu_seconds)
+        screened = counts["screened"]
+        runs = counts["detect_runs"]
+        return {
+            "screen": type(self.screen).__name__,
+            "refresh_seconds": self.refresh_seconds,
+            **counts,
+            "screen_pass_rate": round(counts["screen_passed"] / screened, 4) if screened else None,
+            "detect_positive_rate": round(counts["detect_positive"] / runs, 4) if runs else None,
+            "cpu_seconds": {k: round(v, 3) for k, v in cpu.items()},
+            "cpu_ms_per_screen": round(cpu["screen"] * 1000.0 / screened, 3) if screened else None,
+            "cpu_ms_per_detect": round(cpu["detect"] * 1000.0 / runs, 3) if runs else None,
+        }
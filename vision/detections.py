@@ -0,0 +1,161 @@
+"""检测结果的紧凑表示
+
+DetectionBatch 用一个结构化 NumPy 数组保存一帧的全部检测框 (类别、置信度、框、轨迹信息)，
+类别名称放在共享的 labels 表中。检测器、跟踪器、融合、叠加层与大模型都直接使用它，
+不再逐框构造 dict；只有在 API 边界 (get_state / JSON 响应) 才调用 to_list() 序列化一次。
+"""
+from typing import Iterable, Optional
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype(
+    [
+        ("class_id", np.int16),
+        ("confidence", np.float32),
+        ("box", np.int32, (4,)),  # x1, y1, x2, y2
+        ("track_id", np.int32),  # 未跟踪为 -1
+        ("age", np.int32),
+        ("hits", np.int32),
+        ("confirmed", np.bool_),  # 未跟踪的检测视为已确认
+    ]
+)
+
+_BOX_KEYS = ("x1", "y1", "x2", "y2")
+
+
+class DetectionBatch:
+    __slots__ = ("data", "labels", "tracked")
+
+    def __init__(self, data=None, labels: Iterable[str] = (), tracked: bool = False):
+        self.data = np.zeros(0, dtype=DETECTION_DTYPE) if data is None else data
+        self.labels = tuple(labels)
+        self.tracked = bool(tracked)
+
+    @classmethod
+    def empty(cls, labels: Iterable[str] = ()) -> "DetectionBatch":
+        return cls(None, labels)
+
+    @classmethod
+    def from_arrays(cls, class_ids, confidences, boxes, labels: Iterable[str] = ()) -> "DetectionBatch":
+        data = np.zeros(len(class_ids), dtype=DETECTION_DTYPE)
+        if len(data):
+            data["class_id"] = class_ids
+            data["confidence"] = confidences
+            data["box"] = boxes
+        data["track_id"] = -1
+        data["confirmed"] = True
+        return cls(data, labels)
+
+    @classmethod
+    def from_dicts(cls, dicts, labels: Iterable[str] = ()) -> "DetectionBatch":
+        """由 JSON / 工具脚本中的 dict 列表构造；未知标签追加到 labels 表末尾"""
+        labels = list(labels)
+        rows = []
+        for d in dicts or []:
+            try:
+                box = [int(d[k]) for k in _BOX_KEYS]
+                conf = float(d.get("confidence", 0) or 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+            label = str(d.get("label", ""))
+            if label not in labels:
+                labels.append(label)
+            track_id = d.get("track_id")
+            rows.append(
+                (
+                    labels.index(label),
+                    conf,
+                    box,
+                    -1 if track_id is None else int(track_id),
+                    int(d.get("age", 0) or 0),
+                    int(d.get("hits", 0) or 0),
+                    d.get("confirmed") is not False,
+                )
+            )
+        batch = cls(np.array(rows, dtype=DETECTION_DTYPE), labels)
+        batch.tracked = bool(len(batch.data)) and bool((batch.data["track_id"] >= 0).any())
+        return batch
+
+    @classmethod
+    def coerce(cls, value, labels: Iterable[str] = ()) -> Optional["DetectionBatch"]:
+        """None 原样返回，dict 列表转换为 DetectionBatch"""
+        if value is None or isinstance(value, cls):
+            return value
+        return cls.from_dicts(value, labels)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __bool__(self) -> bool:
+        return len(self.data) > 0
+
+    def label(self, i: int) -> str:
+        cls = int(self.data["class_id"][i])
+        return self.labels[cls] if 0 <= cls < len(self.labels) else str(cls)
+
+    def label_mask(self, label_set) -> np.ndarray:
+        """类别名称 (小写) 属于 label_set 的行"""
+        table = np.array([name.lower() in label_set for name in self.labels] + [False], dtype=bool)
+        ids = self.data["class_id"].astype(np.intp)
+        ids = np.where((ids >= 0) & (ids < len(self.labels)), ids, len(self.labels))
+        return table[ids]
+
+    def any_label(self, label_set, min_conf: float = 0.0, confirmed_only: bool = False) -> bool:
+        mask = self.label_mask(label_set) & (self.data["confidence"] >= min_conf)
+        if confirmed_only:
+            mask &= self.data["confirmed"]
+        return bool(mask.any())
+
+    def select(self, index) -> "DetectionBatch":
+        return DetectionBatch(self.data[index], self.labels, self.tracked)
+
+    def top(self, n: int, min_conf: float = 0.0) -> "DetectionBatch":
+        """按置信度降序取前 n 个 (置信度低于 min_conf 的丢弃)"""
+        data = self.data[self.data["confidence"] >= min_conf] if min_conf > 0 else self.data
+        order = np.argsort(-data["confidence"], kind="stable")[:n]
+        return DetectionBatch(data[order], self.labels, self.tracked)
+
+    def overlay_key(self) -> bytes:
+        """叠加层上可见的内容 (类别、框、轨迹编号、确认状态、两位小数置信度)；age / hits 变化不影响"""
+        data = self.data
+        return b"".join(
+            (
+                data["class_id"].tobytes(),
+                data["box"].tobytes(),
+                data["track_id"].tobytes(),
+                data["confirmed"].tobytes(),
+                np.round(data["confidence"] * 100).astype(np.int16).tobytes(),
+            )
+        )
+
+    def label_confidences(self):
+        """[(标签, 置信度)]"""
+        return [(self.label(i), round(c, 4)) for i, c in enumerate(self.data["confidence"].tolist())]
+
+    def to_list(self) -> list:
+        """API 边界的 JSON 表示，字段与原 dict 形式一致"""
+        data = self.data
+        columns = zip(
+            data["class_id"].tolist(),
+            data["confidence"].tolist(),
+            data["box"].tolist(),
+            data["track_id"].tolist(),
+            data["age"].tolist(),
+            data["hits"].tolist(),
+            data["confirmed"].tolist(),
+        )
+        out = []
+        for i, (class_id, conf, box, track_id, age, hits, confirmed) in enumerate(columns):
+            d = {
+                "class_id": class_id,
+                "label": self.label(i),
+                "confidence": round(conf, 4),
+                "x1": box[0],
+                "y1": box[1],
+                "x2": box[2],
+                "y2": box[3],
+            }
+            if self.tracked:
+                d.update(track_id=track_id, age=age, hits=hits, confirmed=confirmed)
+            out.append(d)
+        return out
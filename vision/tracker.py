@@ -0,0 +1,233 @@
+"""多目标跟踪：在两次 YOLO 推理之间把检测框沿用到中间帧
+
+- 关联：同类别内按 IoU 贪心匹配，IoU 不足时退化为中心点距离 (相对框对角线)；
+- 中间帧：开启光流时用稀疏 LK 光流估计每条轨迹的位移，否则按匀速外推；
+- 每条轨迹有稳定的 track_id、age (存活帧数) 与 hits (被检测确认次数)，
+  hits 达到 confirm_hits 才视为确认 (叠加层中未确认的轨迹用细线绘制)；
+  火情判定的时间确认由 vision_fire 规则的 vote 负责，不使用轨迹的确认状态。
+"""
+import itertools
+import math
+from typing import List
+
+import cv2
+import numpy as np
+
+from vision.detections import DETECTION_DTYPE, DetectionBatch
+from vision.yolo_onnx import _iou
+
+
+class Track:
+    __slots__ = (
+        "track_id",
+        "class_id",
+        "label",
+        "confidence",
+        "box",
+        "velocity",
+        "age",
+        "hits",
+        "misses",
+        "frames_since_detect",
+        "points",
+        "flow_lost",
+    )
+
+    def __init__(self, track_id: int, class_id: int, label: str, confidence: float, box):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.label = label
+        self.confidence = float(confidence)
+        self.box = [float(v) for v in box]
+        self.velocity = (0.0, 0.0)
+        self.age = 1
+        self.hits = 1
+        self.misses = 0
+        self.frames_since_detect = 0
+        self.points = None
+        self.flow_lost = False
+
+    def center(self):
+        return (self.box[0] + self.box[2]) / 2.0, (self.box[1] + self.box[3]) / 2.0
+
+    def shift(self, dx: float, dy: float):
+        self.box[0] += dx
+        self.box[2] += dx
+        self.box[1] += dy
+        self.box[3] += dy
+
+    def row(self, confirm_hits: int) -> tuple:
+        """DETECTION_DTYPE 的一行"""
+        return (
+            self.class_id,
+            self.confidence,
+            [int(round(v)) for v in self.box],
+            self.track_id,
+            self.age,
+            self.hits,
+            self.hits >= confirm_hits,
+        )
+
+
+def _center_distance(a, b) -> float:
+    """中心点距离，按两框平均对角线归一化"""
+    acx, acy = (a[0] + a[2]) / 2.0, (a[1] + a[3]) / 2.0
+    bcx, bcy = (b[0] + b[2]) / 2.0, (b[1] + b[3]) / 2.0
+    diag = (math.hypot(a[2] - a[0], a[3] - a[1]) + math.hypot(b[2] - b[0], b[3] - b[1])) / 2.0
+    if diag <= 0:
+        return float("inf")
+    return math.hypot(acx - bcx, acy - bcy) / diag
+
+
+class MultiObjectTracker:
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_center_distance: float = 0.5,
+        max_misses: int = 2,
+        confirm_hits: int = 2,
+        use_optical_flow: bool = False,
+        flow_max_points: int = 20,
+    ):
+        self.iou_threshold = float(iou_threshold)
+        self.max_center_distance = float(max_center_distance)
+        self.max_misses = int(max_misses)
+        self.confirm_hits = max(1, int(confirm_hits))
+        self.use_optical_flow = bool(use_optical_flow)
+        self.flow_max_points = int(flow_max_points)
+        self.tracks: List[Track] = []
+        self.labels = ()
+        self._ids = itertools.count(1)
+        self._prev_gray = None
+
+    def _gray(self, frame):
+        if frame is None:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def _seed_points(self, track: Track, gray):
+        h, w = gray.shape[:2]
+        x1, y1 = max(0, int(track.box[0])), max(0, int(track.box[1]))
+        x2, y2 = min(w, int(track.box[2])), min(h, int(track.box[3]))
+        track.points = None
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return
+        pts = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.flow_max_points, 0.01, 3)
+        if pts is not None:
+            pts[:, 0, 0] += x1
+            pts[:, 0, 1] += y1
+            track.points = pts.astype(np.float32)
+
+    def update(self, detections: DetectionBatch, frame=None) -> List[Track]:
+        """用一帧的检测结果更新轨迹"""
+        self.labels = detections.labels
+        class_ids = detections.data["class_id"].tolist()
+        confidences = detections.data["confidence"].tolist()
+        boxes = detections.data["box"].tolist()
+        candidates = []
+        for ti, track in enumerate(self.tracks):
+            for di, box in enumerate(boxes):
+                if class_ids[di] != track.class_id:
+                    continue
+                iou = _iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    candidates.append((0, -iou, ti, di))
+                else:
+                    dist = _center_distance(track.box, box)
+                    if dist <= self.max_center_distance:
+                        candidates.append((1, dist, ti, di))
+        candidates.sort()
+
+        matched_tracks = set()
+        matched_dets = set()
+        for _, _, ti, di in candidates:
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track = self.tracks[ti]
+            ocx, ocy = track.center()
+            track.box = [float(v) for v in boxes[di]]
+            ncx, ncy = track.center()
+            # 检测帧之间已外推的位移不计入速度，按距上次检测的帧数平均
+            steps = max(1, track.frames_since_detect)
+            if track.frames_since_detect:
+                track.velocity = ((ncx - ocx) / steps + track.velocity[0], (ncy - ocy) / steps + track.velocity[1])
+            else:
+                track.velocity = (ncx - ocx, ncy - ocy)
+            track.confidence = confidences[di]
+            track.hits += 1
+            track.misses = 0
+            track.age += 1
+            track.frames_since_detect = 0
+            track.flow_lost = False
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti in matched_tracks:
+                survivors.append(track)
+                continue
+            track.misses += 1
+            track.age += 1
+            track.frames_since_detect = 0
+            if track.misses <= self.max_misses:
+                survivors.append(track)
+        for di in range(len(boxes)):
+            if di not in matched_dets:
+                survivors.append(
+                    Track(next(self._ids), class_ids[di], detections.label(di), confidences[di], boxes[di])
+                )
+        self.tracks = survivors
+
+        gray = self._gray(frame) if self.use_optical_flow else None
+        if gray is not None:
+            for track in self.tracks:
+                self._seed_points(track, gray)
+        self._prev_gray = gray
+        return self.tracks
+
+    def predict(self, frame=None) -> List[Track]:
+        """中间帧：不做推理，按光流或匀速外推移动现有轨迹"""
+        gray = self._gray(frame) if self.use_optical_flow else None
+        for track in self.tracks:
+            track.age += 1
+            track.frames_since_detect += 1
+            moved = False
+            if gray is not None and self._prev_gray is not None and track.points is not None and len(track.points):
+                nxt, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, track.points, None)
+                if nxt is not None and status is not None:
+                    good = status.reshape(-1) == 1
+                    if good.sum() >= max(3, len(track.points) // 3):
+                        delta = (nxt[good] - track.points[good]).reshape(-1, 2)
+                        dx, dy = float(np.median(delta[:, 0])), float(np.median(delta[:, 1]))
+                        track.shift(dx, dy)
+                        track.velocity = (dx, dy)
+                        track.points = nxt[good].reshape(-1, 1, 2)
+                        moved = True
+                    else:
+                        track.flow_lost = True
+            if not moved:
+                track.shift(*track.velocity)
+            if frame is not None:
+                h, w = frame.shape[:2]
+                if track.box[2] <= 0 or track.box[3] <= 0 or track.box[0] >= w or track.box[1] >= h:
+                    track.flow_lost = True
+        if gray is not None:
+            self._prev_gray = gray
+        return self.tracks
+
+    def lost(self) -> bool:
+        """有轨迹的光流失效或移出画面时返回 True，调用方应提前做一次完整推理"""
+        return any(t.flow_lost for t in self.tracks)
+
+    def reset(self):
+        self.tracks = []
+        self._prev_gray = None
+
+    def as_batch(self, confirmed_only: bool = False) -> DetectionBatch:
+        rows = [
+            t.row(self.confirm_hits)
+            for t in self.tracks
+            if t.misses == 0 and (not confirmed_only or t.hits >= self.confirm_hits)
+        ]
+        return DetectionBatch(np.array(rows, dtype=DETECTION_DTYPE), self.labels, tracked=True)
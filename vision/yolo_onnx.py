@@ -1,20 +1,36 @@
 import os
-from dataclasses import dataclass
+import time
 from typing import List, Optional
 
 import cv2
 import numpy as np
 
+from core.metrics import INFERENCE_SECONDS, NMS_CANDIDATES, NMS_KEPT
+from vision.detections import DetectionBatch
 
-@dataclass
-class Detection:
-    class_id: int
-    label: str
-    confidence: float
-    x1: int
-    y1: int
-    x2: int
-    y2: int
+
+# OpenCV DNN 后端名称 -> (backend 常量名, target 常量名)；是否可用取决于 OpenCV 的编译选项
+DNN_BACKENDS = {
+    "opencv": ("DNN_BACKEND_OPENCV", "DNN_TARGET_CPU"),
+    "openvino": ("DNN_BACKEND_INFERENCE_ENGINE", "DNN_TARGET_CPU"),
+    "vulkan": ("DNN_BACKEND_VKCOM", "DNN_TARGET_VULKAN"),
+    "cuda": ("DNN_BACKEND_CUDA", "DNN_TARGET_CUDA"),
+}
+
+
+def available_backends() -> List[str]:
+    names = []
+    for name, (backend_attr, target_attr) in DNN_BACKENDS.items():
+        backend = getattr(cv2.dnn, backend_attr, None)
+        target = getattr(cv2.dnn, target_attr, None)
+        if backend is None or target is None:
+            continue
+        try:
+            if target in cv2.dnn.getAvailableTargets(backend):
+                names.append(name)
+        except Exception:
+            continue
+    return names or ["opencv"]
 
 
 def _iou(a, b) -> float:
@@ -54,6 +70,7 @@ class YoloOnnxDetector:
         input_size: int = 320,
         conf_threshold: float = 0.4,
         iou_threshold: float = 0.45,
+        backend: str = "opencv",
     ):
         self.model_path = model_path
         self.class_names = class_names
@@ -61,17 +78,37 @@ class YoloOnnxDetector:
         self.conf_threshold = float(conf_threshold)
         self.iou_threshold = float(iou_threshold)
         self.net = None
+        # 最近一次推理的起止时刻 (time.monotonic())，供流水线追踪使用
+        self.last_infer_start = 0.0
+        self.last_infer_end = 0.0
 
+        self.backend = "opencv"
         if os.path.exists(self.model_path):
             self.net = cv2.dnn.readNetFromONNX(self.model_path)
+            self.set_backend(backend)
+
+    def set_backend(self, name: str):
+        """切换 OpenCV DNN 后端 (DNN_BACKENDS 中的名称)，未知名称按 opencv 处理"""
+        backend_attr, target_attr = DNN_BACKENDS.get(name, DNN_BACKENDS["opencv"])
+        self.net.setPreferableBackend(getattr(cv2.dnn, backend_attr))
+        self.net.setPreferableTarget(getattr(cv2.dnn, target_attr))
+        self.backend = name if name in DNN_BACKENDS else "opencv"
 
     def is_ready(self) -> bool:
         return self.net is not None
 
-    def detect(self, frame_bgr) -> Optional[List[Detection]]:
+    def detect(self, frame_bgr) -> Optional[DetectionBatch]:
         if self.net is None or frame_bgr is None:
             return None
 
+        self.last_infer_start = time.monotonic()
+        try:
+            return self._detect(frame_bgr)
+        finally:
+            self.last_infer_end = time.monotonic()
+            INFERENCE_SECONDS.observe(self.last_infer_end - self.last_infer_start)
+
+    def _detect(self, frame_bgr) -> DetectionBatch:
         h, w = frame_bgr.shape[:2]
         blob = cv2.dnn.blobFromImage(
             frame_bgr,
@@ -92,7 +129,7 @@ class YoloOnnxDetector:
             preds = np.squeeze(preds, axis=0)
 
         if preds.ndim != 2:
-            return []
+            return DetectionBatch.empty(self.class_names)
 
         feature_dim, box_dim = preds.shape
         if feature_dim < box_dim:
@@ -102,7 +139,7 @@ class YoloOnnxDetector:
 
         num_cols = data.shape[1]
         if num_cols < 6:
-            return []
+            return DetectionBatch.empty(self.class_names)
 
         class_count = max(1, len(self.class_names))
         has_objectness = (num_cols - 5) == class_count
@@ -164,31 +201,32 @@ class YoloOnnxDetector:
             scores.append(conf)
             class_ids.append(cls)
 
+        NMS_CANDIDATES.observe(len(boxes))
         if not boxes:
-            return []
+            NMS_KEPT.observe(0)
+            return DetectionBatch.empty(self.class_names)
 
         keep = _nms(boxes, scores, self.iou_threshold)
-        detections: List[Detection] = []
-        for i in keep:
-            cls = class_ids[i]
-            label = self.class_names[cls] if 0 <= cls < len(self.class_names) else str(cls)
-            x1, y1, x2, y2 = boxes[i]
-            detections.append(
-                Detection(class_id=int(cls), label=label, confidence=float(scores[i]), x1=x1, y1=y1, x2=x2, y2=y2)
-            )
-        return detections
+        NMS_KEPT.observe(len(keep))
+        return DetectionBatch.from_arrays(
+            [class_ids[i] for i in keep],
+            [scores[i] for i in keep],
+            [boxes[i] for i in keep],
+            self.class_names,
+        )
 
-    def draw(self, frame_bgr, detections: List[Detection]):
+    def draw(self, frame_bgr, detections: DetectionBatch):
         if frame_bgr is None or not detections:
             return frame_bgr
-        for det in detections:
-            color = (0, 0, 255) if det.label.lower() == "fire" else (255, 128, 0)
-            cv2.rectangle(frame_bgr, (det.x1, det.y1), (det.x2, det.y2), color, 2)
-            text = f"{det.label} {det.confidence:.2f}"
+        for i, (x1, y1, x2, y2) in enumerate(detections.data["box"].tolist()):
+            label = detections.label(i)
+            color = (0, 0, 255) if label.lower() == "fire" else (255, 128, 0)
+            cv2.rectangle(frame_bgr, (x1, y1), (x2, y2), color, 2)
+            text = f"{label} {float(detections.data['confidence'][i]):.2f}"
             cv2.putText(
                 frame_bgr,
                 text,
-                (det.x1, max(0, det.y1 - 6)),
+                (x1, max(0, y1 - 6)),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.5,
                 color,
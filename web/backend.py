@@ -0,0 +1,224 @@
+"""Web 层的数据来源
+
+- LocalBackend: 单进程部署，直接读取本进程内的 DataFusionSystem；守护进程 (daemon.py) 也用它响应 IPC 请求；
+- RemoteBackend: 拆分部署 (Config.ARCH_MODE = "split")，通过 Unix socket 与共享内存读取守护进程发布的数据，
+  可以在任意数量的 uvicorn worker 中使用，不接触任何硬件。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+from config import Config
+from core.ipc import IPCError, SharedFrameRing, ipc_request, ipc_subscribe
+from core.metrics import REGISTRY, WORKER_METRICS, merge_expositions
+from core.profiler import MAX_SECONDS, SamplingProfiler
+from web.stream import OVERLAY, render_stream_frame
+
+EVENT_KEEPALIVE_SECONDS = 15
+KEEPALIVE_PAYLOAD = ": keep-alive\n\n"
+
+# 采样本进程的线程；拆分部署时由守护进程通过 IPC 响应，采样的是持有硬件与检测线程的进程
+PROFILER = SamplingProfiler()
+
+
+class LocalBackend:
+    def __init__(self, fusion):
+        self.fusion = fusion
+
+    async def status(self):
+        return self.fusion.get_state()
+
+    async def llm_info(self):
+        fusion = self.fusion
+        state = fusion.get_raw_state()
+        return {
+            "mode": state.get("llm_mode"),
+            "model": state.get("llm_model"),
+            "use_image": state.get("llm_use_image"),
+            "cache": fusion.llm.get_cache_stats(),
+            "scheduler": fusion.get_llm_scheduler_stats(),
+            "breaker": fusion.llm.get_breaker_stats(),
+            "warmup": fusion.llm.get_warmup_stats(),
+            "image": fusion.llm.images.stats(),
+        }
+
+    async def vision(self):
+        stats = self.fusion.get_vision_stats()
+        stats["overlay"] = OVERLAY.stats()
+        return stats
+
+    async def traces(self):
+        return self.fusion.get_trace_stats()
+
+    async def ollama(self):
+        return self.fusion.llm.get_breaker_stats()
+
+    async def telemetry(self):
+        return self.fusion.get_telemetry_stats()
+
+    async def metrics(self):
+        return REGISTRY.render()
+
+    async def analyze(self, wait: bool = False):
+        future, coalesced = self.fusion.request_llm_analysis(trigger="manual")
+        content = {"started": not coalesced, "coalesced": coalesced}
+        if wait:
+            content["result"] = await asyncio.wrap_future(future)
+        content["state"] = self.fusion.get_state()
+        return content
+
+    async def events(self):
+        """逐条产出 SSE payload；长时间无事件时产出 keep-alive 注释行"""
+        sub = self.fusion.events.subscribe()
+        _, queue = sub
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_PAYLOAD
+        finally:
+            self.fusion.events.unsubscribe(sub)
+
+    def latest_frame(self):
+        return render_stream_frame(self.fusion)
+
+    def stream_interval(self) -> float:
+        return 1.0 / max(0.5, float(self.fusion.stream_settings()[0]))
+
+    async def governor(self):
+        return self.fusion.get_governor_stats()
+
+    async def profile(self, seconds: float = 5.0, hz: float = 50.0):
+        return await asyncio.to_thread(PROFILER.profile, seconds, hz)
+
+    def ipc_handlers(self) -> dict:
+        handlers = {
+            "status": self.status,
+            "llm": self.llm_info,
+            "vision": self.vision,
+            "traces": self.traces,
+            "ollama": self.ollama,
+            "metrics": self.metrics,
+            "telemetry": self.telemetry,
+            "governor": self.governor,
+            "analyze": self.analyze,
+        }
+        if getattr(Config, "PROFILER_ENABLED", False):
+            handlers["profile"] = self.profile
+        return handlers
+
+    async def forward_events(self, writer):
+        """IPC 订阅：把事件逐行写给 worker，直到对端断开"""
+        events = self.events()
+        try:
+            async for payload in events:
+                writer.write(json.dumps({"payload": payload}, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            await events.aclose()
+
+
+class RemoteBackend:
+    def __init__(self, socket_path: str = None, shm_name: str = None):
+        self.socket_path = socket_path or getattr(Config, "IPC_SOCKET_PATH", "/tmp/firedetect.sock")
+        self.shm_name = shm_name or getattr(Config, "IPC_SHM_NAME", "firedetect_frames")
+        self.timeout = float(getattr(Config, "IPC_TIMEOUT_SECONDS", 3))
+        self.reattach_seconds = float(getattr(Config, "IPC_RING_REATTACH_SECONDS", 2))
+        self._ring = None
+        self._reattach_checked = 0.0
+
+    async def _request(self, op: str, **args):
+        return await ipc_request(self.socket_path, op, timeout=self.timeout, **args)
+
+    async def status(self):
+        return await self._request("status")
+
+    async def llm_info(self):
+        return await self._request("llm")
+
+    async def vision(self):
+        return await self._request("vision")
+
+    async def traces(self):
+        return await self._request("traces")
+
+    async def ollama(self):
+        return await self._request("ollama")
+
+    async def telemetry(self):
+        return await self._request("telemetry")
+
+    async def governor(self):
+        return await self._request("governor")
+
+    async def metrics(self):
+        """守护进程的指标 (采集、推理、LLM 都在守护进程中)，合并本 worker 记录的视频流指标
+
+        worker 的样本带 worker="<pid>" 标签，与守护进程的同名序列区分。
+        """
+        daemon = await self._request("metrics")
+        local = REGISTRY.render(names=WORKER_METRICS, const_labels={"worker": os.getpid()})
+        return merge_expositions(daemon, local)
+
+    async def profile(self, seconds: float = 5.0, hz: float = 50.0):
+        timeout = min(float(seconds), MAX_SECONDS) + self.timeout
+        return await ipc_request(self.socket_path, "profile", timeout=timeout, seconds=seconds, hz=hz)
+
+    async def analyze(self, wait: bool = False):
+        # wait=true 时需等到分析完成，不套用普通请求的超时
+        timeout = float(getattr(Config, "LLM_TIMEOUT_SECONDS", 60)) + self.timeout if wait else self.timeout
+        return await ipc_request(self.socket_path, "analyze", timeout=timeout, wait=wait)
+
+    async def events(self):
+        try:
+            async for payload in ipc_subscribe(self.socket_path, timeout=self.timeout):
+                yield payload
+        except (OSError, asyncio.TimeoutError) as e:
+            raise IPCError(f"事件订阅失败: {e}") from e
+
+    def _attach(self):
+        try:
+            return SharedFrameRing(self.shm_name)
+        except (FileNotFoundError, ValueError) as e:
+            logging.debug(f"帧缓冲不可用: {e}")
+            return None
+
+    def _check_reattach(self):
+        """帧序号长时间不变时按名称重新附加：守护进程重启后旧的共享内存已被 unlink，不会再有新帧"""
+        now = time.monotonic()
+        if now - self._reattach_checked < self.reattach_seconds:
+            return
+        self._reattach_checked = now
+        ring = self._attach()
+        if ring is not None and ring.instance == self._ring.instance:
+            ring.close()
+            return
+        self._ring.close()
+        self._ring = ring
+        if ring is not None:
+            logging.info("守护进程已重启，重新附加帧缓冲")
+
+    def latest_frame(self):
+        """从共享内存拷贝最新一帧；守护进程未启动时返回 None"""
+        if self._ring is None:
+            self._ring = self._attach()
+        elif self._ring.stalled_seconds() > self.reattach_seconds:
+            self._check_reattach()
+        if self._ring is None:
+            return None
+        payload, _ = self._ring.read_latest()
+        return payload
+
+    def stream_interval(self) -> float:
+        # 帧率由守护进程的发布频率 (受负载调节) 决定，这里只需不慢于其上限
+        return 1.0 / max(0.5, float(getattr(Config, "IPC_FRAME_FPS", 10)))
+
+    def close(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
@@ -0,0 +1,93 @@
+"""全网汇聚中心 (hub) Web 服务
+
+边缘节点配置 HUB_URL 后把遥测批次推送到 /hub/ingest；
+本服务只在内存中建立索引 (core/hub.py)，不访问任何硬件，可以部署在任意一台机器上。
+
+启动: python -m web.hub --port 9000
+"""
+import argparse
+import json
+import os
+import sys
+import zlib
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from core.hub import FleetFull, FleetIndex
+
+fleet = FleetIndex(
+    history=getattr(Config, "HUB_HISTORY_RECORDS", 120),
+    stale_seconds=getattr(Config, "HUB_STALE_SECONDS", 60),
+    max_sites=getattr(Config, "HUB_MAX_SITES", 1000),
+)
+MAX_BODY_BYTES = int(getattr(Config, "HUB_MAX_BODY_BYTES", 1024 * 1024))
+app = FastAPI()
+
+
+def _inflate(body: bytes) -> bytes:
+    """解压 deflate 请求体，解压后超过 MAX_BODY_BYTES 时抛出 OverflowError (防压缩炸弹)"""
+    inflater = zlib.decompressobj()
+    out = inflater.decompress(body, MAX_BODY_BYTES)
+    if inflater.unconsumed_tail:
+        raise OverflowError("解压后的批次过大")
+    return out
+
+
+@app.post("/hub/ingest")
+async def ingest(request: Request):
+    body = await request.body()
+    wire_bytes = len(body)
+    try:
+        if wire_bytes > MAX_BODY_BYTES:
+            raise OverflowError("批次过大")
+        if request.headers.get("content-encoding", "").lower() == "deflate":
+            body = _inflate(body)
+        batch = json.loads(body)
+        if not isinstance(batch, dict):
+            raise ValueError("批次必须是 JSON 对象")
+        added = fleet.ingest(batch, wire_bytes=wire_bytes)
+    except OverflowError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    except FleetFull as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+    except (ValueError, TypeError, KeyError, AttributeError, zlib.error) as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    return JSONResponse(content={"ok": True, "records": added})
+
+
+@app.get("/hub/summary")
+async def summary():
+    """站点总数、在线数、各风险等级的站点数与接收统计"""
+    return JSONResponse(content=fleet.summary(), headers={"Cache-Control": "no-store"})
+
+
+@app.get("/hub/sites")
+async def sites(risk: str = None, online: bool = None):
+    """按风险等级 (索引查询) 与在线状态筛选站点"""
+    return JSONResponse(content=fleet.sites(risk=risk, online=online), headers={"Cache-Control": "no-store"})
+
+
+@app.get("/hub/sites/{site}")
+async def site_detail(site: str, history: int = 0):
+    detail = fleet.site(site, history=history)
+    if detail is None:
+        return JSONResponse(content={"error": "unknown site"}, status_code=404)
+    return JSONResponse(content=detail, headers={"Cache-Control": "no-store"})
+
+
+@app.get("/hub/events")
+async def events(limit: int = 50, site: str = None):
+    return JSONResponse(content=fleet.events(limit=limit, site=site), headers={"Cache-Control": "no-store"})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="火灾监测汇聚中心")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -1,9 +1,8 @@
-import cv2
 import uvicorn
 import time
 import logging
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
@@ -13,21 +12,44 @@ import os
 # 添加项目根目录到Path以便导入
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.fusion import DataFusionSystem
-
-# 全局系统实例
-fusion_system = DataFusionSystem()
+from config import Config
+from core.ipc import IPCError
+from core.metrics import STREAM_CLIENTS
+from core.profiler import ProfilerBusy
+from web.backend import LocalBackend, RemoteBackend
+from web.stream import encode_jpeg, mjpeg_part, no_signal_frame
+
+# 拆分部署时硬件、融合与检测都在守护进程 (daemon.py) 中，本进程只通过 IPC 读取，可以开多个 worker
+SPLIT_MODE = getattr(Config, "ARCH_MODE", "single") == "split"
+if SPLIT_MODE:
+    fusion_system = None
+    backend = RemoteBackend()
+else:
+    from core.fusion import DataFusionSystem
+
+    # 全局系统实例
+    fusion_system = DataFusionSystem()
+    backend = LocalBackend(fusion_system)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时运行
-    fusion_system.start()
+    if fusion_system is not None:
+        fusion_system.start()
     yield
     # 关闭时运行
-    fusion_system.stop()
+    if fusion_system is not None:
+        fusion_system.stop()
+    else:
+        backend.close()
 
 app = FastAPI(lifespan=lifespan)
 
+
+@app.exception_handler(IPCError)
+async def ipc_unavailable(request: Request, exc: IPCError):
+    return JSONResponse(content={"error": str(exc)}, status_code=503, headers={"Cache-Control": "no-store"})
+
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -39,91 +61,107 @@ async def read_root(request: Request):
 @app.get("/api/status")
 async def get_status():
     """获取当前系统状态API"""
-    return JSONResponse(content=fusion_system.get_state(), headers={"Cache-Control": "no-store"})
+    return JSONResponse(content=await backend.status(), headers={"Cache-Control": "no-store"})
 
 
 @app.get("/api/llm")
 async def llm_info():
-    state = fusion_system.get_state()
-    return JSONResponse(
-        content={
-            "mode": state.get("llm_mode"),
-            "model": state.get("llm_model"),
-            "use_image": state.get("llm_use_image"),
-        },
-        headers={"Cache-Control": "no-store"},
+    return JSONResponse(content=await backend.llm_info(), headers={"Cache-Control": "no-store"})
+
+
+@app.get("/api/events")
+async def events(request: Request):
+    """SSE 推送：llm_partial (流式生成中的描述) 与 llm_result (最终结果)"""
+    async def stream():
+        events = backend.events()
+        try:
+            yield "retry: 3000\n\n"
+            async for payload in events:
+                if await request.is_disconnected():
+                    break
+                yield payload
+        except IPCError as e:
+            logging.warning(f"事件转发中断: {e}")
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
     )
 
 
+@app.get("/api/vision")
+async def vision_stats():
+    """视觉流水线：采集 grab/解码帧率、跟踪轨迹数与检测级联各级通过率、CPU 时间"""
+    return JSONResponse(content=await backend.vision(), headers={"Cache-Control": "no-store"})
+
+@app.get("/api/traces")
+async def trace_stats():
+    """流水线各阶段延迟直方图 (帧采集 -> 推理 -> 判定 -> 发布 -> LLM 完成)"""
+    return JSONResponse(content=await backend.traces(), headers={"Cache-Control": "no-store"})
+
+@app.get("/api/governor")
+async def governor_stats():
+    """负载调节：当前档位与各项参数、SoC 温度、CPU 占用、阶段延迟"""
+    return JSONResponse(content=await backend.governor(), headers={"Cache-Control": "no-store"})
+
+
+@app.get("/api/telemetry")
+async def telemetry_stats():
+    """向汇聚中心推送遥测的批次、失败重试与 delta / 压缩后的字节数"""
+    return JSONResponse(content=await backend.telemetry(), headers={"Cache-Control": "no-store"})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 文本格式指标"""
+    return PlainTextResponse(await backend.metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/debug/profile")
+async def debug_profile(seconds: float = 5.0, hz: float = 50.0, format: str = "json"):
+    """采样所有线程调用栈，返回 collapsed stacks 与各线程 CPU 时间 (需 PROFILER_ENABLED=1)
+
+    拆分部署时经 IPC 由守护进程采样 (检测、融合与大模型线程都在守护进程中)。
+    """
+    if not getattr(Config, "PROFILER_ENABLED", False):
+        return JSONResponse(content={"error": "profiler disabled"}, status_code=404)
+    try:
+        result = await backend.profile(seconds, hz)
+    except ProfilerBusy as e:
+        return JSONResponse(content={"error": str(e)}, status_code=409)
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(result["collapsed"]) + "\n")
+    return JSONResponse(content=result, headers={"Cache-Control": "no-store"})
+
+
 @app.post("/api/analyze")
-async def analyze_now():
-    started = fusion_system.trigger_llm_analysis(trigger="manual")
-    return JSONResponse(content={"started": started, "state": fusion_system.get_state()}, headers={"Cache-Control": "no-store"})
+async def analyze_now(wait: bool = False):
+    """触发分析；已有分析在途时合并到该请求。wait=true 时等待并返回分析结果"""
+    return JSONResponse(content=await backend.analyze(wait=wait), headers={"Cache-Control": "no-store"})
 
 
 @app.get("/api/ollama")
 async def ollama_status():
-    import socket
-
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(1)
-    try:
-        ok = sock.connect_ex(("127.0.0.1", 11434)) == 0
-    finally:
-        try:
-            sock.close()
-        except Exception:
-            pass
-    return JSONResponse(content={"ok": ok}, headers={"Cache-Control": "no-store"})
+    """大模型后端状态：取自熔断器 (最近调用的成败与延迟、后台探测结果)，不再每次新建连接探测"""
+    return JSONResponse(content=await backend.ollama(), headers={"Cache-Control": "no-store"})
 
 def generate_frames():
     """视频流生成器"""
-    while True:
-        frame = fusion_system.camera.get_frame()
-        if frame is None:
-            import numpy as np
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "No Camera Signal", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        else:
-            detections = fusion_system.get_latest_detections()
-            if isinstance(detections, list) and detections:
-                frame = frame.copy()
-                for d in detections[:20]:
-                    try:
-                        x1 = int(d.get("x1"))
-                        y1 = int(d.get("y1"))
-                        x2 = int(d.get("x2"))
-                        y2 = int(d.get("y2"))
-                        label = str(d.get("label", ""))
-                        conf = float(d.get("confidence", 0))
-                    except Exception:
-                        continue
-
-                    if label.lower() in ("fire", "flame"):
-                        color = (0, 0, 255)
-                    elif label.lower() == "smoke":
-                        color = (0, 165, 255)
-                    else:
-                        color = (255, 128, 0)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(
-                        frame,
-                        f"{label} {conf:.2f}",
-                        (x1, max(0, y1 - 6)),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        color,
-                        1,
-                        cv2.LINE_AA,
-                    )
-
-        ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-        if ret:
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
-        time.sleep(0.1)
+    STREAM_CLIENTS.inc()
+    try:
+        while True:
+            frame_bytes = backend.latest_frame()
+            if frame_bytes is None:
+                frame_bytes = encode_jpeg(no_signal_frame())
+            if frame_bytes is not None:
+                yield mjpeg_part(frame_bytes)
+
+            time.sleep(backend.stream_interval())
+    finally:
+        STREAM_CLIENTS.dec()
 
 @app.get("/video_feed")
 async def video_feed():
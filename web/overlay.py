@@ -0,0 +1,272 @@
+"""视频流叠加层缓存
+
+检测框内容只在视觉线程产生新结果时变化，而 /video_feed 每个客户端每帧都要绘制。
+OverlayRenderer 按叠加层版本 (视觉线程只在框内容变化时递增，见 DataFusionSystem.get_overlay_detections)
+缓存：同一版本第二次被使用时，把所有框与标签在检测框并集区域内栅格化一次，只保存被覆盖像素
+(稀疏叠加层)，之后每帧只做一次混合：
+
+- 标签文字位图按 (轨迹编号, 标签, 置信度分桶) 的文字缓存 (LRU)，不再每次 putText；
+- 版本每帧都在变化 (跟踪外推中的运动目标) 时栅格化没有收益，直接在输出缓冲区上绘制；
+- 摄像头帧同时被检测器与大模型读取，不能原地修改，绘制 / 混合写入复用的输出缓冲区；
+- 同一 (帧序号, 叠加层版本, 画质) 的 JPEG 只编码一次，多个客户端共用。
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+LABEL_OFFSET = 6
+
+
+def label_color(label: str):
+    label = label.lower()
+    if label in ("fire", "flame"):
+        return (0, 0, 255)
+    if label == "smoke":
+        return (0, 165, 255)
+    return (255, 128, 0)
+
+
+class _LRU(OrderedDict):
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max(1, int(max_entries))
+
+    def lookup(self, key):
+        value = self.get(key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+
+
+class SparseOverlay:
+    """栅格化后的叠加层：只保留被覆盖区域
+
+    不透明像素 (框线、文字主体) 保存为外接矩形内的颜色与掩码，用 cv2.copyTo 一次写入；
+    抗锯齿的半透明边缘只有少量像素，保存其字节下标按 alpha 混合。
+    alpha / color 是位于画面 (oy, ox) 处的局部画布。
+    """
+
+    __slots__ = ("shape", "roi", "solid_color", "solid_mask", "blend_idx", "blend_color", "blend_alpha", "pixels")
+
+    def __init__(self, alpha, color, origin, shape):
+        self.shape = shape
+        ys, xs = np.nonzero(alpha)
+        self.pixels = len(ys)
+        if not self.pixels:
+            self.roi = None
+            return
+        oy, ox = origin
+        ry0, ry1, rx0, rx1 = int(ys.min()), int(ys.max()) + 1, int(xs.min()), int(xs.max()) + 1
+        self.roi = (slice(oy + ry0, oy + ry1), slice(ox + rx0, ox + rx1))
+        roi_alpha = alpha[ry0:ry1, rx0:rx1]
+        self.solid_color = color[ry0:ry1, rx0:rx1].copy()
+        self.solid_mask = (roi_alpha == 255).astype(np.uint8)
+        py, px = np.nonzero((alpha > 0) & (alpha < 255))
+        # 每个像素 3 个字节在展平的整帧 uint8 缓冲区中的下标
+        partial = (py + oy) * shape[1] + (px + ox)
+        self.blend_idx = (partial[:, None] * 3 + np.arange(3)).reshape(-1)
+        self.blend_color = color[py, px].astype(np.uint16).reshape(-1)
+        self.blend_alpha = np.repeat(alpha[py, px].astype(np.uint16), 3)
+
+    def apply(self, frame):
+        """原地混合到 frame (连续内存，形状与栅格化时一致)"""
+        if self.roi is None:
+            return frame
+        if len(self.blend_idx):
+            flat = frame.reshape(-1)
+            a = self.blend_alpha
+            under = flat[self.blend_idx].astype(np.uint16)
+            flat[self.blend_idx] = ((under * (255 - a) + self.blend_color * a + 127) // 255).astype(np.uint8)
+        cv2.copyTo(self.solid_color, self.solid_mask, frame[self.roi])
+        return frame
+
+
+class OverlayRenderer:
+    def __init__(self, max_boxes: int = 20, conf_bucket: float = 0.05, label_cache_entries: int = 256, jpeg_cache_entries: int = 4):
+        self.max_boxes = int(max_boxes)
+        self.conf_bucket = float(conf_bucket)
+        self._labels = _LRU(label_cache_entries)
+        self._jpegs = _LRU(jpeg_cache_entries)
+        self._lock = threading.Lock()
+        self._version = None
+        self._shape = None
+        self._uses = 0
+        self._direct = True
+        self._overlay = None
+        self._buffer = None
+        self.counts = {
+            "rasterized": 0,
+            "blended": 0,
+            "direct": 0,
+            "label_hits": 0,
+            "label_misses": 0,
+            "jpeg_hits": 0,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.counts)
+            out["overlay_pixels"] = self._overlay.pixels if self._overlay is not None else 0
+            out["label_bitmaps"] = len(self._labels)
+            out["mode"] = "cached" if self._overlay is not None else "direct"
+        return out
+
+    def _bucket(self, conf: float) -> float:
+        if self.conf_bucket <= 0:
+            return round(conf, 2)
+        return round(round(conf / self.conf_bucket) * self.conf_bucket, 2)
+
+    def _text(self, label: str, conf: float, track_id: int) -> str:
+        text = f"{label} {self._bucket(conf):.2f}"
+        return f"#{track_id} {text}" if track_id >= 0 else text
+
+    def _text_bitmap(self, text: str):
+        """需持有 self._lock。返回 (alpha 位图, 基线以上高度)"""
+        cached = self._labels.lookup(text)
+        if cached is not None:
+            self.counts["label_hits"] += 1
+            return cached
+        self.counts["label_misses"] += 1
+        (tw, th), baseline = cv2.getTextSize(text, FONT, FONT_SCALE, 1)
+        bitmap = np.zeros((th + baseline + 2, tw + 2), dtype=np.uint8)
+        cv2.putText(bitmap, text, (1, th + 1), FONT, FONT_SCALE, 255, 1, cv2.LINE_AA)
+        cached = (bitmap, th + 1)
+        self._labels.store(text, cached)
+        return cached
+
+    def _label_bitmap(self, label: str, conf: float, track_id: int):
+        """整串标签 (含 "#id" 前缀) 一个位图：Hershey 字体按小数宽度排版，分段拼接会错位 1 像素"""
+        return self._text_bitmap(self._text(label, conf, track_id))
+
+    def _rows(self, detections):
+        data = detections.data[: self.max_boxes]
+        rows = zip(data["box"].tolist(), data["confidence"].tolist(), data["track_id"].tolist(), data["confirmed"].tolist())
+        for i, (box, conf, track_id, confirmed) in enumerate(rows):
+            # 跟踪中但尚未确认的轨迹用细线
+            yield detections.label(i), box, conf, track_id, 2 if confirmed else 1
+
+    def draw(self, frame, detections):
+        """直接在 frame 上绘制 (叠加层每帧都在变化时使用)"""
+        for label, (x1, y1, x2, y2), conf, track_id, thickness in self._rows(detections):
+            color = label_color(label)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+            cv2.putText(
+                frame,
+                self._text(label, conf, track_id),
+                (x1, max(0, y1 - LABEL_OFFSET)),
+                FONT,
+                FONT_SCALE,
+                color,
+                1,
+                cv2.LINE_AA,
+            )
+        return frame
+
+    def _rasterize(self, detections, shape):
+        """需持有 self._lock。只在检测框 (含标签) 并集区域内栅格化，生成稀疏叠加层"""
+        h, w = shape[:2]
+        items = []
+        x0, y0, x1, y1 = w, h, 0, 0
+        for label, (bx1, by1, bx2, by2), conf, track_id, thickness in self._rows(detections):
+            bitmap, ascent = self._label_bitmap(label, conf, track_id)
+            tx, ty = bx1 - 1, max(0, by1 - LABEL_OFFSET) - ascent
+            items.append((label_color(label), (bx1, by1, bx2, by2), thickness, bitmap, tx, ty))
+            # 线宽向框外扩展 thickness // 2 + 1 像素
+            pad = thickness // 2 + 1
+            x0, y0 = min(x0, bx1 - pad, tx), min(y0, by1 - pad, ty)
+            x1, y1 = max(x1, bx2 + pad + 1, tx + bitmap.shape[1]), max(y1, by2 + pad + 1, ty + bitmap.shape[0])
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+        if x1 <= x0 or y1 <= y0:
+            return SparseOverlay(np.zeros((0, 0), dtype=np.uint8), None, (0, 0), shape)
+        alpha = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        color_canvas = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        for color, (bx1, by1, bx2, by2), thickness, bitmap, tx, ty in items:
+            p1, p2 = (bx1 - x0, by1 - y0), (bx2 - x0, by2 - y0)
+            cv2.rectangle(color_canvas, p1, p2, color, thickness)
+            cv2.rectangle(alpha, p1, p2, 255, thickness)
+            self._paste(alpha, color_canvas, bitmap, tx - x0, ty - y0, color)
+        self.counts["rasterized"] += 1
+        return SparseOverlay(alpha, color_canvas, (y0, x0), shape)
+
+    @staticmethod
+    def _paste(alpha, color_canvas, bitmap, x: int, y: int, color):
+        """把 alpha 位图贴到局部画布 (左上角 x, y)，裁到画布内"""
+        h, w = alpha.shape
+        bh, bw = bitmap.shape
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(w, x + bw), min(h, y + bh)
+        if x1 <= x0 or y1 <= y0:
+            return
+        src = bitmap[y0 - y: y1 - y, x0 - x: x1 - x]
+        region = alpha[y0:y1, x0:x1]
+        np.maximum(region, src, out=region)
+        color_canvas[y0:y1, x0:x1][src > 0] = color
+
+    def _prepare(self, detections, version, shape):
+        """需持有 self._lock。返回当前版本的叠加层；应直接绘制时返回 None
+
+        版本变化时，若上一版本只被用了一帧 (叠加层每帧都在变)，新版本的第一帧直接绘制，
+        同一版本被第二次使用时才栅格化。
+        """
+        if version != self._version or shape != self._shape:
+            self._direct = self._uses <= 1
+            self._version = version
+            self._shape = shape
+            self._uses = 0
+            self._overlay = None
+        self._uses += 1
+        if self._overlay is None:
+            if self._direct and self._uses == 1:
+                return None
+            self._overlay = self._rasterize(detections, shape)
+        return self._overlay
+
+    def _compose(self, frame, detections, version, out):
+        """需持有 self._lock"""
+        if out is None:
+            if self._buffer is None or self._buffer.shape != frame.shape:
+                self._buffer = np.empty_like(frame)
+            out = self._buffer
+        np.copyto(out, frame)
+        overlay = self._prepare(detections, version, frame.shape)
+        if overlay is None:
+            self.draw(out, detections)
+            self.counts["direct"] += 1
+        else:
+            overlay.apply(out)
+            self.counts["blended"] += 1
+        return out
+
+    def annotate(self, frame, detections, version=None, out=None):
+        """返回叠加后的帧：写入 out (缺省为内部复用的缓冲区，下次调用会被覆盖)，不修改 frame。无检测时原样返回 frame
+
+        version 为叠加层版本；缺省时按检测框内容 (DetectionBatch.overlay_key) 判断是否变化。
+        """
+        if not detections:
+            return frame
+        with self._lock:
+            return self._compose(frame, detections, detections.overlay_key() if version is None else version, out)
+
+    def render_jpeg(self, frame, seq, detections, version, quality: int, encode):
+        """叠加后调用 encode(帧, 画质) 编码；同一 (帧序号, 叠加层版本, 画质) 的结果在客户端之间共享"""
+        with self._lock:
+            key = (seq, version, quality)
+            cached = self._jpegs.lookup(key) if seq is not None else None
+            if cached is not None:
+                self.counts["jpeg_hits"] += 1
+                return cached
+            # 编码期间持锁：内部缓冲区在编码完成前不能被其他客户端覆盖
+            data = encode(self._compose(frame, detections, version, None), quality)
+            if data is not None and seq is not None:
+                self._jpegs.store(key, data)
+            return data
@@ -0,0 +1,71 @@
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from core.metrics import JPEG_ENCODE_SECONDS
+from web.overlay import OverlayRenderer
+
+MJPEG_JPEG_QUALITY = 50
+MAX_OVERLAY_BOXES = 20
+
+# 进程内共享：按叠加层版本栅格化一次，所有 /video_feed 客户端复用
+OVERLAY = OverlayRenderer(
+    max_boxes=MAX_OVERLAY_BOXES,
+    conf_bucket=getattr(Config, "OVERLAY_CONF_BUCKET", 0.05),
+    label_cache_entries=getattr(Config, "OVERLAY_LABEL_CACHE_ENTRIES", 256),
+)
+
+
+def no_signal_frame():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(frame, "No Camera Signal", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return frame
+
+
+def annotate_frame(frame, detections):
+    """返回绘制了检测框 (DetectionBatch) 的新帧，无检测时原样返回"""
+    if not detections:
+        return frame
+    return OVERLAY.annotate(frame, detections, out=np.empty_like(frame))
+
+
+def encode_jpeg(frame, quality: int = MJPEG_JPEG_QUALITY):
+    started = time.perf_counter()
+    ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    JPEG_ENCODE_SECONDS.observe(time.perf_counter() - started)
+    if not ret:
+        return None
+    return buffer.tobytes()
+
+
+def mjpeg_part(jpeg_bytes: bytes) -> bytes:
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n')
+
+
+def render_stream_frame(fusion):
+    """视频流的一帧 JPEG：无叠加层时优先转发摄像头 MJPEG 或按帧序号共享的编码结果，否则叠加缓存的检测框图层后编码"""
+    # MJPEG 直通：无叠加层时直接转发摄像头输出的 JPEG，既不解码也不重新编码
+    if not fusion.get_latest_detections():
+        jpeg, _ = fusion.camera.get_jpeg_with_meta()
+        if jpeg is not None:
+            return jpeg
+
+    frame, seq, _ = fusion.camera.get_frame_with_meta()
+    if frame is None:
+        return encode_jpeg(no_signal_frame())
+    # 负载调节降档时降低编码画质
+    quality = fusion.stream_settings()[1] or MJPEG_JPEG_QUALITY
+    detections, version = fusion.get_overlay_detections()
+    if detections:
+        return OVERLAY.render_jpeg(frame, seq, detections, version, quality, encode_jpeg)
+    # 无叠加层时按帧序号共享编码结果：多个客户端与视觉大模型只编码一次
+    cached = fusion.encoded_frames.get(seq)
+    if cached is not None:
+        return cached[0]
+    frame_bytes = encode_jpeg(frame, quality)
+    if frame_bytes is not None:
+        fusion.encoded_frames.put(seq, frame_bytes, frame.shape[1], frame.shape[0])
+    return frame_bytes